@@ -1,8 +1,8 @@
 import copy
+import math
 import psycopg2
-import re
+import threading
 import time
-import yaml
 
 from contextlib import contextmanager
 
@@ -65,6 +65,10 @@ class PostgresAdapter:
     #       the compiler call this to get the context
     date_function = 'datenow()'
 
+    # schema test queries which replace the defaults in dbt.parser. the
+    # defaults are already written for postgres
+    schema_test_templates = {}
+
     @classmethod
     def acquire_connection(cls, profile):
         # profile requires some marshalling right now because it includes a
@@ -98,19 +102,58 @@ class PostgresAdapter:
             profile.get('user'),
         ))
 
+    @classmethod
+    def get_connection_key(cls, profile, thread_name=None):
+        if thread_name is None:
+            thread_name = threading.current_thread().name
+
+        return "{}--{}".format(cls.hash_profile(profile), thread_name)
+
     @classmethod
     def get_connection(cls, profile):
-        profile_hash = cls.hash_profile(profile)
+        # connections are leased to a single thread, so that cancelling a
+        # statement (or a statement timing out) on one thread can't affect
+        # statements running on other threads.
+        connection_key = cls.get_connection_key(profile)
 
-        if connection_cache.get(profile_hash):
-            connection = connection_cache.get(profile_hash)
+        if connection_cache.get(connection_key):
+            connection = connection_cache.get(connection_key)
             return connection
 
         connection = cls.acquire_connection(profile)
-        connection_cache[profile_hash] = connection
+        connection_cache[connection_key] = connection
 
         return cls.get_connection(profile)
 
+    @classmethod
+    def release_thread_connections(cls, profile):
+        """close the connections leased to every thread but this one. call
+        this once a thread pool has been joined: the threads in the next pool
+        get new names, so they'd never reuse these connections. closing a
+        connection discards any transaction left open on it."""
+        own_key = cls.get_connection_key(profile)
+        prefix = cls.get_connection_key(profile, thread_name='')
+
+        for connection_key in list(connection_cache.keys()):
+            if not connection_key.startswith(prefix) or \
+               connection_key == own_key:
+                continue
+
+            connection = connection_cache.pop(connection_key)
+            handle = connection.get('handle')
+
+            if handle is not None:
+                handle.close()
+
+    @classmethod
+    def cancel_connection(cls, profile, connection):
+        """cancel the statement currently running on `connection`. this is
+        called from a different thread than the one using the connection."""
+        handle = connection.get('handle')
+
+        if handle is not None:
+            handle.cancel()
+
     @staticmethod
     def get_connection_spec(connection):
         credentials = connection.get('credentials')
@@ -290,36 +333,87 @@ class PostgresAdapter:
             query, connection, model_name)
 
     @classmethod
-    def execute_model(cls, profile, model):
-        parts = re.split(r'-- (DBT_OPERATION .*)', model.get('wrapped_sql'))
+    def execute_operation(cls, profile, step):
+        def call_expand_target_column_types(kwargs):
+            kwargs.update({'profile': profile})
+            return cls.expand_target_column_types(**kwargs)
+
+        func_map = {
+            'expand_column_types_if_needed':
+            call_expand_target_column_types
+        }
+
+        return func_map[step['function']](step['args'].copy())
+
+    @classmethod
+    def steps_to_execute(cls, profile, steps):
+        """drop steps whose `only_if` condition doesn't hold. conditions are
+        all evaluated before any step runs, so a step which creates a
+        relation doesn't affect the conditions of later steps."""
+        exists = {}
+        to_execute = []
+
+        for step in steps:
+            only_if = step.get('only_if')
+
+            if only_if is not None:
+                relation = (only_if['schema'], only_if['identifier'])
+
+                if relation not in exists:
+                    exists[relation] = cls.table_exists(profile, *relation)
+
+                if exists[relation] != only_if['exists']:
+                    continue
+
+            to_execute.append(step)
+
+        return to_execute
+
+    @classmethod
+    def set_statement_timeout(cls, connection, timeout, model_name=None):
+        """limit statements for the rest of the current transaction to
+        `timeout` seconds"""
+        cls.add_statement_to_transaction(
+            'set local statement_timeout = {}'.format(
+                int(math.ceil(timeout * 1000))),
+            connection, model_name)
+
+    @classmethod
+    def reset_statement_timeout(cls, connection, model_name=None):
+        # `set local` only lasts until the end of the transaction
+        pass
+
+    @classmethod
+    def execute_model(cls, profile, model, timeout=None):
         connection = cls.get_connection(profile)
 
         if flags.STRICT_MODE:
             validate_connection(connection)
 
-        for i, part in enumerate(parts):
-            matches = re.match(r'^DBT_OPERATION ({.*})$', part)
-            if matches is not None:
-                instruction_string = matches.groups()[0]
-                instruction = yaml.safe_load(instruction_string)
-                function = instruction['function']
-                kwargs = instruction['args']
+        handle = connection.get('handle')
+        cursor = None
+
+        steps = cls.steps_to_execute(profile, model.get('execution_steps'))
 
-                def call_expand_target_column_types(kwargs):
-                    kwargs.update({'profile': profile})
-                    return cls.expand_target_column_types(**kwargs)
+        if timeout is not None:
+            cls.set_statement_timeout(connection, timeout, model.get('name'))
 
-                func_map = {
-                    'expand_column_types_if_needed':
-                    call_expand_target_column_types
-                }
+        try:
+            for step in steps:
+                if step['type'] == 'operation':
+                    cls.execute_operation(profile, step)
+                else:
+                    handle, cursor = cls.add_statement_to_transaction(
+                        step['sql'], connection, model.get('name'))
 
-                func_map[function](kwargs)
-            else:
-                handle, cursor = cls.add_query_to_transaction(
-                    part, connection, model.get('name'))
+            handle.commit()
 
-        handle.commit()
+        finally:
+            if timeout is not None:
+                cls.reset_statement_timeout(connection, model.get('name'))
+
+        if cursor is None:
+            return None
 
         status = cls.get_status(cursor)
         cursor.close()
@@ -464,6 +558,58 @@ class PostgresAdapter:
 
         return dict(existing)
 
+    @classmethod
+    def get_source_freshness(cls, profile, tables):
+        """returns a dict of (schema, table) -> a value which changes whenever
+        the table is written to, for each of `tables` which exists. uses the
+        statistics collector's row counters, along with the table's
+        relfilenode, which changes when the table is truncated or rewritten.
+        returns None if the adapter can't tell."""
+        schemas = sorted(set(schema for (schema, table) in tables))
+
+        query = """
+        select s.schemaname, s.relname,
+               s.n_tup_ins, s.n_tup_upd, s.n_tup_del, c.relfilenode
+        from pg_stat_user_tables s
+        join pg_class c on c.oid = s.relid
+        where s.schemaname in ({schemas})
+        """.format(schemas=", ".join(
+            "'{}'".format(schema) for schema in schemas)).strip()  # noqa
+
+        connection = cls.get_connection(profile)
+
+        if flags.STRICT_MODE:
+            validate_connection(connection)
+
+        _, cursor = cls.add_query_to_transaction(
+            query, connection, 'source freshness')
+        results = cursor.fetchall()
+
+        return {(row[0], row[1]): ':'.join(str(value) for value in row[2:])
+                for row in results
+                if (row[0], row[1]) in tables}
+
+    # seed for sampled tests, so that every run reads the same sample
+    SAMPLE_SEED = 1
+
+    @classmethod
+    def sample_relation(cls, schema, table, materialization, sample):
+        """a query which selects a sample of the relation, or None if it
+        can't be sampled. `sample` is either {'rows': n} or {'percent': p}.
+        tablesample can only read tables, so only a row cap can be applied
+        to views."""
+        relation = '"{}"."{}"'.format(schema, table)
+
+        if sample.get('rows') is not None:
+            return 'select * from {} limit {}'.format(
+                relation, sample.get('rows'))
+
+        if materialization not in ('table', 'incremental'):
+            return None
+
+        return 'select * from {} tablesample system ({}) repeatable ({})' \
+            .format(relation, sample.get('percent'), cls.SAMPLE_SEED)
+
     @classmethod
     def execute_all(cls, profile, queries, model_name=None):
         if len(queries) == 0:
@@ -519,16 +665,21 @@ class PostgresAdapter:
         return cursor.statusmessage
 
     @classmethod
-    def add_query_to_transaction(cls, query, connection, model_name=None):
+    def add_statement_to_transaction(cls, statement, connection,
+                                     model_name=None):
         handle = connection.get('handle')
         cursor = handle.cursor()
 
-        with exception_handler(connection, cursor, model_name, query):
-            logger.debug("SQL: %s", query)
+        with exception_handler(connection, cursor, model_name, statement):
+            logger.debug("SQL: %s", statement)
             pre = time.time()
-            cursor.execute(query)
+            cursor.execute(statement)
             post = time.time()
             logger.debug(
                 "SQL status: %s in %0.2f seconds",
                 cls.get_status(cursor), post-pre)
             return handle, cursor
+
+    @classmethod
+    def add_query_to_transaction(cls, query, connection, model_name=None):
+        return cls.add_statement_to_transaction(query, connection, model_name)
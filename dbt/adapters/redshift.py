@@ -11,6 +11,24 @@ class RedshiftAdapter(PostgresAdapter):
 
     date_function = 'getdate()'
 
+    # redshift plans a left join as a hash anti-join more reliably than it
+    # does `not exists`
+    schema_test_templates = {
+        'relationships': """
+select child.id
+from (
+  select {child_field} as id
+  from {child_ref}
+) child
+left join (
+  select {parent_field} as id
+  from {parent_ref}
+) parent on parent.id = child.id
+where child.id is not null
+  and parent.id is null
+""",
+    }
+
     @classmethod
     def acquire_connection(cls, profile):
         # profile requires some marshalling right now because it includes a
@@ -65,3 +83,17 @@ class RedshiftAdapter(PostgresAdapter):
         return "{sort_type} sortkey({keys_csv})".format(
             sort_type=sort_type, keys_csv=keys_csv
         )
+
+    @classmethod
+    def get_source_freshness(cls, profile, tables):
+        # redshift doesn't maintain the row counters in pg_stat_user_tables
+        return None
+
+    @classmethod
+    def sample_relation(cls, schema, table, materialization, sample):
+        # redshift has no tablesample, so only a row cap is supported
+        if sample.get('rows') is None:
+            return None
+
+        return 'select * from "{}"."{}" limit {}'.format(
+            schema, table, sample.get('rows'))
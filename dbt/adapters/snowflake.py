@@ -1,9 +1,9 @@
 from __future__ import absolute_import
 
 import copy
+import math
 import re
 import time
-import yaml
 
 import snowflake.connector
 import snowflake.connector.errors
@@ -181,8 +181,59 @@ class SnowflakeAdapter(PostgresAdapter):
             query, connection, model_name)
 
     @classmethod
-    def execute_model(cls, profile, model):
-        parts = re.split(r'-- (DBT_OPERATION .*)', model.get('wrapped_sql'))
+    def get_source_freshness(cls, profile, tables):
+        # not supported yet: models with source_tables are always rebuilt
+        return None
+
+    @classmethod
+    def sample_relation(cls, schema, table, materialization, sample):
+        relation = '"{}"."{}"'.format(schema, table)
+
+        if sample.get('rows') is not None:
+            return 'select * from {} limit {}'.format(
+                relation, sample.get('rows'))
+
+        # a seed can't be given when sampling a view
+        if materialization not in ('table', 'incremental'):
+            return None
+
+        return 'select * from {} sample system ({}) seed ({})'.format(
+            relation, sample.get('percent'), cls.SAMPLE_SEED)
+
+    @classmethod
+    def cancel_connection(cls, profile, connection):
+        handle = connection.get('handle')
+
+        if handle is None:
+            return
+
+        # the connection being cancelled is busy, so cancel its queries from
+        # a separate, short-lived connection
+        canceller = cls.acquire_connection(profile)
+
+        try:
+            cursor = canceller.get('handle').cursor()
+            cursor.execute('select system$cancel_all_queries({})'.format(
+                handle.session_id))
+            cursor.close()
+        finally:
+            canceller.get('handle').close()
+
+    @classmethod
+    def set_statement_timeout(cls, connection, timeout, model_name=None):
+        cls.add_statement_to_transaction(
+            'alter session set statement_timeout_in_seconds = {}'.format(
+                int(math.ceil(timeout))),
+            connection, model_name)
+
+    @classmethod
+    def reset_statement_timeout(cls, connection, model_name=None):
+        cls.add_statement_to_transaction(
+            'alter session unset statement_timeout_in_seconds',
+            connection, model_name)
+
+    @classmethod
+    def execute_model(cls, profile, model, timeout=None):
         connection = cls.get_connection(profile)
 
         if flags.STRICT_MODE:
@@ -196,39 +247,30 @@ class SnowflakeAdapter(PostgresAdapter):
                 connection.get('credentials', {}).get('schema')),
             connection)
 
-        for i, part in enumerate(parts):
-            matches = re.match(r'^DBT_OPERATION ({.*})$', part)
-            if matches is not None:
-                instruction_string = matches.groups()[0]
-                instruction = yaml.safe_load(instruction_string)
-                function = instruction['function']
-                kwargs = instruction['args']
-
-                def call_expand_target_column_types(kwargs):
-                    kwargs.update({'profile': profile})
-                    return cls.expand_target_column_types(**kwargs)
-
-                func_map = {
-                    'expand_column_types_if_needed':
-                    call_expand_target_column_types
-                }
-
-                func_map[function](kwargs)
-            else:
-                handle, cursor = cls.add_query_to_transaction(
-                    part, connection, model.get('name'))
+        return super(SnowflakeAdapter, cls).execute_model(
+            profile, model, timeout)
 
-        handle.commit()
+    @classmethod
+    def add_statement_to_transaction(cls, statement, connection,
+                                     model_name=None):
+        handle = connection.get('handle')
+        cursor = handle.cursor()
 
-        status = cls.get_status(cursor)
-        cursor.close()
+        with exception_handler(connection, cursor, model_name, statement):
+            logger.debug("SQL: %s", statement)
+            pre = time.time()
+            cursor.execute(statement)
+            post = time.time()
+            logger.debug(
+                "SQL status: %s in %0.2f seconds",
+                cls.get_status(cursor), post-pre)
 
-        return status
+        return handle, cursor
 
     @classmethod
     def add_query_to_transaction(cls, query, connection, model_name=None):
         handle = connection.get('handle')
-        cursor = handle.cursor()
+        cursor = None
 
         # snowflake only allows one query per api call.
         queries = query.strip().split(";")
@@ -244,14 +286,10 @@ class SnowflakeAdapter(PostgresAdapter):
             if without_comments == "":
                 continue
 
-            with exception_handler(connection, cursor,
-                                   model_name, individual_query):
-                logger.debug("SQL: %s", individual_query)
-                pre = time.time()
-                cursor.execute(individual_query)
-                post = time.time()
-                logger.debug(
-                    "SQL status: %s in %0.2f seconds",
-                    cls.get_status(cursor), post-pre)
+            handle, cursor = cls.add_statement_to_transaction(
+                individual_query, connection, model_name)
+
+        if cursor is None:
+            cursor = handle.cursor()
 
         return handle, cursor
@@ -1,7 +1,10 @@
+import re
+
 import dbt.compat
 import dbt.exceptions
 
 import jinja2
+import jinja2.nodes
 import jinja2.sandbox
 
 from dbt.utils import NodeType
@@ -74,3 +77,189 @@ def render_template(template, ctx, node=None):
 def get_rendered(string, ctx, node=None, capture_macros=False):
     template = get_template(string, ctx, node, capture_macros)
     return render_template(template, ctx, node=None)
+
+
+# runtime expressions which can be substituted without rendering a template
+RUNTIME_PLACEHOLDER = re.compile(
+    r'{{\s*(run_started_at|invocation_id)\s*}}')
+
+JINJA_MARKERS = ('{{', '{%', '{#')
+
+
+class RenderMode(object):
+    Placeholders = 'placeholders'
+    Jinja = 'jinja'
+
+
+def get_render_mode(string):
+    """how `string` needs to be rendered at runtime. returns None if it can
+    be used as-is, RenderMode.Placeholders if it only contains simple runtime
+    placeholders, and RenderMode.Jinja otherwise."""
+    without_placeholders = RUNTIME_PLACEHOLDER.sub('', string)
+
+    if any(marker in without_placeholders for marker in JINJA_MARKERS):
+        return RenderMode.Jinja
+    elif without_placeholders != string:
+        return RenderMode.Placeholders
+
+    return None
+
+
+def render_placeholders(string, ctx):
+    return RUNTIME_PLACEHOLDER.sub(
+        lambda match: dbt.compat.to_string(ctx[match.group(1)]),
+        string)
+
+
+template_cache = {}
+
+
+def get_cached_template(string, node=None):
+    """compile a template once per process. the context is supplied at
+    render time rather than as template globals, so cached templates can be
+    shared between nodes and threads."""
+    template = template_cache.get(string)
+
+    if template is None:
+        template = get_template(string, {}, node)
+        template_cache[string] = template
+
+    return template
+
+
+def get_rendered_for_runtime(string, render_mode, ctx, node=None):
+    if render_mode == RenderMode.Placeholders:
+        return render_placeholders(string, ctx)
+    elif render_mode == RenderMode.Jinja:
+        template = get_cached_template(string, node)
+        return render_template(template, ctx, node)
+
+    return string
+
+
+class DynamicTemplate(Exception):
+    pass
+
+
+# names in the context a node is rendered with at parse time
+PARSE_CONTEXT_NAMES = ('ref', 'config', 'var', 'target', 'this')
+
+STATIC_NODE_TYPES = (
+    jinja2.nodes.Template, jinja2.nodes.Output, jinja2.nodes.TemplateData,
+    jinja2.nodes.Const, jinja2.nodes.List, jinja2.nodes.Tuple,
+    jinja2.nodes.Dict, jinja2.nodes.Pair, jinja2.nodes.Keyword,
+    jinja2.nodes.Name,
+)
+
+
+def get_const(expr):
+    try:
+        return expr.as_const()
+    except jinja2.nodes.Impossible:
+        raise DynamicTemplate()
+
+
+def get_attribute_path(expr):
+    """['a', 'b', 'c'] for `a.b.c`"""
+    path = []
+
+    while isinstance(expr, jinja2.nodes.Getattr):
+        path.insert(0, expr.attr)
+        expr = expr.node
+
+    if not isinstance(expr, jinja2.nodes.Name) or \
+       expr.name in PARSE_CONTEXT_NAMES:
+        raise DynamicTemplate()
+
+    return [expr.name] + path
+
+
+def extract_static_call(call, package_name, result):
+    if call.dyn_args is not None or call.dyn_kwargs is not None:
+        raise DynamicTemplate()
+
+    # arguments are evaluated before the call is made
+    for expr in call.args + call.kwargs:
+        extract_static_calls_from(expr, package_name, result)
+
+    func = call.node
+
+    if isinstance(func, jinja2.nodes.Name) and func.name == 'ref':
+        if len(call.kwargs) > 0:
+            raise DynamicTemplate()
+
+        ref = [get_const(arg) for arg in call.args]
+
+        if not all(isinstance(arg, dbt.compat.basestring) for arg in ref):
+            raise DynamicTemplate()
+
+        result['refs'].append(ref)
+
+    elif isinstance(func, jinja2.nodes.Name) and func.name == 'config':
+        if len(call.args) == 1 and len(call.kwargs) == 0:
+            opts = get_const(call.args[0])
+        elif len(call.args) == 0 and len(call.kwargs) > 0:
+            opts = dict((kwarg.key, get_const(kwarg.value))
+                        for kwarg in call.kwargs)
+        else:
+            raise DynamicTemplate()
+
+        if not isinstance(opts, dict):
+            raise DynamicTemplate()
+
+        result['configs'].append(opts)
+
+    elif isinstance(func, jinja2.nodes.Name) and \
+            (func.name == 'var' or func.name in env.globals):
+        pass
+
+    else:
+        # anything else which is called is a macro. see ParserMacroCapture
+        path = get_attribute_path(func)
+
+        if len(path) == 1:
+            macro_package_name = package_name
+        else:
+            macro_package_name = path[-2]
+
+        macro = '{}.{}.{}'.format(NodeType.Macro,
+                                  macro_package_name,
+                                  path[-1])
+
+        if macro not in result['macros']:
+            result['macros'].append(macro)
+
+
+def extract_static_calls_from(expr, package_name, result):
+    if isinstance(expr, jinja2.nodes.Call):
+        extract_static_call(expr, package_name, result)
+        return
+
+    elif isinstance(expr, jinja2.nodes.Getattr):
+        get_attribute_path(expr)
+
+    elif not isinstance(expr, STATIC_NODE_TYPES):
+        raise DynamicTemplate()
+
+    for child in expr.iter_child_nodes():
+        extract_static_calls_from(child, package_name, result)
+
+
+def extract_static_calls(string, package_name):
+    """find the refs, config() calls and macro calls in a node's sql without
+    rendering it. returns a dict of 'refs', 'configs' and 'macros', or None
+    if the sql has control flow or any other construct whose effects can
+    only be known by rendering it."""
+    result = {'refs': [], 'configs': [], 'macros': []}
+
+    if not any(marker in string for marker in JINJA_MARKERS):
+        return result
+
+    try:
+        ast = env.parse(dbt.compat.to_string(string))
+        extract_static_calls_from(ast, package_name, result)
+
+    except (jinja2.exceptions.TemplateSyntaxError, DynamicTemplate):
+        return None
+
+    return result
@@ -0,0 +1,167 @@
+"""
+asyncio client for postgres (and redshift), built on psycopg2's asynchronous
+connection mode. Each in-flight statement costs a connection and a coroutine
+rather than an OS thread, so many more statements can be waiting on the
+warehouse at once.
+
+Requires python 3.5+. Only import this module from code paths which are
+never reached on older pythons.
+"""
+import asyncio
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+from dbt.logger import GLOBAL_LOGGER as logger
+
+
+def wait_for_fd(loop, fd, for_write=False):
+    future = asyncio.Future(loop=loop)
+
+    def ready():
+        if not future.done():
+            future.set_result(None)
+
+    if for_write:
+        loop.add_writer(fd, ready)
+        future.add_done_callback(lambda f: loop.remove_writer(fd))
+    else:
+        loop.add_reader(fd, ready)
+        future.add_done_callback(lambda f: loop.remove_reader(fd))
+
+    return future
+
+
+async def wait(connection, loop):
+    """poll `connection` until its current operation completes. raises any
+    error returned by the server."""
+    while True:
+        state = connection.poll()
+
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        elif state == psycopg2.extensions.POLL_READ:
+            await wait_for_fd(loop, connection.fileno())
+        elif state == psycopg2.extensions.POLL_WRITE:
+            await wait_for_fd(loop, connection.fileno(), for_write=True)
+        else:
+            raise psycopg2.OperationalError(
+                "Bad result from poll: {}".format(state))
+
+
+async def connect(dsn, loop):
+    # `async` is a keyword as of python 3.7
+    connection = psycopg2.connect(dsn, **{'async': 1})
+    await wait(connection, loop)
+
+    return connection
+
+
+async def fetchall(connection, sql, loop):
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute(sql)
+        await wait(connection, loop)
+
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class ConnectionPool(object):
+    """opens connections lazily and reuses idle ones. the executor never has
+    more than `concurrency` statements in flight, so the pool never holds
+    more than that many connections."""
+
+    def __init__(self, dsn, loop):
+        self.dsn = dsn
+        self.loop = loop
+        self.idle = []
+        self.opened = 0
+
+    async def acquire(self):
+        while len(self.idle) > 0:
+            connection = self.idle.pop()
+
+            if not connection.closed:
+                return connection
+
+        connection = await connect(self.dsn, self.loop)
+        self.opened += 1
+
+        return connection
+
+    def release(self, connection):
+        if not connection.closed:
+            self.idle.append(connection)
+
+    def close(self):
+        for connection in self.idle:
+            connection.close()
+
+        self.idle = []
+
+
+class AsyncQueryExecutor(object):
+    """runs (key, sql) pairs with at most `concurrency` statements in flight.
+
+    New statements are only started when a slot frees up, so the work list
+    can be a generator and is consumed lazily. `on_complete` is called on
+    the event loop as each statement finishes, with the key, the fetched
+    rows (or None), the error (or None) and the execution time."""
+
+    def __init__(self, dsn, concurrency):
+        self.dsn = dsn
+        self.concurrency = concurrency
+
+    def run(self, queries, on_complete):
+        loop = asyncio.new_event_loop()
+        pool = ConnectionPool(self.dsn, loop)
+
+        try:
+            loop.run_until_complete(
+                self.run_all(queries, on_complete, pool, loop))
+        finally:
+            pool.close()
+            loop.close()
+
+        logger.debug("Ran async queries using {} connections"
+                     .format(pool.opened))
+
+    async def run_all(self, queries, on_complete, pool, loop):
+        slots = asyncio.Semaphore(self.concurrency, loop=loop)
+        tasks = []
+
+        for key, sql in queries:
+            # backpressure: wait for a free slot before starting the next
+            # statement, rather than queueing every statement up front
+            await slots.acquire()
+
+            tasks.append(loop.create_task(
+                self.run_one(key, sql, on_complete, pool, slots, loop)))
+
+        if len(tasks) > 0:
+            await asyncio.gather(*tasks, loop=loop)
+
+    async def run_one(self, key, sql, on_complete, pool, slots, loop):
+        start_time = time.time()
+        rows = None
+        error = None
+
+        try:
+            connection = await pool.acquire()
+
+            try:
+                rows = await fetchall(connection, sql, loop)
+            finally:
+                pool.release(connection)
+
+        except psycopg2.Error as e:
+            error = e
+
+        finally:
+            slots.release()
+
+        on_complete(key, rows, error, time.time() - start_time)
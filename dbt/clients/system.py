@@ -51,3 +51,124 @@ def load_file_contents(path, strip=True):
         to_return = to_return.strip()
 
     return to_return
+
+
+def scandir(path):
+    """yields (name, path, is_dir, stat result) for each entry in `path`.
+    uses os.scandir where available, so that directories are listed and
+    files stat'ed with as few system calls as possible."""
+    if hasattr(os, 'scandir'):
+        for entry in os.scandir(path):
+            try:
+                entry_stat = entry.stat()
+            except OSError:
+                entry_stat = None
+
+            # like os.walk, symlinks to directories aren't followed
+            is_dir = entry.is_dir() and not entry.is_symlink()
+
+            yield entry.name, entry.path, is_dir, entry_stat
+
+    else:
+        for name in os.listdir(path):
+            entry_path = os.path.join(path, name)
+
+            try:
+                entry_stat = os.stat(entry_path)
+            except OSError:
+                entry_stat = None
+
+            is_dir = os.path.isdir(entry_path) and \
+                not os.path.islink(entry_path)
+
+            yield name, entry_path, is_dir, entry_stat
+
+
+class FileScanner(object):
+    """Finds the files in a project. Each directory is walked once, however
+    many resource types are searched for in it, and the files found are
+    bucketed by extension as they are listed.
+
+    The mtime, size and inode of every file found are recorded as it is
+    listed, so that callers can tell whether a file has changed without
+    reading it.
+    """
+
+    def __init__(self):
+        # (root_path, relative_path) -> extension -> [file info]
+        self.scanned = {}
+        self.stats = {}
+
+    def scan(self, root_path, relative_path_to_search):
+        key = (root_path, relative_path_to_search)
+
+        if key not in self.scanned:
+            by_extension = {}
+
+            absolute_path_to_search = os.path.join(
+                root_path, relative_path_to_search)
+
+            self._walk(absolute_path_to_search, '', relative_path_to_search,
+                       by_extension)
+
+            self.scanned[key] = by_extension
+
+        return self.scanned[key]
+
+    def _walk(self, path, relative_dir, searched_path, by_extension):
+        try:
+            entries = list(scandir(path))
+        except OSError:
+            return
+
+        subdirectories = []
+
+        for name, entry_path, is_dir, entry_stat in entries:
+            if is_dir:
+                subdirectories.append(name)
+                continue
+
+            _, extension = os.path.splitext(name)
+
+            by_extension.setdefault(extension, []).append({
+                'searched_path': searched_path,
+                'absolute_path': entry_path,
+                'relative_path': os.path.join(relative_dir, name),
+                'name': name,
+            })
+
+            if entry_stat is not None:
+                self.stats[entry_path] = [entry_stat.st_mtime,
+                                          entry_stat.st_size,
+                                          entry_stat.st_ino]
+
+        for name in subdirectories:
+            self._walk(os.path.join(path, name),
+                       os.path.join(relative_dir, name),
+                       searched_path,
+                       by_extension)
+
+    def find_matching(self, root_path, relative_paths_to_search,
+                      file_pattern):
+        """like `find_matching`, but `file_pattern` must end with an
+        extension, eg. '*.sql'"""
+        _, extension = os.path.splitext(file_pattern)
+        matching = []
+
+        for relative_path_to_search in relative_paths_to_search:
+            by_extension = self.scan(root_path, relative_path_to_search)
+
+            for match in by_extension.get(extension, []):
+                if fnmatch.fnmatch(match['name'], file_pattern):
+                    matching.append({
+                        'searched_path': match['searched_path'],
+                        'absolute_path': match['absolute_path'],
+                        'relative_path': match['relative_path'],
+                    })
+
+        return matching
+
+    def get_stat(self, absolute_path):
+        """the [mtime, size, inode] of a file found by this scanner, or None
+        if it wasn't found or couldn't be stat'ed"""
+        return self.stats.get(absolute_path)
@@ -1,4 +1,5 @@
 import codecs
+import sys
 
 WHICH_PYTHON = None
 
@@ -10,8 +11,10 @@ except NameError:
 
 if WHICH_PYTHON == 2:
     basestring = basestring
+    builtin_intern = intern
 else:
     basestring = str
+    builtin_intern = sys.intern
 
 
 def to_unicode(s):
@@ -36,6 +39,14 @@ def to_string(s):
             return str(s)
 
 
+def intern(s):
+    # python 2 can only intern byte strings
+    if WHICH_PYTHON == 2 and not isinstance(s, str):
+        return s
+
+    return builtin_intern(s)
+
+
 def write_file(path, s):
     if WHICH_PYTHON == 2:
         with codecs.open(path, 'w', encoding='utf-8') as f:
@@ -12,11 +12,13 @@ from dbt.utils import This, Var, is_enabled, get_materialization, NodeType, \
 from dbt.linker import Linker
 from dbt.runtime import RuntimeContext
 
+import dbt.clients.system
 import dbt.compat
 import dbt.contracts.graph.compiled
 import dbt.contracts.project
 import dbt.exceptions
 import dbt.flags
+import dbt.graph.selector
 import dbt.parser
 import dbt.templates
 
@@ -28,6 +30,7 @@ CompilableEntities = [
 ]
 
 graph_file_name = 'graph.gpickle'
+PARTIAL_PARSE_FILE_NAME = 'partial_parse.json'
 
 
 def recursively_parse_macros_for_node(node, flat_graph, context):
@@ -69,9 +72,19 @@ def recursively_parse_macros_for_node(node, flat_graph, context):
     return context
 
 
-def compile_and_print_status(project, args):
+def compile_and_print_status(project, args, resource_types=None,
+                             include_spec=None, exclude_spec=None,
+                             with_ancestors=False):
     compiler = Compiler(project, args)
     compiler.initialize()
+
+    print_compile_stats(compiler.compile(resource_types=resource_types,
+                                         include_spec=include_spec,
+                                         exclude_spec=exclude_spec,
+                                         with_ancestors=with_ancestors))
+
+
+def print_compile_stats(stats):
     names = {
         NodeType.Model: 'models',
         NodeType.Test: 'tests',
@@ -86,7 +99,7 @@ def compile_and_print_status(project, args):
         NodeType.Analysis: 0,
     }
 
-    results.update(compiler.compile())
+    results.update(stats)
 
     stat_line = ", ".join(
         ["{} {}".format(ct, names.get(t)) for t, ct in results.items()])
@@ -190,6 +203,8 @@ class Compiler(object):
         self.project = project
         self.args = args
         self.parsed_models = None
+        self.file_scanner = None
+        self.parse_cache = None
 
     def initialize(self):
         if not os.path.exists(self.project['target-path']):
@@ -247,8 +262,17 @@ class Compiler(object):
             if get_materialization(target_model) == 'ephemeral':
                 model['extra_ctes'][target_model_id] = None
                 return '__dbt__CTE__{}'.format(target_model.get('name'))
-            else:
-                return '"{}"."{}"'.format(schema, target_model.get('name'))
+
+            sample_sql = self.get_sample_sql(model, target_model, schema)
+
+            if sample_sql is not None:
+                # injected as a CTE when the test is wrapped
+                model.setdefault('sampled_relations', OrderedDict())
+                model['sampled_relations'][target_model_id] = sample_sql
+                model['sampled'] = True
+                return '__dbt__SAMPLE__{}'.format(target_model.get('name'))
+
+            return '"{}"."{}"'.format(schema, target_model.get('name'))
 
         def wrapped_do_ref(*args):
             try:
@@ -263,6 +287,35 @@ class Compiler(object):
 
         return wrapped_do_ref
 
+    def get_sample_sql(self, model, target_model, schema):
+        """with `--sample`, schema tests read a sample of the model they
+        test. returns the query which selects that sample, or None if
+        `target_model` should be read in full.
+
+        data tests aren't sampled, since there's no knowing whether they
+        still hold for a sample. nor is the parent side of a relationships
+        test: a sample of the parent would be missing most of the rows
+        which the child refers to."""
+        sample = getattr(self.args, 'sample', None)
+
+        if not isinstance(sample, dict) or \
+           not is_type(model, NodeType.Test):
+            return None
+
+        test_metadata = model.get('test_metadata')
+
+        if test_metadata is None or \
+           test_metadata.get('to') == target_model.get('name'):
+            return None
+
+        adapter = get_adapter(self.project.run_environment())
+
+        return adapter.sample_relation(
+            schema,
+            target_model.get('name'),
+            get_materialization(target_model),
+            sample)
+
     def get_compiler_context(self, linker, model, flat_graph):
         context = self.project.context()
         adapter = get_adapter(self.project.run_environment())
@@ -344,81 +397,120 @@ class Compiler(object):
         graph_path = os.path.join(self.project['target-path'], filename)
         linker.write_graph(graph_path)
 
-    def compile_graph(self, linker, flat_graph):
+    def wrap_node(self, linker, injected_node, all_nodes, all_projects):
+        if injected_node.get('resource_type') in [NodeType.Test,
+                                                  NodeType.Analysis]:
+            # tests select the rows which violate them. wrap them to count
+            # those rows, or just to find one if failing fast
+            if is_type(injected_node, NodeType.Test):
+                sampled_relations = injected_node.get('sampled_relations', {})
+                sample_ctes = OrderedDict(
+                    (unique_id, ' __dbt__SAMPLE__{} as (\n{}\n)'.format(
+                        all_nodes[unique_id].get('name'), sample_sql))
+                    for unique_id, sample_sql in sampled_relations.items())
+
+                injected_node['injected_sql'] = inject_ctes_into_sql(
+                    injected_node['injected_sql'], sample_ctes)
+
+                if dbt.flags.FAST_FAIL_TESTS:
+                    template = dbt.templates.TestFastFailTemplate
+                else:
+                    template = dbt.templates.TestCountTemplate
+
+                injected_node['wrapped_sql'] = template.format(
+                    test_sql=injected_node['injected_sql'])
+            else:
+                # don't wrap analyses.
+                injected_node['wrapped_sql'] = injected_node.get(
+                    'injected_sql')
+
+            injected_node['execution_steps'] = [
+                dbt.templates.sql_step(injected_node['wrapped_sql'])]
+
+        else:
+            # now turn model nodes back into the old-style model object for
+            # wrapping
+            model = Model(
+                self.project,
+                injected_node.get('root_path'),
+                injected_node.get('path'),
+                all_projects.get(injected_node.get('package_name')))
+
+            cfg = injected_node.get('config', {})
+            model._config = cfg
+
+            context = self.get_context(linker, model, all_nodes)
+
+            steps = model.compile(
+                injected_node.get('injected_sql'), self.project, context)
+
+            injected_node['execution_steps'] = steps
+            injected_node['wrapped_sql'] = dbt.templates.steps_to_sql(
+                steps, model.get_prologue_string())
+
+        return injected_node
+
+    def iter_compiled_nodes(self, linker, flat_graph, scope=None):
+        """compile, inject and wrap each node in turn, yielding nodes as soon
+        as they have been added to the linker. ephemeral models are compiled
+        first, so that their CTEs are available to the models which
+        reference them.
+
+        if `scope` is provided, only the nodes in it are compiled (along
+        with any ephemeral models they turn out to need)."""
         all_projects = self.get_all_projects()
 
         compiled_graph = {
             'nodes': {},
             'macros': {},
         }
-        injected_graph = {
-            'nodes': {},
-            'macros': {},
-        }
-        wrapped_graph = {
-            'nodes': {},
-            'macros': {},
-        }
-        written_nodes = []
 
-        for name, node in flat_graph.get('nodes').items():
-            compiled_graph['nodes'][name] = \
-                self.compile_node(linker, node, flat_graph)
+        nodes = flat_graph.get('nodes')
 
-        if dbt.flags.STRICT_MODE:
-            dbt.contracts.graph.compiled.validate(compiled_graph)
+        def ensure_compiled(name):
+            if name not in compiled_graph['nodes']:
+                compiled_node = self.compile_node(linker, nodes.get(name),
+                                                  flat_graph)
+                compiled_graph['nodes'][name] = compiled_node
 
-        for name, node in compiled_graph.get('nodes').items():
-            node, compiled_graph = prepend_ctes(node, compiled_graph)
-            injected_graph['nodes'][name] = node
+                # refs which weren't seen while parsing (eg. in branches
+                # which depend on the target) are compiled on demand
+                for cte_id in compiled_node.get('extra_ctes'):
+                    ensure_compiled(cte_id)
 
-        if dbt.flags.STRICT_MODE:
-            dbt.contracts.graph.compiled.validate(injected_graph)
+            return compiled_graph['nodes'][name]
 
-        for name, injected_node in injected_graph.get('nodes').items():
-            # now turn model nodes back into the old-style model object for
-            # wrapping
-            if injected_node.get('resource_type') in [NodeType.Test,
-                                                      NodeType.Analysis]:
-                # data tests get wrapped in count(*)
-                # TODO : move this somewhere more reasonable
-                if 'data' in injected_node['tags'] and \
-                        is_type(injected_node, NodeType.Test):
-                    injected_node['wrapped_sql'] = (
-                        "select count(*) from (\n{test_sql}\n) sbq").format(
-                        test_sql=injected_node['injected_sql'])
-                else:
-                    # don't wrap schema tests or analyses.
-                    injected_node['wrapped_sql'] = injected_node.get(
-                        'injected_sql')
+        in_scope = [name for name in nodes
+                    if scope is None or name in scope]
 
-                wrapped_graph['nodes'][name] = injected_node
+        ephemeral = [name for name in in_scope
+                     if get_materialization(nodes.get(name)) == 'ephemeral']
 
-            elif is_type(injected_node, NodeType.Archive):
-                # unfortunately we do everything automagically for
-                # archives. in the future it'd be nice to generate
-                # the SQL at the parser level.
-                pass
+        for name in ephemeral:
+            ensure_compiled(name)
 
-            else:
-                model = Model(
-                    self.project,
-                    injected_node.get('root_path'),
-                    injected_node.get('path'),
-                    all_projects.get(injected_node.get('package_name')))
+        for name in in_scope:
+            ensure_compiled(name)
 
-                cfg = injected_node.get('config', {})
-                model._config = cfg
+            if dbt.flags.STRICT_MODE:
+                dbt.contracts.graph.compiled.validate_node(
+                    compiled_graph['nodes'][name])
 
-                context = self.get_context(linker,
-                                           model,
-                                           injected_graph.get('nodes'))
+            injected_node, compiled_graph = prepend_ctes(
+                compiled_graph['nodes'][name], compiled_graph)
 
-                wrapped_stmt = model.compile(
-                    injected_node.get('injected_sql'), self.project, context)
+            # the compiled graph is validated as later nodes are injected,
+            # so wrapped fields are only added to a copy of the node
+            injected_node = injected_node.copy()
 
-                injected_node['wrapped_sql'] = wrapped_stmt
-                wrapped_graph['nodes'][name] = injected_node
+            if not is_type(injected_node, NodeType.Archive):
+                # unfortunately we do everything automagically for
+                # archives. in the future it'd be nice to generate
+                # the SQL at the parser level.
+                injected_node = self.wrap_node(linker,
+                                               injected_node,
+                                               nodes,
+                                               all_projects)
 
             build_path = os.path.join('build',
                                       injected_node.get('package_name'),
@@ -428,11 +520,17 @@ class Compiler(object):
                                                       NodeType.Analysis,
                                                       NodeType.Test) and \
                get_materialization(injected_node) != 'ephemeral':
+                # the wrapped sql is only kept in the build directory. the
+                # graph holds the execution steps it was rendered from
                 written_path = self.__write(
-                    build_path, injected_node.get('wrapped_sql'))
-                written_nodes.append(injected_node)
+                    build_path, injected_node.pop('wrapped_sql', None))
                 injected_node['build_path'] = written_path
 
+            if get_materialization(injected_node) != 'ephemeral':
+                # only ephemeral models are injected into other nodes, so
+                # nothing else needs this node's intermediate sql
+                del compiled_graph['nodes'][name]
+
             linker.add_node(injected_node.get('unique_id'))
 
             linker.update_node_data(
@@ -440,21 +538,36 @@ class Compiler(object):
                 injected_node)
 
             for dependency in injected_node.get('depends_on', {}).get('nodes'):
-                if compiled_graph.get('nodes').get(dependency):
+                if nodes.get(dependency):
                     linker.dependency(
                         injected_node.get('unique_id'),
-                        (compiled_graph.get('nodes')
-                                       .get(dependency)
-                                       .get('unique_id')))
+                        nodes.get(dependency).get('unique_id'))
                 else:
-                    dbt.exceptions.dependency_not_found(model, dependency)
+                    dbt.exceptions.dependency_not_found(injected_node,
+                                                        dependency)
+
+            yield injected_node
 
         cycle = linker.find_cycles()
 
         if cycle:
             raise RuntimeError("Found a cycle: {}".format(cycle))
 
-        return wrapped_graph, written_nodes
+    def compile_graph(self, linker, flat_graph, on_node_compiled=None,
+                      scope=None):
+        """compile every node in scope into the linker, returning a count of
+        the compiled nodes of each resource type. compiled nodes are only
+        kept in the linker's graph."""
+        stats = defaultdict(int)
+
+        for node in self.iter_compiled_nodes(linker, flat_graph, scope):
+            if not is_type(node, NodeType.Archive):
+                stats[node.get('resource_type')] += 1
+
+            if on_node_compiled is not None:
+                on_node_compiled(node)
+
+        return stats
 
     def get_all_projects(self):
         root_project = self.project.cfg
@@ -481,7 +594,8 @@ class Compiler(object):
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('macro-paths', []),
-                    resource_type=NodeType.Macro))
+                    resource_type=NodeType.Macro,
+                    file_scanner=self.file_scanner))
 
         return parsed_macros
 
@@ -496,7 +610,9 @@ class Compiler(object):
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('source-paths', []),
-                    resource_type=NodeType.Model))
+                    resource_type=NodeType.Model,
+                    file_scanner=self.file_scanner,
+                    parse_cache=self.parse_cache))
 
         return parsed_models
 
@@ -511,7 +627,9 @@ class Compiler(object):
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('analysis-paths', []),
-                    resource_type=NodeType.Analysis))
+                    resource_type=NodeType.Analysis,
+                    file_scanner=self.file_scanner,
+                    parse_cache=self.parse_cache))
 
         return parsed_models
 
@@ -527,13 +645,17 @@ class Compiler(object):
                     root_dir=project.get('project-root'),
                     relative_dirs=project.get('test-paths', []),
                     resource_type=NodeType.Test,
-                    tags={'data'}))
+                    tags={'data'},
+                    file_scanner=self.file_scanner,
+                    parse_cache=self.parse_cache))
 
         return parsed_tests
 
     def get_parsed_schema_tests(self, root_project, all_projects):
         parsed_tests = {}
 
+        adapter = get_adapter(self.project.run_environment())
+
         for name, project in all_projects.items():
             parsed_tests.update(
                 dbt.parser.load_and_parse_yml(
@@ -541,7 +663,9 @@ class Compiler(object):
                     root_project=root_project,
                     all_projects=all_projects,
                     root_dir=project.get('project-root'),
-                    relative_dirs=project.get('source-paths', [])))
+                    relative_dirs=project.get('source-paths', []),
+                    file_scanner=self.file_scanner,
+                    templates=adapter.schema_test_templates))
 
         return parsed_tests
 
@@ -563,30 +687,134 @@ class Compiler(object):
 
         return all_nodes
 
-    def compile(self):
-        linker = Linker()
-
+    def parse(self):
         root_project = self.project.cfg
         all_projects = self.get_all_projects()
 
+        self.file_scanner = dbt.clients.system.FileScanner()
+
+        self.parse_cache = dbt.parser.PartialParseCache(
+            os.path.join(root_project.get('target-path'),
+                         PARTIAL_PARSE_FILE_NAME))
+
         all_macros = self.load_all_macros(root_project, all_projects)
         all_nodes = self.load_all_nodes(root_project, all_projects)
 
-        flat_graph = {
+        self.parse_cache.write()
+
+        return {
             'nodes': all_nodes,
             'macros': all_macros
         }
 
-        compiled_graph, written_nodes = self.compile_graph(linker, flat_graph)
+    def get_parsed_graph(self, flat_graph):
+        """build a graph of the parsed nodes, with edges from the refs seen
+        while parsing"""
+        linker = Linker()
+        nodes = flat_graph.get('nodes')
 
-        self.write_graph_file(linker)
+        models_by_name = defaultdict(list)
 
-        stats = defaultdict(int)
+        for unique_id, node in nodes.items():
+            linker.update_node_data(unique_id, node)
+
+            if is_type(node, NodeType.Model):
+                models_by_name[node.get('name')].append(node)
+
+        for unique_id, node in nodes.items():
+            for ref in node.get('refs', []):
+                if len(ref) == 1:
+                    package_name, name = None, ref[0]
+                elif len(ref) == 2:
+                    package_name, name = ref
+                else:
+                    continue
+
+                for target in models_by_name.get(name, []):
+                    if package_name is None or \
+                       package_name == target.get('package_name'):
+                        linker.dependency(unique_id, target.get('unique_id'))
+                        break
+
+        return linker
+
+    def get_scope(self, flat_graph, resource_types, include_spec=None,
+                  exclude_spec=None, with_ancestors=False):
+        """returns the unique ids of the nodes which need to be compiled to
+        run the selected nodes of the given resource types: the selected
+        nodes and the ephemeral models they depend on. if `with_ancestors`
+        is True, every ancestor of the selected nodes is included too.
+
+        when selecting tests with explicit `include_spec`, the models which
+        the specs match are included as well, so that the selectors can find
+        their tests in the compiled graph."""
+        explicit_spec = include_spec is not None
+
+        if include_spec is None:
+            include_spec = ['*']
+
+        if exclude_spec is None:
+            exclude_spec = []
+
+        nodes = flat_graph.get('nodes')
+        graph = self.get_parsed_graph(flat_graph).graph
+
+        # specs which don't match anything are reported when the nodes are
+        # selected to run
+        selected = dbt.graph.selector.select_nodes(self.project,
+                                                   graph,
+                                                   include_spec,
+                                                   exclude_spec,
+                                                   warn_if_useless=False)
+
+        scope = set(
+            unique_id for unique_id in selected
+            if nodes[unique_id].get('resource_type') in resource_types)
+
+        if explicit_spec and NodeType.Test in resource_types:
+            scope.update(
+                unique_id for unique_id in selected
+                if is_type(nodes[unique_id], NodeType.Model) and
+                any(child in scope for child in graph.successors(unique_id)))
+
+        if with_ancestors:
+            scope.update(dbt.graph.selector.get_ancestors(graph, scope))
+
+        to_visit = list(scope)
+
+        while len(to_visit) > 0:
+            for parent in graph.predecessors(to_visit.pop()):
+                if parent not in scope and \
+                   get_materialization(nodes[parent]) == 'ephemeral':
+                    scope.add(parent)
+                    to_visit.append(parent)
+
+        return scope
+
+    def compile(self, flat_graph=None, on_node_compiled=None,
+                resource_types=None, include_spec=None, exclude_spec=None,
+                with_ancestors=False):
+        """compile the project and write the graph file. if provided,
+        `on_node_compiled` is called with each node as soon as it (and its
+        edges) have been added to the graph.
+
+        if `resource_types` is provided, only the nodes needed to run the
+        selected nodes of those types are compiled. otherwise, everything
+        is compiled."""
+        linker = Linker()
 
-        for node_name, node in compiled_graph.get('nodes').items():
-            stats[node.get('resource_type')] += 1
+        if flat_graph is None:
+            flat_graph = self.parse()
 
-        for node_name, node in compiled_graph.get('macros').items():
-            stats[node.get('resource_type')] += 1
+        scope = None
+
+        if resource_types is not None:
+            scope = self.get_scope(flat_graph, resource_types, include_spec,
+                                   exclude_spec, with_ancestors)
+
+        stats = self.compile_graph(linker, flat_graph, on_node_compiled,
+                                   scope)
+
+        self.write_graph_file(linker)
 
         return stats
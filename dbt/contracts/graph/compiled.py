@@ -1,4 +1,4 @@
-from voluptuous import Schema, Required, All, Any, Length
+from voluptuous import Schema, Required, Optional, All, Any, Length
 
 from collections import OrderedDict
 
@@ -22,6 +22,12 @@ compiled_node_contract = parsed_node_contract.extend({
         basestring: Any(basestring, None)
     }),
     Required('injected_sql'): Any(basestring, None),
+
+    # tests run with --sample. see dbt.compilation.Compiler.get_sample_sql
+    Optional('sampled'): bool,
+    Optional('sampled_relations'): All(OrderedDict, {
+        basestring: basestring
+    }),
 })
 
 compiled_nodes_contract = Schema({
@@ -26,6 +26,10 @@ config_contract = {
     # adapter optional fields
     Optional('sort'): basestring,
     Optional('dist'): basestring,
+
+    # execution optional fields
+    Optional('timeout'): Any(int, float),
+    Optional('source_tables'): [basestring],
 }
 
 parsed_node_contract = unparsed_node_contract.extend({
@@ -41,6 +45,12 @@ parsed_node_contract = unparsed_node_contract.extend({
     Required('empty'): bool,
     Required('config'): config_contract,
     Required('tags'): All(set),
+
+    # the arguments of each ref() call, as seen while parsing
+    Optional('refs'): [list],
+
+    # the type and arguments of a schema test
+    Optional('test_metadata'): dict,
 })
 
 parsed_nodes_contract = Schema({
@@ -17,6 +17,10 @@ class CompilationException(RuntimeException):
     pass
 
 
+class FailFastException(RuntimeException):
+    pass
+
+
 class NotImplementedException(Exception):
     pass
 
@@ -1,2 +1,3 @@
 STRICT_MODE = False
 NON_DESTRUCTIVE = False
+FAST_FAIL_TESTS = False
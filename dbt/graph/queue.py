@@ -0,0 +1,88 @@
+import threading
+
+from collections import defaultdict
+
+
+class GraphQueue(object):
+    """Schedules nodes while the graph is still being built.
+
+    Nodes are added as they are compiled, along with the nodes they depend
+    on. A selected node becomes ready once all of its ancestors have been
+    compiled and every selected ancestor has finished running. Nodes which
+    aren't selected (eg. ephemeral models) are passed through: they finish
+    as soon as their own parents have.
+
+    If any ancestor of a selected node failed, the node is skipped instead
+    of becoming ready. Skipped nodes count as failures for their children.
+
+    `external` nodes will never be added, eg. because they aren't being
+    compiled. They count as having already succeeded.
+    """
+
+    def __init__(self, selected, external=()):
+        self.selected = set(selected)
+
+        self.parents = {}
+        self.children = defaultdict(set)
+
+        # unique_id -> True if the node (and everything upstream) succeeded
+        self.finished = dict((node, True) for node in external)
+        self.queued = set()
+
+        self.lock = threading.Lock()
+
+    def add(self, unique_id, parents):
+        """record that `unique_id` has been compiled. returns a tuple of
+        (ready, skipped) node ids."""
+        with self.lock:
+            self.parents[unique_id] = list(parents)
+
+            for parent in parents:
+                self.children[parent].add(unique_id)
+
+            return self._update([unique_id])
+
+    def mark_done(self, unique_id, succeeded=True):
+        """record that a ready node has finished running. returns a tuple of
+        (ready, skipped) node ids."""
+        with self.lock:
+            self.finished[unique_id] = succeeded
+
+            return self._update(self.children[unique_id])
+
+    def is_complete(self):
+        with self.lock:
+            return all(node in self.finished for node in self.selected)
+
+    def _update(self, to_check):
+        ready = []
+        skipped = []
+
+        to_check = list(to_check)
+
+        while len(to_check) > 0:
+            node = to_check.pop()
+
+            if node in self.finished or node in self.queued or \
+               node not in self.parents:
+                continue
+
+            parents = self.parents[node]
+
+            if not all(parent in self.finished for parent in parents):
+                continue
+
+            upstream_ok = all(self.finished[parent] for parent in parents)
+
+            if node in self.selected and upstream_ok:
+                self.queued.add(node)
+                ready.append(node)
+                continue
+
+            elif node in self.selected:
+                skipped.append(node)
+
+            self.finished[node] = upstream_ok
+            to_check.extend(self.children[node])
+
+        return ready, skipped
@@ -1,7 +1,7 @@
 # import dbt.utils.compiler_error
-import networkx as nx
 from dbt.logger import GLOBAL_LOGGER as logger
 
+from collections import defaultdict
 from dbt.utils import NodeType
 
 SELECTOR_PARENTS = '+'
@@ -43,6 +43,18 @@ def parse_spec(node_spec):
     }
 
 
+def uses_graph_operators(raw_specs):
+    """returns True if any of the specs select parents or children. these
+    can't be resolved until the whole graph has been compiled."""
+    for spec in split_specs(raw_specs):
+        parsed = parse_spec(spec)
+
+        if parsed['select_parents'] or parsed['select_children']:
+            return True
+
+    return False
+
+
 def get_package_names(graph):
     return set([node.split(".")[1] for node in graph.nodes()])
 
@@ -73,63 +85,157 @@ def is_selected_node(real_node, node_selector):
     return True
 
 
-def get_nodes_by_qualified_name(project, graph, qualified_name):
+class FqnTrie(object):
+    """an index of graph nodes by the parts of their names, eg.
+    ('package', 'name') for 'model.package.name'. selectors are resolved by
+    walking down the trie instead of testing every node against them.
+
+    Each level of the trie also indexes the nodes beneath it by their last
+    name part, because the last part of a selector matches a node's name
+    at any depth (see `is_selected_node`)."""
+
+    def __init__(self):
+        self.children = {}
+        self.nodes = set()
+        self.nodes_by_name = defaultdict(set)
+
+    @classmethod
+    def from_graph(cls, graph):
+        trie = cls()
+
+        for node in graph.nodes():
+            trie.add(node, node.split('.')[1:])
+
+        return trie
+
+    def add(self, node, fqn_ish):
+        trie = self
+
+        for i in range(len(fqn_ish) + 1):
+            trie.nodes.add(node)
+            trie.nodes_by_name[fqn_ish[-1]].add(node)
+
+            if i < len(fqn_ish):
+                trie = trie.children.setdefault(fqn_ish[i], FqnTrie())
+
+    def package_names(self):
+        return set(self.children)
+
+    def select(self, node_selector):
+        """returns the nodes for which is_selected_node() would be true"""
+        trie = self
+        last = len(node_selector) - 1
+
+        for i, selector_part in enumerate(node_selector):
+            if selector_part == SELECTOR_GLOB:
+                return trie.nodes
+
+            child = trie.children.get(selector_part)
+
+            if i == last:
+                selected = set(trie.nodes_by_name.get(selector_part, ()))
+
+                if child is not None:
+                    selected.update(child.nodes)
+
+                return selected
+
+            elif child is None:
+                return set()
+
+            trie = child
+
+        return trie.nodes
+
+
+def get_nodes_by_qualified_name(project, graph, qualified_name, trie=None):
     """ returns a node if matched, else throws a CompilerError. qualified_name
     should be either 1) a node name or 2) a dot-notation qualified selector"""
 
-    package_names = get_package_names(graph)
+    if trie is None:
+        trie = FqnTrie.from_graph(graph)
 
-    for node in graph.nodes():
-        # node naming has changed to dot notation. split to tuple for
-        # compatibility with this code.
-        fqn_ish = node.split('.')[1:]
+    package_names = trie.package_names()
 
-        if len(qualified_name) == 1 and fqn_ish == qualified_name[0]:
-            yield node
+    if qualified_name[0] in package_names:
+        return set(trie.select(qualified_name))
 
-        elif qualified_name[0] in package_names:
-            if is_selected_node(fqn_ish, qualified_name):
-                yield node
+    selected = set()
 
-        else:
-            for package_name in package_names:
-                local_qualified_node_name = (package_name,) + qualified_name
-                if is_selected_node(fqn_ish, local_qualified_node_name):
-                    yield node
-                    break
+    for package_name in package_names:
+        local_qualified_node_name = (package_name,) + qualified_name
+        selected.update(trie.select(local_qualified_node_name))
+
+    return selected
+
+
+def get_ancestors(graph, nodes):
+    """returns every ancestor of any of `nodes`. each edge is followed at
+    most once, however many of the nodes share ancestors."""
+    return traverse(graph.predecessors, nodes)
+
+
+def get_descendants(graph, nodes):
+    """returns every descendant of any of `nodes`. each edge is followed at
+    most once, however many of the nodes share descendants."""
+    return traverse(graph.successors, nodes)
+
+
+def traverse(get_neighbors, nodes):
+    visited = set()
+    to_visit = list(nodes)
+
+    while len(to_visit) > 0:
+        node = to_visit.pop()
+
+        for neighbor in get_neighbors(node):
+            if neighbor not in visited:
+                visited.add(neighbor)
+                to_visit.append(neighbor)
 
+    return visited
 
-def get_nodes_from_spec(project, graph, spec):
+
+def get_child_tests(graph):
+    """returns a dict of node -> the tests which depend on it"""
+    child_tests = defaultdict(set)
+
+    for node in graph.nodes():
+        if graph.node.get(node).get('resource_type') == NodeType.Test:
+            for parent in graph.predecessors(node):
+                child_tests[parent].add(node)
+
+    return child_tests
+
+
+def get_nodes_from_spec(project, graph, spec, trie=None, child_tests=None):
     select_parents = spec['select_parents']
     select_children = spec['select_children']
     qualified_node_name = spec['qualified_node_name']
 
-    selected_nodes = set(get_nodes_by_qualified_name(project,
-                                                     graph,
-                                                     qualified_node_name))
+    if child_tests is None:
+        child_tests = get_child_tests(graph)
+
+    selected_nodes = get_nodes_by_qualified_name(project,
+                                                 graph,
+                                                 qualified_node_name,
+                                                 trie)
 
     additional_nodes = set()
     test_nodes = set()
 
     if select_parents:
-        for node in selected_nodes:
-            parent_nodes = nx.ancestors(graph, node)
-            additional_nodes.update(parent_nodes)
+        additional_nodes.update(get_ancestors(graph, selected_nodes))
 
     if select_children:
-        for node in selected_nodes:
-            child_nodes = nx.descendants(graph, node)
-            additional_nodes.update(child_nodes)
+        additional_nodes.update(get_descendants(graph, selected_nodes))
 
     model_nodes = selected_nodes | additional_nodes
 
     for node in model_nodes:
         # include tests that depend on this node. if we aren't running tests,
         # they'll be filtered out later.
-        child_tests = [n for n in graph.successors(node)
-                       if graph.node.get(n).get('resource_type') ==
-                       NodeType.Test]
-        test_nodes.update(child_tests)
+        test_nodes.update(child_tests.get(node, ()))
 
     return model_nodes | test_nodes
 
@@ -144,7 +250,8 @@ def warn_if_useless_spec(spec, nodes):
     )
 
 
-def select_nodes(project, graph, raw_include_specs, raw_exclude_specs):
+def select_nodes(project, graph, raw_include_specs, raw_exclude_specs,
+                 warn_if_useless=True):
     selected_nodes = set()
 
     split_include_specs = split_specs(raw_include_specs)
@@ -153,14 +260,30 @@ def select_nodes(project, graph, raw_include_specs, raw_exclude_specs):
     include_specs = [parse_spec(spec) for spec in split_include_specs]
     exclude_specs = [parse_spec(spec) for spec in split_exclude_specs]
 
+    trie = FqnTrie.from_graph(graph)
+    child_tests = get_child_tests(graph)
+
     for spec in include_specs:
-        included_nodes = get_nodes_from_spec(project, graph, spec)
-        warn_if_useless_spec(spec, included_nodes)
+        included_nodes = get_nodes_from_spec(project, graph, spec, trie,
+                                             child_tests)
+        if warn_if_useless:
+            warn_if_useless_spec(spec, included_nodes)
         selected_nodes = selected_nodes | included_nodes
 
     for spec in exclude_specs:
-        excluded_nodes = get_nodes_from_spec(project, graph, spec)
-        warn_if_useless_spec(spec, excluded_nodes)
+        excluded_nodes = get_nodes_from_spec(project, graph, spec, trie,
+                                             child_tests)
+        if warn_if_useless:
+            warn_if_useless_spec(spec, excluded_nodes)
         selected_nodes = selected_nodes - excluded_nodes
 
     return selected_nodes
+
+
+def select_unfinished(graph, selected_nodes, finished_nodes):
+    """returns the selected nodes which haven't finished, along with every
+    selected node downstream of them"""
+    unfinished = set(selected_nodes) - set(finished_nodes)
+    unfinished.update(get_descendants(graph, unfinished))
+
+    return unfinished & set(selected_nodes)
@@ -18,6 +18,7 @@ import dbt.task.init as init_task
 import dbt.task.seed as seed_task
 import dbt.task.test as test_task
 import dbt.task.archive as archive_task
+import dbt.task.build as build_task
 import dbt.tracking
 import dbt.config as config
 import dbt.adapters.cache as adapter_cache
@@ -192,6 +193,9 @@ def invoke_dbt(parsed):
     else:
         flags.NON_DESTRUCTIVE = False
 
+    flags.FAST_FAIL_TESTS = getattr(proj.args, 'fast_fail_tests', False) \
+        is True
+
     logger.debug("running dbt with arguments %s", parsed)
 
     task = parsed.cls(args=parsed, project=proj)
@@ -199,6 +203,27 @@ def invoke_dbt(parsed):
     return task, proj
 
 
+def sample_spec(value):
+    """parse the argument to `dbt test --sample`: either a percentage of
+    rows, like '10%', or a number of rows, like '1000'"""
+    try:
+        if value.endswith('%'):
+            percent = float(value[:-1])
+
+            if 0 < percent <= 100:
+                return {'percent': percent}
+
+        elif int(value) > 0:
+            return {'rows': int(value)}
+
+    except ValueError:
+        pass
+
+    raise argparse.ArgumentTypeError(
+        "'{}' is not a percentage (eg. 10%) or a number of rows (eg. 1000)"
+        .format(value))
+
+
 def parse_args(args):
     p = argparse.ArgumentParser(
         prog='dbt: data build tool',
@@ -338,8 +363,104 @@ def parse_args(args):
         If specified, DBT will drop incremental models and fully-recalculate
         the incremental table from the model definition.
         """)
+    sub.add_argument(
+        '--deadline',
+        type=float,
+        required=False,
+        help="""
+        Number of seconds the run may take. Models which are still running
+        when the deadline passes are cancelled, and models which haven't
+        started yet are not run.
+        """)
+    sub.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help="""
+        If specified, dbt stops as soon as any model fails: models which are
+        still running are cancelled, and no more models are started.
+        """)
+    sub.add_argument(
+        '--pipeline',
+        action='store_true',
+        help="""
+        If specified, models are run as soon as they and their parents have
+        been compiled, instead of after the whole project has been compiled.
+        """)
+    sub.add_argument(
+        '--resume',
+        action='store_true',
+        help="""
+        If specified, only run the models which failed, were skipped or
+        didn't run in the previous run, along with their children. Models
+        which succeeded are run again if they, or any of their parents, have
+        changed since.
+        """)
+    sub.add_argument(
+        '--skip-unchanged',
+        action='store_true',
+        help="""
+        If specified, models are skipped if neither they, their parents nor
+        their source_tables have changed since they were last built.
+        """)
     sub.set_defaults(cls=run_task.RunTask, which='run')
 
+    sub = subs.add_parser('build', parents=[base_subparser])
+    sub.add_argument(
+        '--models',
+        required=False,
+        nargs='+',
+        help="""
+        Specify the models to build and test.
+        """
+    )
+    sub.add_argument(
+        '--exclude',
+        required=False,
+        nargs='+',
+        help="""
+        Specify the models to exclude.
+        """
+    )
+    sub.add_argument(
+        '--threads',
+        type=int,
+        required=False,
+        help="""
+        Specify number of threads to use while executing models and tests.
+        Overrides settings in profiles.yml.
+        """
+    )
+    sub.add_argument(
+        '--non-destructive',
+        action='store_true',
+        help="""
+        If specified, DBT will not drop views. Tables will be truncated instead
+        of dropped.
+        """
+    )
+    sub.add_argument(
+        '--full-refresh',
+        action='store_true',
+        help="""
+        If specified, DBT will drop incremental models and fully-recalculate
+        the incremental table from the model definition.
+        """)
+    sub.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help="""
+        If specified, dbt stops as soon as any model or test errors: nodes
+        which are still running are cancelled, and no more are started.
+        """)
+    sub.add_argument(
+        '--block-on-test-failure',
+        action='store_true',
+        help="""
+        If specified, a model's children aren't built until its schema tests
+        have passed, and are skipped if any of them fail.
+        """)
+    sub.set_defaults(cls=build_task.BuildTask, which='build')
+
     sub = subs.add_parser('seed', parents=[base_subparser])
     sub.add_argument(
         '--drop-existing',
@@ -384,6 +505,51 @@ def parse_args(args):
         Specify the models to exclude from testing.
         """
     )
+    sub.add_argument(
+        '--async-concurrency',
+        type=int,
+        required=False,
+        help="""
+        Run tests on an asyncio event loop with up to this many queries in
+        flight at once, instead of using threads. Postgres and Redshift only.
+        Requires python 3.5+.
+        """
+    )
+    sub.add_argument(
+        '--fused',
+        action='store_true',
+        help="""
+        Run the not_null, unique and accepted_values tests on each model
+        together, in a single query over the model.
+        """
+    )
+    sub.add_argument(
+        '--fast-fail-tests',
+        action='store_true',
+        help="""
+        Stop each test at the first row which violates it, and report only
+        whether it passed or failed rather than the number of violations.
+        """
+    )
+    sub.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="""
+        Run every test, even those which passed last time and whose models
+        haven't been rebuilt or written to since.
+        """
+    )
+    sub.add_argument(
+        '--sample',
+        type=sample_spec,
+        required=False,
+        help="""
+        Run schema tests against a sample of each model: either a
+        percentage of its rows (eg. 10%%) or at most this many rows (eg.
+        1000). Percentages can only be applied to table models, and use a
+        fixed seed so that every run reads the same rows.
+        """
+    )
 
     sub.set_defaults(cls=test_task.TestTask, which='test')
 
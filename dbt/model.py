@@ -27,7 +27,9 @@ class SourceConfig(object):
         'sort',
         'sql_where',
         'unique_key',
-        'sort_type'
+        'sort_type',
+        'timeout',
+        'source_tables',
     ]
 
     def __init__(self, active_project, own_project, fqn):
@@ -1,4 +1,6 @@
 import copy
+import hashlib
+import json
 import os
 import yaml
 
@@ -8,6 +10,8 @@ import dbt.utils
 
 import jinja2.runtime
 import dbt.clients.jinja
+import dbt.compat
+import dbt.version
 
 import dbt.contracts.graph.parsed
 import dbt.contracts.graph.unparsed
@@ -16,52 +20,62 @@ import dbt.contracts.project
 from dbt.utils import NodeType
 from dbt.logger import GLOBAL_LOGGER as logger
 
+# the default queries for schema tests, each of which selects the rows that
+# violate the test. adapters can replace any of them through their
+# `schema_test_templates`. they avoid CTEs, which postgres always
+# materializes in full: that would stop it from using an index, or from
+# stopping at the first row when the test is wrapped to fail fast.
 QUERY_VALIDATE_NOT_NULL = """
-with validation as (
-  select {field} as f
-  from {ref}
-)
-select count(*) from validation where f is null
+select {field} as f
+from {ref}
+where {field} is null
 """
 
 
 QUERY_VALIDATE_UNIQUE = """
-with validation as (
-  select {field} as f
-  from {ref}
-  where {field} is not null
-),
-validation_errors as (
-    select f from validation group by f having count(*) > 1
-)
-select count(*) from validation_errors
+select {field} as f
+from {ref}
+where {field} is not null
+group by {field}
+having count(*) > 1
 """
 
 
 QUERY_VALIDATE_ACCEPTED_VALUES = """
-with all_values as (
-  select distinct {field} as f
-  from {ref}
-),
-validation_errors as (
-    select f from all_values where f not in ({values_csv})
-)
-select count(*) from validation_errors
+select distinct {field} as f
+from {ref}
+where {field} not in ({values_csv})
 """
 
 
+# `not in (select ...)` can't be planned as an anti-join, since a single
+# null in the subquery makes it match nothing. `not exists` can.
 QUERY_VALIDATE_REFERENTIAL_INTEGRITY = """
-with parent as (
-  select {parent_field} as id
-  from {parent_ref}
-), child as (
+select child.id
+from (
   select {child_field} as id
   from {child_ref}
-)
-select count(*) from child
-where id not in (select id from parent) and id is not null
+) child
+where child.id is not null
+  and not exists (
+    select 1
+    from (
+      select {parent_field} as id
+      from {parent_ref}
+    ) parent
+    where parent.id = child.id
+  )
 """
 
+# `full` compares the whole source table against the whole archive on every
+# run. `incremental` only reads source rows updated since the last archive
+ARCHIVE_STRATEGIES = ['full', 'incremental']
+
+
+# use libyaml to load schema.yml files where it's available. it's much
+# faster than the pure python loader for large files
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 def get_path(resource_type, package_name, resource_name):
     return "{}.{}.{}".format(resource_type, package_name, resource_name)
@@ -161,8 +175,133 @@ def parse_macro_file(macro_file_path,
     return to_return
 
 
+class PartialParseCache(object):
+    """Stores what was captured while rendering each node at parse time: the
+    config given in the model, the macros it calls and its refs. These only
+    depend on the node's raw sql, so a node whose sql hasn't changed can be
+    parsed without rendering it again.
+
+    The config from dbt_project.yml isn't stored -- it's merged with the
+    stored in-model config every time, so that changes to the project config
+    take effect. Macros are re-parsed on every run, and aren't available
+    when models are rendered at parse time, so changes to them don't affect
+    what's stored here.
+
+    The contents of each sql file are stored too, along with the file's
+    mtime, size and inode when it was read, so that files whose stat hasn't
+    changed don't have to be read again.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.previous = {}
+        self.entries = {}
+
+        # absolute path -> {'stat': [mtime, size, inode], 'contents': ...}
+        self.previous_files = {}
+        self.files = {}
+
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as fh:
+                    stored = json.load(fh)
+
+                self.previous = stored.get('nodes', {})
+                self.previous_files = stored.get('files', {})
+            except (ValueError, AttributeError):
+                self.previous = {}
+                self.previous_files = {}
+
+    def get_file_contents(self, absolute_path, stat):
+        """the stored contents of the file, if they were read when it had the
+        given stat"""
+        entry = self.previous_files.get(absolute_path)
+
+        if stat is None or not isinstance(entry, dict) or \
+           entry.get('stat') != stat:
+            return None
+
+        return entry.get('contents')
+
+    def set_file_contents(self, absolute_path, stat, contents):
+        if stat is not None:
+            self.files[absolute_path] = {'stat': stat, 'contents': contents}
+
+    def get_key(self, node):
+        contents = '{}\n{}'.format(dbt.version.__version__,
+                                   node.get('raw_sql'))
+
+        return hashlib.sha1(contents.encode('utf-8')).hexdigest()
+
+    def get(self, unique_id, key):
+        entry = self.previous.get(unique_id)
+
+        if entry is None or entry.get('key') != key:
+            return None
+
+        self.entries[unique_id] = entry
+
+        return entry.get('result')
+
+    def set(self, unique_id, key, result):
+        self.entries[unique_id] = {'key': key, 'result': result}
+
+    def write(self):
+        if self.path is None:
+            return
+
+        cache_dir = os.path.dirname(self.path)
+
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        dbt.compat.write_file(self.path, json.dumps({
+            'nodes': self.entries,
+            'files': self.files,
+        }))
+
+
+def render_for_parse(node, config):
+    """capture the node's config and the macros it calls, and return its
+    refs. most nodes only call ref, config and macros with literal arguments,
+    and these calls are read from the template without rendering it. other
+    nodes are rendered with stub context."""
+    static = dbt.clients.jinja.extract_static_calls(
+        node.get('raw_sql'), node.get('package_name'))
+
+    if static is not None:
+        for opts in static.get('configs'):
+            config.update_in_model_config(opts)
+
+        node['depends_on']['macros'].extend(static.get('macros'))
+
+        return static.get('refs')
+
+    context = {}
+
+    # record the refs in the node, so the nodes it depends on are known
+    # before anything is compiled
+    refs = []
+
+    def ref(*args):
+        refs.append(list(args))
+        return ''
+
+    context['ref'] = ref
+    context['config'] = __config(node, config)
+    context['var'] = lambda *args: ''
+    context['target'] = property(lambda x: '', lambda x: x)
+    context['this'] = ''
+
+    dbt.clients.jinja.get_rendered(
+        node.get('raw_sql'), context, node,
+        capture_macros=True)
+
+    return refs
+
+
 def parse_node(node, node_path, root_project_config, package_project_config,
-               all_projects, tags=None, fqn_extra=None):
+               all_projects, tags=None, fqn_extra=None, parse_cache=None):
     logger.debug("Parsing {}".format(node_path))
     node = copy.deepcopy(node)
 
@@ -184,31 +323,52 @@ def parse_node(node, node_path, root_project_config, package_project_config,
     config = dbt.model.SourceConfig(
         root_project_config, package_project_config, fqn)
 
-    context = {}
+    cache_key = None
+    cached = None
 
-    context['ref'] = lambda *args: ''
-    context['config'] = __config(node, config)
-    context['var'] = lambda *args: ''
-    context['target'] = property(lambda x: '', lambda x: x)
-    context['this'] = ''
+    if parse_cache is not None:
+        cache_key = parse_cache.get_key(node)
+        cached = parse_cache.get(node_path, cache_key)
 
-    dbt.clients.jinja.get_rendered(
-        node.get('raw_sql'), context, node,
-        capture_macros=True)
+    if cached is not None:
+        config.in_model_config.update(cached.get('config'))
+        node['depends_on']['macros'] = list(cached.get('macros'))
+        refs = cached.get('refs')
 
+    else:
+        refs = render_for_parse(node, config)
+
+        if parse_cache is not None:
+            parse_cache.set(node_path, cache_key, {
+                'config': config.in_model_config.copy(),
+                'macros': list(node['depends_on']['macros']),
+                'refs': refs,
+            })
+
+    return finish_parsed_node(node, node_path, fqn, config, tags, refs)
+
+
+def finish_parsed_node(node, node_path, fqn, config, tags, refs):
     config_dict = node.get('config', {})
     config_dict.update(config.config)
 
-    node['unique_id'] = node_path
+    # identifiers are repeated in every node's fqn and depends_on lists, and
+    # across every copy of the node. interning stores each of them once.
+    node['unique_id'] = dbt.compat.intern(node_path)
     node['config'] = config_dict
     node['empty'] = (len(node.get('raw_sql').strip()) == 0)
-    node['fqn'] = fqn
+    node['fqn'] = [dbt.compat.intern(part) for part in fqn]
     node['tags'] = tags
+    node['refs'] = refs
+
+    for key in ('name', 'package_name', 'resource_type'):
+        node[key] = dbt.compat.intern(node.get(key))
 
     return node
 
 
-def parse_sql_nodes(nodes, root_project, projects, tags=None):
+def parse_sql_nodes(nodes, root_project, projects, tags=None,
+                    parse_cache=None):
     if tags is None:
         tags = set()
 
@@ -229,7 +389,8 @@ def parse_sql_nodes(nodes, root_project, projects, tags=None):
                                           root_project,
                                           projects.get(package_name),
                                           projects,
-                                          tags=tags)
+                                          tags=tags,
+                                          parse_cache=parse_cache)
 
     dbt.contracts.graph.parsed.validate_nodes(to_return)
 
@@ -237,7 +398,8 @@ def parse_sql_nodes(nodes, root_project, projects, tags=None):
 
 
 def load_and_parse_sql(package_name, root_project, all_projects, root_dir,
-                       relative_dirs, resource_type, tags=None):
+                       relative_dirs, resource_type, tags=None,
+                       file_scanner=None, parse_cache=None):
     extension = "[!.#~]*.sql"
 
     if tags is None:
@@ -246,7 +408,10 @@ def load_and_parse_sql(package_name, root_project, all_projects, root_dir,
     if dbt.flags.STRICT_MODE:
         dbt.contracts.project.validate_list(all_projects)
 
-    file_matches = dbt.clients.system.find_matching(
+    if file_scanner is None:
+        file_scanner = dbt.clients.system.FileScanner()
+
+    file_matches = file_scanner.find_matching(
         root_dir,
         relative_dirs,
         extension)
@@ -254,8 +419,23 @@ def load_and_parse_sql(package_name, root_project, all_projects, root_dir,
     result = []
 
     for file_match in file_matches:
-        file_contents = dbt.clients.system.load_file_contents(
-            file_match.get('absolute_path'))
+        absolute_path = file_match.get('absolute_path')
+        file_stat = file_scanner.get_stat(absolute_path)
+        file_contents = None
+
+        # files with the same mtime, size and inode as when their contents
+        # were cached are read from the cache instead
+        if parse_cache is not None:
+            file_contents = parse_cache.get_file_contents(absolute_path,
+                                                          file_stat)
+
+        if file_contents is None:
+            file_contents = dbt.clients.system.load_file_contents(
+                absolute_path)
+
+        if parse_cache is not None:
+            parse_cache.set_file_contents(absolute_path, file_stat,
+                                          file_contents)
 
         parts = dbt.utils.split_path(file_match.get('relative_path', ''))
         name, _ = os.path.splitext(parts[-1])
@@ -275,11 +455,13 @@ def load_and_parse_sql(package_name, root_project, all_projects, root_dir,
             'raw_sql': file_contents
         })
 
-    return parse_sql_nodes(result, root_project, all_projects, tags)
+    return parse_sql_nodes(result, root_project, all_projects, tags,
+                           parse_cache=parse_cache)
 
 
 def load_and_parse_macros(package_name, root_project, all_projects, root_dir,
-                          relative_dirs, resource_type, tags=None):
+                          relative_dirs, resource_type, tags=None,
+                          file_scanner=None):
     extension = "[!.#~]*.sql"
 
     if tags is None:
@@ -288,7 +470,10 @@ def load_and_parse_macros(package_name, root_project, all_projects, root_dir,
     if dbt.flags.STRICT_MODE:
         dbt.contracts.project.validate_list(all_projects)
 
-    file_matches = dbt.clients.system.find_matching(
+    if file_scanner is None:
+        file_scanner = dbt.clients.system.FileScanner()
+
+    file_matches = file_scanner.find_matching(
         root_dir,
         relative_dirs,
         extension)
@@ -311,11 +496,11 @@ def load_and_parse_macros(package_name, root_project, all_projects, root_dir,
     return result
 
 
-def parse_schema_tests(tests, root_project, projects):
+def parse_schema_tests(tests, root_project, projects, templates=None):
     to_return = {}
 
     for test in tests:
-        test_yml = yaml.safe_load(test.get('raw_yml'))
+        test_yml = yaml.load(test.get('raw_yml'), Loader=YamlLoader)
 
         if test_yml is None:
             continue
@@ -333,7 +518,8 @@ def parse_schema_tests(tests, root_project, projects):
                         test, model_name, config, test_type,
                         root_project,
                         projects.get(test.get('package_name')),
-                        all_projects=projects)
+                        all_projects=projects,
+                        templates=templates)
 
                     if to_add is not None:
                         to_return[to_add.get('unique_id')] = to_add
@@ -343,16 +529,27 @@ def parse_schema_tests(tests, root_project, projects):
 
 def parse_schema_test(test_base, model_name, test_config, test_type,
                       root_project_config, package_project_config,
-                      all_projects):
+                      all_projects, templates=None):
+    """`templates` replaces the default query for any of the test types, eg.
+    with the shape that runs best on the target warehouse"""
+    if templates is None:
+        templates = {}
+
+    refs = [[model_name]]
+
     if test_type == 'not_null':
-        raw_sql = QUERY_VALIDATE_NOT_NULL.format(
+        template = templates.get('not_null', QUERY_VALIDATE_NOT_NULL)
+        raw_sql = template.format(
             ref="{{ref('"+model_name+"')}}", field=test_config)
         name_key = test_config
+        test_metadata = {'type': test_type, 'field': test_config}
 
     elif test_type == 'unique':
-        raw_sql = QUERY_VALIDATE_UNIQUE.format(
+        template = templates.get('unique', QUERY_VALIDATE_UNIQUE)
+        raw_sql = template.format(
             ref="{{ref('"+model_name+"')}}", field=test_config)
         name_key = test_config
+        test_metadata = {'type': test_type, 'field': test_config}
 
     elif test_type == 'relationships':
         if not isinstance(test_config, dict):
@@ -362,7 +559,9 @@ def parse_schema_test(test_base, model_name, test_config, test_type,
         parent_field = test_config.get('field')
         parent_model = test_config.get('to')
 
-        raw_sql = QUERY_VALIDATE_REFERENTIAL_INTEGRITY.format(
+        template = templates.get('relationships',
+                                 QUERY_VALIDATE_REFERENTIAL_INTEGRITY)
+        raw_sql = template.format(
             child_field=child_field,
             child_ref="{{ref('"+model_name+"')}}",
             parent_field=parent_field,
@@ -370,18 +569,28 @@ def parse_schema_test(test_base, model_name, test_config, test_type,
 
         name_key = '{}_to_{}_{}'.format(child_field, parent_model,
                                         parent_field)
+        refs = [[parent_model], [model_name]]
+        test_metadata = {'type': test_type, 'from': child_field,
+                         'to': parent_model, 'field': parent_field}
 
     elif test_type == 'accepted_values':
         if not isinstance(test_config, dict):
             return None
 
-        raw_sql = QUERY_VALIDATE_ACCEPTED_VALUES.format(
+        values_csv = "'{}'".format(
+            "','".join([str(v) for v in test_config.get('values', [])]))
+
+        template = templates.get('accepted_values',
+                                 QUERY_VALIDATE_ACCEPTED_VALUES)
+        raw_sql = template.format(
             ref="{{ref('"+model_name+"')}}",
             field=test_config.get('field', ''),
-            values_csv="'{}'".format(
-                "','".join([str(v) for v in test_config.get('values', [])])))
+            values_csv=values_csv)
 
         name_key = test_config.get('field')
+        test_metadata = {'type': test_type,
+                         'field': test_config.get('field', ''),
+                         'values_csv': values_csv}
 
     else:
         raise dbt.exceptions.ValidationException(
@@ -398,27 +607,43 @@ def parse_schema_test(test_base, model_name, test_config, test_type,
         'package_name': test_base.get('package_name'),
         'root_path': test_base.get('root_path'),
         'path': pseudo_path,
-        'raw_sql': raw_sql
+        'raw_sql': raw_sql,
+        'depends_on': {
+            'nodes': [],
+            'macros': [],
+        },
+        # what the test checks, so that tests on the same model can be run
+        # together. see dbt.runner.get_fused_test_sql
+        'test_metadata': test_metadata,
     }
 
-    return parse_node(to_return,
-                      get_test_path(test_base.get('package_name'),
-                                    name),
-                      root_project_config,
-                      package_project_config,
-                      all_projects,
-                      tags={'schema'},
-                      fqn_extra=None)
+    # the sql is generated here, so there's no need to render it to find
+    # its refs. it calls no macros and sets no config.
+    fqn = get_fqn(pseudo_path, package_project_config)
+
+    config = dbt.model.SourceConfig(
+        root_project_config, package_project_config, fqn)
+
+    return finish_parsed_node(to_return,
+                              get_test_path(test_base.get('package_name'),
+                                            name),
+                              fqn,
+                              config,
+                              {'schema'},
+                              refs)
 
 
 def load_and_parse_yml(package_name, root_project, all_projects, root_dir,
-                       relative_dirs):
+                       relative_dirs, file_scanner=None, templates=None):
     extension = "[!.#~]*.yml"
 
     if dbt.flags.STRICT_MODE:
         dbt.contracts.project.validate_list(all_projects)
 
-    file_matches = dbt.clients.system.find_matching(
+    if file_scanner is None:
+        file_scanner = dbt.clients.system.FileScanner()
+
+    file_matches = file_scanner.find_matching(
         root_dir,
         relative_dirs,
         extension)
@@ -441,7 +666,8 @@ def load_and_parse_yml(package_name, root_project, all_projects, root_dir,
             'raw_yml': file_contents
         })
 
-    return parse_schema_tests(result, root_project, all_projects)
+    return parse_schema_tests(result, root_project, all_projects,
+                              templates=templates)
 
 
 def parse_archives_from_projects(root_project, all_projects):
@@ -480,6 +706,15 @@ def parse_archives_from_project(project):
             config = table.copy()
             config['source_schema'] = archive_config.get('source_schema')
             config['target_schema'] = archive_config.get('target_schema')
+            config['strategy'] = table.get(
+                'strategy', archive_config.get('strategy', 'full'))
+
+            if config['strategy'] not in ARCHIVE_STRATEGIES:
+                raise dbt.exceptions.ValidationException(
+                    'Unknown archive strategy {} for {}, expected one '
+                    'of: {}'.format(config['strategy'],
+                                    table.get('target_table'),
+                                    ', '.join(ARCHIVE_STRATEGIES)))
 
             archives.append({
                 'name': table.get('target_table'),
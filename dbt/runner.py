@@ -1,10 +1,16 @@
 from __future__ import print_function
 
 import hashlib
+import json
 import psycopg2
+import psycopg2.extensions
 import os
 import time
 import itertools
+import signal
+import threading
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
 
 from dbt.adapters.factory import get_adapter
@@ -13,16 +19,31 @@ from dbt.logger import GLOBAL_LOGGER as logger
 from dbt.utils import get_materialization, NodeType, is_type
 
 import dbt.clients.jinja
+import dbt.compat
 import dbt.compilation
 import dbt.exceptions
+import dbt.flags
 import dbt.linker
 import dbt.tracking
 import dbt.schema
+import dbt.graph.queue
 import dbt.graph.selector
 import dbt.model
 
 from multiprocessing.dummy import Pool as ThreadPool
 
+TIMEOUT_STATUS = "TIMEOUT"
+CANCEL_STATUS = "CANCEL"
+
+RESULTS_FILE_NAME = 'run_results.json'
+BUILD_STATE_FILE_NAME = 'build_state.json'
+TEST_CACHE_FILE_NAME = 'test_cache.json'
+
+SIGNAL_NAMES = {
+    signal.SIGINT: 'SIGINT',
+    signal.SIGTERM: 'SIGTERM',
+}
+
 ABORTED_TRANSACTION_STRING = ("current transaction is aborted, commands "
                               "ignored until end of transaction block")
 
@@ -39,6 +60,152 @@ def get_hashed_contents(model):
     return hashlib.md5(model.get('raw_sql').encode('utf-8')).hexdigest()
 
 
+def get_fingerprints(nodes, source_state=None):
+    """fingerprint each node by its compiled sql, its config and the
+    fingerprints of its parents. a node's fingerprint changes whenever the
+    node or anything upstream of it changes. `nodes` maps unique_id to a
+    compiled node.
+
+    `source_state` optionally maps unique_id to the freshness of the source
+    tables the node reads from. if a node's freshness is None (unknown), the
+    node and everything downstream of it has a fingerprint of None."""
+    if source_state is None:
+        source_state = {}
+
+    fingerprints = {}
+
+    def fingerprint(unique_id):
+        if unique_id not in fingerprints:
+            node = nodes[unique_id]
+            parents = [parent for parent
+                       in node.get('depends_on', {}).get('nodes', [])
+                       if parent in nodes]
+
+            parent_fingerprints = [fingerprint(parent)
+                                   for parent in sorted(parents)]
+
+            if None in parent_fingerprints or \
+               (unique_id in source_state and
+                    source_state[unique_id] is None):
+                fingerprints[unique_id] = None
+                return None
+
+            if node.get('execution_steps'):
+                sql = json.dumps(node.get('execution_steps'), sort_keys=True,
+                                 default=str)
+            else:
+                sql = node.get('injected_sql') or ''
+
+            digest = hashlib.md5()
+            digest.update(dbt.compat.to_string(sql).encode('utf-8'))
+            digest.update(json.dumps(node.get('config', {}), sort_keys=True,
+                                     default=str).encode('utf-8'))
+            digest.update(dbt.compat.to_string(
+                source_state.get(unique_id, '')).encode('utf-8'))
+
+            for parent_fingerprint in parent_fingerprints:
+                digest.update(parent_fingerprint.encode('utf-8'))
+
+            fingerprints[unique_id] = digest.hexdigest()
+
+        return fingerprints[unique_id]
+
+    for unique_id in nodes:
+        fingerprint(unique_id)
+
+    return fingerprints
+
+
+def get_relation_versions(nodes, builds, source_state=None,
+                          table_state=None):
+    """returns unique_id -> a value which changes whenever the rows in the
+    model's relation might have, or None if that can't be told.
+
+    tables and incremental models only change when they're built, so their
+    version is the id of the invocation which last built them, from
+    `builds`.
+    `table_state` optionally maps them to their own row counters, which
+    catches writes made outside of dbt. views and ephemeral models change
+    along with everything they read: the models they ref, and their
+    `source_tables`, whose freshness is given by `source_state` as in
+    get_fingerprints. a view or ephemeral model which doesn't set
+    `source_tables` may read raw tables which dbt can't see, so it has no
+    version. `source_tables: []` declares that it only reads its refs."""
+    if source_state is None:
+        source_state = {}
+
+    if table_state is None:
+        table_state = {}
+
+    versions = {}
+
+    def version(unique_id):
+        if unique_id not in versions:
+            node = nodes.get(unique_id)
+
+            if node is None or not is_type(node, NodeType.Model):
+                versions[unique_id] = None
+                return None
+
+            materialization = get_materialization(node)
+
+            if materialization in ('table', 'incremental'):
+                parts = [builds.get(unique_id),
+                         table_state.get(unique_id, '')]
+            elif node.get('config', {}).get('source_tables') is None:
+                parts = [None]
+            else:
+                parents = node.get('depends_on', {}).get('nodes', [])
+                parts = [source_state.get(unique_id, '')] + \
+                    [version(parent) for parent in sorted(parents)]
+
+                if materialization != 'ephemeral':
+                    parts.append(builds.get(unique_id))
+
+            if None in parts:
+                versions[unique_id] = None
+            else:
+                versions[unique_id] = hashlib.md5(
+                    '|'.join(parts).encode('utf-8')).hexdigest()
+
+        return versions[unique_id]
+
+    for unique_id in nodes:
+        version(unique_id)
+
+    return versions
+
+
+def get_test_cache_keys(tests, relation_versions):
+    """returns unique_id -> the key under which each test's result is
+    cached: its sql and the versions of the relations it reads. only schema
+    tests are cached, since data tests can read tables without ref. the key
+    is None if the test can't be cached."""
+    keys = {}
+
+    for test in tests:
+        unique_id = test.get('unique_id')
+        parents = test.get('depends_on', {}).get('nodes', [])
+        versions = [relation_versions.get(parent)
+                    for parent in sorted(parents)]
+
+        if test.get('test_metadata') is None or \
+           not test.get('execution_steps') or None in versions:
+            keys[unique_id] = None
+            continue
+
+        digest = hashlib.md5()
+        digest.update(dbt.compat.to_string(
+            test.get('execution_steps')[-1].get('sql')).encode('utf-8'))
+
+        for version in versions:
+            digest.update(version.encode('utf-8'))
+
+        keys[unique_id] = digest.hexdigest()
+
+    return keys
+
+
 def is_enabled(model):
     return model.get('config', {}).get('enabled') is True
 
@@ -132,8 +299,12 @@ def print_test_result_line(result, schema_name, index, total):
     model = result.node
     info = 'PASS'
 
-    if result.errored:
+    if result.timed_out:
+        info = "TIMEOUT"
+    elif result.errored:
         info = "ERROR"
+    elif result.status > 0 and dbt.flags.FAST_FAIL_TESTS:
+        info = 'FAIL'
     elif result.status > 0:
         info = 'FAIL {}'.format(result.status)
     elif result.status == 0:
@@ -141,10 +312,16 @@ def print_test_result_line(result, schema_name, index, total):
     else:
         raise RuntimeError("unexpected status: {}".format(result.status))
 
+    # tests run with --sample only read part of the model they test
+    sampled = ' (sampled)' if model.get('sampled') else ''
+    cached = ' (cached)' if getattr(result, 'cached', False) else ''
+
     print_fancy_output_line(
-        "{info} {name}".format(
+        "{info} {name}{sampled}{cached}".format(
             info=info,
-            name=model.get('name')),
+            name=model.get('name'),
+            sampled=sampled,
+            cached=cached),
         info,
         index,
         total,
@@ -173,7 +350,7 @@ def execute_test(profile, test):
     adapter = get_adapter(profile)
     _, cursor = adapter.execute_one(
         profile,
-        test.get('wrapped_sql'),
+        test.get('execution_steps')[-1].get('sql'),
         test.get('name'))
 
     rows = cursor.fetchall()
@@ -182,25 +359,170 @@ def execute_test(profile, test):
 
     cursor.close()
 
+    return get_test_status(test, rows)
+
+
+def get_test_status(test, rows):
     if len(rows) > 1:
         raise RuntimeError(
             "Bad test {name}: Returned {num_rows} rows instead of 1"
-            .format(name=test.name, num_rows=len(rows)))
+            .format(name=test.get('name'), num_rows=len(rows)))
 
     row = rows[0]
     if len(row) > 1:
         raise RuntimeError(
             "Bad test {name}: Returned {num_cols} cols instead of 1"
-            .format(name=test.name, num_cols=len(row)))
+            .format(name=test.get('name'), num_cols=len(row)))
 
     return row[0]
 
 
+# schema tests which only read the model they test. these can be run
+# together in a single query over the model
+FUSABLE_TEST_TYPES = ('not_null', 'unique', 'accepted_values')
+
+
+def get_fused_test_expression(test):
+    test_metadata = test.get('test_metadata')
+    test_type = test_metadata.get('type')
+    field = test_metadata.get('field')
+
+    if test_type == 'not_null':
+        return "sum(case when {field} is null then 1 else 0 end)" \
+            .format(field=field)
+
+    elif test_type == 'unique':
+        # zero exactly when the standalone test is. when it isn't, this is
+        # the number of duplicate rows rather than of duplicated values
+        return "count({field}) - count(distinct {field})" \
+            .format(field=field)
+
+    elif test_type == 'accepted_values':
+        return ("count(distinct case when {field} not in ({values_csv}) "
+                "then {field} end)").format(
+                    field=field,
+                    values_csv=test_metadata.get('values_csv'))
+
+    raise RuntimeError("Can't fuse test {}".format(test.get('unique_id')))
+
+
+def get_fused_test_sql(relation, tests):
+    """a query over `relation` which returns a single row, with a column of
+    failures for each of `tests`"""
+    columns = [
+        "coalesce({}, 0) as test_{}".format(
+            get_fused_test_expression(test), i)
+        for i, test in enumerate(tests)
+    ]
+
+    return "select\n  {}\nfrom {}".format(",\n  ".join(columns), relation)
+
+
+def get_fused_test_nodes(tests, graph_nodes, schema_name):
+    """group schema tests by the model they test. returns a list of test
+    nodes to run: tests which can't be fused are returned as they are, and
+    each group of fusable tests on the same model is replaced by a single
+    node whose `fused_tests` are the tests in the group."""
+    to_run = []
+    by_model = {}
+
+    for test in tests:
+        test_type = test.get('test_metadata', {}).get('type')
+        parents = test.get('depends_on', {}).get('nodes', [])
+
+        if test_type not in FUSABLE_TEST_TYPES or len(parents) != 1 or \
+           get_materialization(graph_nodes[parents[0]]) == 'ephemeral':
+            to_run.append(test)
+        else:
+            by_model.setdefault(parents[0], []).append(test)
+
+    for model_id, model_tests in sorted(by_model.items()):
+        if len(model_tests) == 1:
+            to_run.extend(model_tests)
+            continue
+
+        model = graph_nodes[model_id]
+        relation = '"{}"."{}"'.format(schema_name, model.get('name'))
+
+        # every test in the group was compiled against the same sample
+        sample_sql = model_tests[0].get('sampled_relations', {}).get(model_id)
+
+        if sample_sql is not None:
+            relation = '(\n{}\n) dbt_sample'.format(sample_sql)
+
+        sql = get_fused_test_sql(relation, model_tests)
+
+        to_run.append({
+            'unique_id': 'test.fused.{}'.format(model_id),
+            'name': 'fused_tests_on_{}'.format(model.get('name')),
+            'resource_type': NodeType.Test,
+            'package_name': model.get('package_name'),
+            'build_path': model.get('build_path'),
+            'config': {},
+            'tags': set(),
+            'raw_sql': sql,
+            'execution_steps': [{'sql': sql}],
+            'fused_tests': model_tests,
+            'sampled': sample_sql is not None,
+        })
+
+    return to_run
+
+
+def execute_fused_tests(profile, node):
+    adapter = get_adapter(profile)
+    _, cursor = adapter.execute_one(
+        profile,
+        node.get('execution_steps')[-1].get('sql'),
+        node.get('name'))
+
+    rows = cursor.fetchall()
+
+    adapter.commit(profile)
+
+    cursor.close()
+
+    return get_fused_test_statuses(node, rows)
+
+
+def get_fused_test_statuses(node, rows):
+    num_tests = len(node.get('fused_tests'))
+
+    if len(rows) != 1 or len(rows[0]) != num_tests:
+        raise RuntimeError(
+            "Bad fused test {name}: expected 1 row of {num_tests} cols"
+            .format(name=node.get('name'), num_tests=num_tests))
+
+    return list(rows[0])
+
+
+def split_fused_result(result):
+    """one result per test for the result of running a fused test node"""
+    node = result.node
+
+    if node.get('fused_tests') is None:
+        return [result]
+
+    if isinstance(result.status, list):
+        statuses = result.status
+    else:
+        statuses = [result.status] * len(node.get('fused_tests'))
+
+    return [RunModelResult(test,
+                           error=result.error,
+                           skip=result.skip,
+                           status=status,
+                           execution_time=result.execution_time)
+            for test, status in zip(node.get('fused_tests'), statuses)]
+
+
 def print_model_result_line(result, schema_name, index, total):
     model = result.node
     info = 'OK created'
 
-    if result.errored:
+    if result.timed_out:
+        info = 'TIMEOUT creating'
+    elif result.errored:
         info = 'ERROR creating'
 
     print_fancy_output_line(
@@ -231,7 +553,25 @@ def print_results_line(results, execution_time):
         .format(stat_line=stat_line, execution_time=execution_time))
 
 
-def execute_model(profile, model, existing):
+def get_blocking_tests(graph, selected_nodes):
+    """returns a dict of model -> the selected schema tests on it, for
+    `dbt build --block-on-test-failure`. only tests which read nothing but
+    the model are included: a relationships test also reads another model,
+    which could be downstream of the one it blocks."""
+    blocking_tests = {}
+
+    for unique_id in selected_nodes:
+        node = graph.node.get(unique_id)
+        parents = list(graph.predecessors(unique_id))
+
+        if is_type(node, NodeType.Test) and \
+           node.get('test_metadata') is not None and len(parents) == 1:
+            blocking_tests.setdefault(parents[0], []).append(unique_id)
+
+    return blocking_tests
+
+
+def execute_model(profile, model, existing, timeout=None):
     adapter = get_adapter(profile)
     schema = adapter.get_default_schema(profile)
 
@@ -277,7 +617,7 @@ def execute_model(profile, model, existing):
         # views either.
         pass
     elif is_enabled(model) and get_materialization(model) != 'ephemeral':
-        result = adapter.execute_model(profile, model)
+        result = adapter.execute_model(profile, model, timeout)
 
     # DROP OLD RELATION AND RENAME
     if dbt.flags.NON_DESTRUCTIVE:
@@ -299,12 +639,14 @@ def execute_model(profile, model, existing):
                        to_name=model.get('name'),
                        model_name=model.get('name'))
 
-    return result
+    # each thread has its own connection, so commit the drop and rename here
+    # rather than leaving them for the next model on this thread
+    adapter.commit(profile)
 
+    return result
 
-def execute_archive(profile, node, context):
-    adapter = get_adapter(profile)
 
+def get_archive_steps(profile, adapter, node, context):
     node_cfg = node.get('config', {})
 
     source_columns = adapter.get_columns_in_table(
@@ -342,18 +684,46 @@ def execute_archive(profile, node, context):
     select = dbt.clients.jinja.get_rendered(dbt.templates.SCDArchiveTemplate,
                                             template_ctx)
 
-    insert_stmt = dbt.templates.ArchiveInsertTemplate().wrap(
+    missing_columns = adapter.get_missing_columns(
+        profile,
+        node_cfg.get('source_schema'), node_cfg.get('source_table'),
+        node_cfg.get('target_schema'), node_cfg.get('target_table'))
+
+    dest_columns = adapter.get_columns_in_table(
+        profile,
+        node_cfg.get('target_schema'),
+        node_cfg.get('target_table')) + missing_columns
+
+    steps = dbt.templates.ArchiveInsertTemplate().wrap(
         schema=node_cfg.get('target_schema'),
         table=node_cfg.get('target_table'),
         query=select,
-        unique_key=node_cfg.get('unique_key'))
+        missing_columns=missing_columns,
+        dest_columns=dest_columns)
+
+    return steps
 
-    node['wrapped_sql'] = dbt.clients.jinja.get_rendered(insert_stmt,
-                                                         template_ctx)
+
+def execute_archive(profile, node, context, timeout=None):
+    """archives run concurrently, each on its own thread's connection. every
+    statement for an archive, including the lookups used to build it, runs
+    in one transaction which is committed by `execute_model`."""
+    adapter = get_adapter(profile)
+
+    try:
+        steps = get_archive_steps(profile, adapter, node, context)
+    except Exception:
+        # don't leave the transaction open for the next archive to run on
+        adapter.rollback(profile)
+        raise
+
+    node['execution_steps'] = steps
+    node['wrapped_sql'] = dbt.templates.steps_to_sql(steps)
 
     result = adapter.execute_model(
         profile=profile,
-        model=node)
+        model=node,
+        timeout=timeout)
 
     return result
 
@@ -385,12 +755,13 @@ def run_hooks(profile, hooks, context, source):
 
 class RunModelResult(object):
     def __init__(self, node, error=None, skip=False, status=None,
-                 execution_time=0):
+                 execution_time=0, cached=False):
         self.node = node
         self.error = error
         self.skip = skip
         self.status = status
         self.execution_time = execution_time
+        self.cached = cached
 
     @property
     def errored(self):
@@ -400,6 +771,50 @@ class RunModelResult(object):
     def skipped(self):
         return self.skip
 
+    @property
+    def timed_out(self):
+        return self.status == TIMEOUT_STATUS
+
+    @property
+    def failed(self):
+        """True if this is a test which ran and found bad rows"""
+        return is_type(self.node, NodeType.Test) and not self.errored and \
+            not self.skipped and self.status is not None and self.status > 0
+
+
+class Watchdog(object):
+    """cancels the statement running on `connection` if the block hasn't
+    finished within `timeout` seconds."""
+
+    def __init__(self, profile, connection, timeout):
+        self.profile = profile
+        self.connection = connection
+        self.timeout = timeout
+        self.fired = False
+        self.timer = None
+
+    def cancel(self):
+        self.fired = True
+        logger.debug("Timed out after {}s, cancelling".format(self.timeout))
+
+        try:
+            adapter = get_adapter(self.profile)
+            adapter.cancel_connection(self.profile, self.connection)
+        except Exception as e:
+            logger.debug("Error cancelling connection: {}".format(str(e)))
+
+    def __enter__(self):
+        if self.timeout is not None:
+            self.timer = threading.Timer(self.timeout, self.cancel)
+            self.timer.daemon = True
+            self.timer.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.timer is not None:
+            self.timer.cancel()
+
 
 class RunManager(object):
     def __init__(self, project, target_path, args):
@@ -431,6 +846,35 @@ class RunManager(object):
             return adapter.table_exists(
                 profile, schema, table)
 
+        self.fail_fast = getattr(self.args, 'fail_fast', False)
+        self.failed_node = None
+        self.interrupted_by = None
+        self.stop_reason = None
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        self.cancelled = {}
+
+        # unique_id -> fingerprint of every compiled node, and the results
+        # carried over from the previous run when resuming
+        self.fingerprints = {}
+        self.resumed_results = []
+
+        # unique_id -> fingerprint of every compiled node, including the
+        # freshness of its source tables. only set with --skip-unchanged
+        self.build_fingerprints = {}
+
+        # unique_id -> the cache key of each selected test, and the passes
+        # read from the cache instead of being run. only set by dbt test
+        self.test_cache_keys = {}
+        self.cached_results = []
+
+        deadline = getattr(self.args, 'deadline', None)
+
+        if deadline is None:
+            self.deadline = None
+        else:
+            self.deadline = time.time() + deadline
+
         self.context = {
             "run_started_at": datetime.now(),
             "invocation_id": dbt.tracking.active_user.invocation_id,
@@ -440,10 +884,17 @@ class RunManager(object):
         }
 
     def inject_runtime_config(self, node):
-        sql = dbt.clients.jinja.get_rendered(node.get('wrapped_sql'),
-                                             self.context)
+        node = node.copy()
+        steps = []
+
+        for step in node.get('execution_steps', []):
+            if step.get('render') is not None:
+                step = step.copy()
+                step['sql'] = dbt.clients.jinja.get_rendered_for_runtime(
+                    step['sql'], step['render'], self.context, node)
+            steps.append(step)
 
-        node['wrapped_sql'] = sql
+        node['execution_steps'] = steps
 
         return node
 
@@ -458,7 +909,23 @@ class RunManager(object):
 
         return dbt.linker.from_file(graph_file)
 
-    def execute_node(self, node, existing):
+    def get_timeout(self, node):
+        """returns the number of seconds `node` may run for: the smaller of
+        its `timeout` config and the time left before the run deadline, or
+        None if neither is set."""
+        timeouts = [node.get('config', {}).get('timeout')]
+
+        if self.deadline is not None:
+            timeouts.append(self.deadline - time.time())
+
+        timeouts = [t for t in timeouts if t is not None]
+
+        if len(timeouts) == 0:
+            return None
+
+        return min(timeouts)
+
+    def execute_node(self, node, existing, timeout=None):
         profile = self.project.run_environment()
 
         logger.debug("executing node %s", node.get('unique_id'))
@@ -469,11 +936,14 @@ class RunManager(object):
         node = self.inject_runtime_config(node)
 
         if is_type(node, NodeType.Model):
-            result = execute_model(profile, node, existing)
+            result = execute_model(profile, node, existing, timeout)
+        elif is_type(node, NodeType.Test) and \
+                node.get('fused_tests') is not None:
+            result = execute_fused_tests(profile, node)
         elif is_type(node, NodeType.Test):
             result = execute_test(profile, node)
         elif is_type(node, NodeType.Archive):
-            result = execute_archive(profile, node, self.context)
+            result = execute_archive(profile, node, self.context, timeout)
 
         return result
 
@@ -484,8 +954,33 @@ class RunManager(object):
 
         error = None
 
+        timeout = self.get_timeout(node)
+
+        if timeout is not None and timeout <= 0:
+            return RunModelResult(
+                node,
+                error="Not started: the run deadline has passed",
+                status=TIMEOUT_STATUS)
+
+        if self.stop_reason is not None:
+            # failing fast or interrupted: don't start anything new
+            return RunModelResult(node, skip=True)
+
+        profile = self.project.run_environment()
+        connection = get_adapter(profile).get_connection(profile)
+        watchdog = Watchdog(profile, connection, timeout)
+
+        with self.in_flight_lock:
+            self.in_flight[node.get('unique_id')] = (node, connection)
+
         try:
-            status = self.execute_node(node, existing)
+            with watchdog:
+                status = self.execute_node(node, existing, timeout)
+        except psycopg2.extensions.QueryCanceledError as e:
+            error = "Error executing {filepath}\n{error}".format(
+                filepath=node.get('build_path'), error=str(e).strip())
+            status = TIMEOUT_STATUS
+            logger.debug(error)
         except (RuntimeError,
                 dbt.exceptions.ProgrammingException,
                 psycopg2.ProgrammingError,
@@ -507,14 +1002,414 @@ class RunManager(object):
                          error=str(e).strip()))
             logger.debug(error)
             raise e
+        finally:
+            with self.in_flight_lock:
+                self.in_flight.pop(node.get('unique_id'), None)
 
         execution_time = time.time() - start_time
 
+        if watchdog.fired and error is not None:
+            error = "Timed out after {:0.2f}s\n{}".format(timeout, error)
+            status = TIMEOUT_STATUS
+
+        elif node.get('unique_id') in self.cancelled and error is not None:
+            error = "Cancelled because {}\n{}".format(
+                self.stop_reason, error)
+            status = CANCEL_STATUS
+
         return RunModelResult(node,
                               error=error,
                               status=status,
                               execution_time=execution_time)
 
+    def cancel_in_flight(self, reason):
+        """stop starting new nodes, and cancel the queries of every node
+        which is currently running"""
+        self.stop_reason = reason
+
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+
+        with self.in_flight_lock:
+            in_flight = list(self.in_flight.items())
+
+        for unique_id, (node, connection) in in_flight:
+            self.cancelled[unique_id] = node
+
+            try:
+                adapter.cancel_connection(profile, connection)
+            except Exception as e:
+                logger.debug("Error cancelling {}: {}".format(unique_id,
+                                                              str(e)))
+
+    def fail_fast_on(self, run_model_result):
+        """if running with --fail-fast, stop running new nodes and cancel
+        every query in flight as soon as any node fails."""
+        if not self.fail_fast or not run_model_result.errored or \
+           self.stop_reason is not None:
+            return
+
+        self.failed_node = run_model_result.node
+
+        logger.info("Failing fast: {} failed. Cancelling running queries."
+                    .format(self.failed_node.get('unique_id')))
+
+        self.cancel_in_flight("{} failed".format(
+            self.failed_node.get('unique_id')))
+
+    def interrupt(self, signum, frame=None):
+        if self.interrupted_by is not None:
+            # a second signal exits immediately
+            raise KeyboardInterrupt()
+
+        self.interrupted_by = SIGNAL_NAMES.get(signum, str(signum))
+
+        logger.info("Received {}. Cancelling running queries, press Ctrl-C "
+                    "again to exit immediately.".format(self.interrupted_by))
+
+        self.cancel_in_flight("dbt received {}".format(self.interrupted_by))
+
+    @contextmanager
+    def cancel_on_signals(self):
+        """cancel running queries on SIGINT or SIGTERM instead of leaving
+        them running on the warehouse after dbt exits"""
+        previous = {}
+
+        for signum in SIGNAL_NAMES:
+            try:
+                previous[signum] = signal.signal(signum, self.interrupt)
+            except ValueError:
+                # signal handlers can only be installed on the main thread
+                pass
+
+        try:
+            yield
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+            if self.interrupted_by is not None:
+                self.drop_cancelled_relations()
+
+    def drop_cancelled_relations(self):
+        """drop the temporary relations of models that were cancelled. on
+        postgres and redshift these are rolled back with the transaction,
+        but snowflake commits ddl immediately."""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+
+        models = [node for node in self.cancelled.values()
+                  if is_type(node, NodeType.Model)]
+
+        if len(models) == 0 or dbt.flags.NON_DESTRUCTIVE:
+            return
+
+        try:
+            existing = adapter.query_for_existing(
+                profile, adapter.get_default_schema(profile))
+
+            for node in models:
+                tmp_name = '{}__dbt_tmp'.format(node.get('name'))
+
+                if existing.get(tmp_name) is not None:
+                    adapter.drop(profile, tmp_name, existing.get(tmp_name),
+                                 node.get('name'))
+
+            adapter.commit(profile)
+        except Exception as e:
+            logger.info("Error dropping temporary relations: {}"
+                        .format(str(e)))
+
+    def write_results(self, results):
+        """write target/run_results.json, recording the outcome of every node
+        that ran (or was skipped) in this invocation. when resuming, the
+        results of nodes which finished in an earlier run are carried over
+        so that the run can be resumed again."""
+        serialized = {
+            'invocation_id': self.context['invocation_id'],
+            'run_started_at': self.context['run_started_at'].isoformat(),
+            'interrupted': self.interrupted_by is not None,
+            'results': self.resumed_results + [{
+                'unique_id': result.node.get('unique_id'),
+                'status': result.status,
+                'error': result.error,
+                'skipped': result.skipped,
+                'execution_time': result.execution_time,
+                'fingerprint': self.fingerprints.get(
+                    result.node.get('unique_id')),
+            } for result in results]
+        }
+
+        path = os.path.join(self.target_path, RESULTS_FILE_NAME)
+
+        dbt.compat.write_file(path, json.dumps(serialized, indent=2,
+                                               default=str))
+
+    def read_previous_results(self):
+        path = os.path.join(self.target_path, RESULTS_FILE_NAME)
+
+        if not os.path.exists(path):
+            raise dbt.exceptions.RuntimeException(
+                "Can't resume: no results from a previous run were found at "
+                "{}".format(path))
+
+        with open(path) as fh:
+            previous = json.load(fh)
+
+        return {result['unique_id']: result
+                for result in previous.get('results', [])}
+
+    def get_nodes_to_resume(self, graph, selected_nodes):
+        """drop the nodes which succeeded in the previous run and haven't
+        changed since. failed, skipped and unrun nodes are run again, along
+        with everything downstream of them."""
+        previous = self.read_previous_results()
+
+        finished = set(
+            unique_id for unique_id in selected_nodes
+            if unique_id in previous and
+            previous[unique_id].get('error') is None and
+            not previous[unique_id].get('skipped') and
+            previous[unique_id].get('fingerprint') ==
+            self.fingerprints.get(unique_id))
+
+        to_run = dbt.graph.selector.select_unfinished(graph,
+                                                      selected_nodes,
+                                                      finished)
+
+        self.resumed_results = [previous[unique_id] for unique_id
+                                in sorted(selected_nodes - to_run)]
+
+        logger.info("Resuming: {} nodes finished in the previous run and "
+                    "are unchanged, {} left to run".format(
+                        len(self.resumed_results), len(to_run)))
+
+        return to_run
+
+    def read_build_state(self):
+        path = os.path.join(self.target_path, BUILD_STATE_FILE_NAME)
+
+        if not os.path.exists(path):
+            return {}
+
+        with open(path) as fh:
+            return json.load(fh)
+
+    def write_build_state(self, results):
+        """record the fingerprint of each node which was built successfully.
+        nodes which failed, or which were built without --skip-unchanged,
+        are forgotten so that they're rebuilt next time."""
+        state = self.read_build_state()
+
+        for result in results:
+            unique_id = result.node.get('unique_id')
+            fingerprint = self.build_fingerprints.get(unique_id)
+
+            if fingerprint is not None and not result.errored and \
+               not result.skipped:
+                state[unique_id] = fingerprint
+            else:
+                state.pop(unique_id, None)
+
+        path = os.path.join(self.target_path, BUILD_STATE_FILE_NAME)
+
+        dbt.compat.write_file(path, json.dumps(state, indent=2,
+                                               sort_keys=True))
+
+    def get_source_state(self, nodes):
+        """returns unique_id -> the freshness of the tables listed in the
+        node's `source_tables` config, or None if the freshness of any of
+        them is unknown. a model which doesn't set `source_tables` may read
+        raw tables which dbt can't see, so its freshness is unknown too.
+        `source_tables: []` declares a model which only reads its refs."""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        node_tables = {}
+        source_state = {}
+
+        for unique_id, node in nodes.items():
+            source_tables = node.get('config', {}).get('source_tables')
+
+            if source_tables is None and is_type(node, NodeType.Model):
+                source_state[unique_id] = None
+                continue
+
+            if not source_tables:
+                continue
+
+            node_tables[unique_id] = set(
+                tuple(table.split('.', 1)) if '.' in table
+                else (schema_name, table)
+                for table in source_tables)
+
+        if len(node_tables) == 0:
+            return source_state
+
+        all_tables = set.union(*node_tables.values())
+        freshness = adapter.get_source_freshness(profile, all_tables)
+
+        if freshness is None:
+            logger.info("Source table freshness isn't supported on '{}' "
+                        "targets. Models with source_tables will always be "
+                        "rebuilt.".format(profile.get('type')))
+            freshness = {}
+
+        for unique_id, tables in node_tables.items():
+            if any(table not in freshness for table in tables):
+                source_state[unique_id] = None
+            else:
+                source_state[unique_id] = ','.join(
+                    '{}.{}={}'.format(schema, table, freshness[(schema,
+                                                                table)])
+                    for (schema, table) in sorted(tables))
+
+        return source_state
+
+    def get_nodes_to_rebuild(self, graph, nodes, selected_nodes):
+        """drop the nodes whose fingerprint, including the freshness of their
+        source tables, matches their last successful build. nodes whose
+        relation no longer exists are rebuilt, along with every node
+        downstream of a rebuilt node."""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        self.build_fingerprints = get_fingerprints(
+            nodes, self.get_source_state(nodes))
+
+        previous = self.read_build_state()
+        existing = adapter.query_for_existing(profile, schema_name)
+
+        unchanged = set(
+            unique_id for unique_id in selected_nodes
+            if self.build_fingerprints[unique_id] is not None and
+            previous.get(unique_id) == self.build_fingerprints[unique_id] and
+            nodes[unique_id].get('name') in existing)
+
+        to_run = dbt.graph.selector.select_unfinished(graph,
+                                                      selected_nodes,
+                                                      unchanged)
+
+        logger.info("Skipping {} unchanged models, {} left to run".format(
+            len(selected_nodes - to_run), len(to_run)))
+
+        return to_run
+
+    def read_test_cache(self):
+        path = os.path.join(self.target_path, TEST_CACHE_FILE_NAME)
+
+        if not os.path.exists(path):
+            return {'builds': {}, 'passed': {}}
+
+        with open(path) as fh:
+            return json.load(fh)
+
+    def write_test_cache(self, results):
+        """record the invocation which built each model, and the key of each
+        test which passed. models which failed to build, and tests which
+        didn't pass or can't be cached, are forgotten. builds are recorded
+        by schema, since each target has its own relations."""
+        profile = self.project.run_environment()
+        schema_name = get_adapter(profile).get_default_schema(profile)
+
+        cache = self.read_test_cache()
+        builds = cache['builds'].setdefault(schema_name, {})
+        # the invocation id is only set when tracking is enabled
+        build_id = str(uuid.uuid4())
+
+        for result in results:
+            unique_id = result.node.get('unique_id')
+
+            if is_type(result.node, NodeType.Model):
+                if result.skipped:
+                    continue
+                elif result.errored:
+                    builds.pop(unique_id, None)
+                else:
+                    builds[unique_id] = build_id
+
+            elif is_type(result.node, NodeType.Test):
+                key = self.test_cache_keys.get(unique_id)
+
+                if key is not None and not result.errored and \
+                   not result.skipped and result.status == 0:
+                    cache['passed'][unique_id] = key
+                else:
+                    cache['passed'].pop(unique_id, None)
+
+        path = os.path.join(self.target_path, TEST_CACHE_FILE_NAME)
+
+        dbt.compat.write_file(path, json.dumps(cache, indent=2,
+                                               sort_keys=True))
+
+    def get_table_state(self, nodes):
+        """returns unique_id -> the row counters of each table and
+        incremental model, or an empty dict if the adapter can't tell"""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        tables = dict(
+            ((schema_name, node.get('name')), unique_id)
+            for unique_id, node in nodes.items()
+            if is_type(node, NodeType.Model) and
+            get_materialization(node) in ('table', 'incremental'))
+
+        if len(tables) == 0:
+            return {}
+
+        freshness = adapter.get_source_freshness(profile, set(tables))
+
+        if freshness is None:
+            return {}
+
+        return dict(
+            (unique_id, None if table not in freshness
+             else str(freshness[table]))
+            for table, unique_id in tables.items())
+
+    def drop_cached_tests(self, linker, selected_nodes):
+        """report the selected tests which passed last time and whose sql and
+        relations haven't changed since as cached passes, and return the
+        tests left to run. with --no-cache, every test is run, but passes
+        are still recorded."""
+        profile = self.project.run_environment()
+        schema_name = get_adapter(profile).get_default_schema(profile)
+
+        nodes = {node: linker.get_node(node) for node in linker.nodes()}
+        cache = self.read_test_cache()
+
+        relation_versions = get_relation_versions(
+            nodes,
+            cache['builds'].get(schema_name, {}),
+            self.get_source_state(nodes),
+            self.get_table_state(nodes))
+
+        self.test_cache_keys = get_test_cache_keys(
+            [nodes[unique_id] for unique_id in selected_nodes],
+            relation_versions)
+
+        if getattr(self.args, 'no_cache', False):
+            return selected_nodes
+
+        cached = set(
+            unique_id for unique_id in selected_nodes
+            if self.test_cache_keys[unique_id] is not None and
+            cache['passed'].get(unique_id) == self.test_cache_keys[unique_id])
+
+        for index, unique_id in enumerate(sorted(cached)):
+            result = RunModelResult(nodes[unique_id], status=0, cached=True)
+            self.cached_results.append(result)
+            print_test_result_line(result, schema_name, index + 1,
+                                   len(cached))
+
+        logger.info("Found {} cached test results, {} tests left to run"
+                    .format(len(cached), len(selected_nodes - cached)))
+
+        return selected_nodes - cached
+
     def as_flat_dep_list(self, linker, nodes_to_run):
         return [[linker.get_node(node) for node in nodes_to_run]]
 
@@ -539,6 +1434,35 @@ class RunManager(object):
 
         return skip_dependent
 
+    def report_result(self, run_model_result, schema_name, index, num_nodes):
+        node = run_model_result.node
+
+        if run_model_result.skipped:
+            print_skip_line(node, schema_name, node.get('name'), index,
+                            num_nodes)
+        else:
+            print_result_line(run_model_result,
+                              schema_name,
+                              index,
+                              num_nodes)
+
+        invocation_id = dbt.tracking.active_user.invocation_id
+        dbt.tracking.track_model_run({
+            "invocation_id": invocation_id,
+            "index": index,
+            "total": num_nodes,
+            "execution_time": run_model_result.execution_time,
+            "run_status": run_model_result.status,
+            "run_skipped": run_model_result.skip,
+            "run_error": run_model_result.error,
+            "model_materialization": get_materialization(run_model_result.node),  # noqa
+            "model_id": get_hash(run_model_result.node),
+            "hashed_contents": get_hashed_contents(run_model_result.node),
+        })
+
+        if run_model_result.errored:
+            logger.info(run_model_result.error)
+
     def execute_nodes(self, node_dependency_list, on_failure,
                       should_run_hooks=False):
         profile = self.project.run_environment()
@@ -551,9 +1475,10 @@ class RunManager(object):
         num_nodes = len(flat_nodes)
 
         if num_nodes == 0:
-            logger.info("WARNING: Nothing to do. Try checking your model "
-                        "configs and running `dbt compile`".format(
-                            self.target_path))
+            if len(self.cached_results) == 0:
+                logger.info("WARNING: Nothing to do. Try checking your model "
+                            "configs and running `dbt compile`".format(
+                                self.target_path))
             return []
 
         num_threads = self.threads
@@ -582,77 +1507,74 @@ class RunManager(object):
             return node_id_to_index_map[node.get('unique_id')]
 
         node_results = []
-        for node_list in node_dependency_list:
-            for i, node in enumerate([node for node in node_list
-                                      if node.get('skip')]):
-                print_skip_line(node, schema_name, node.get('name'),
-                                get_idx(node), num_nodes)
-
-                node_result = RunModelResult(node, skip=True)
-                node_results.append(node_result)
-
-            nodes_to_execute = [node for node in node_list
-                                if not node.get('skip')]
-
-            threads = self.threads
-            num_nodes_this_batch = len(nodes_to_execute)
-            node_index = 0
-
-            def on_complete(run_model_results):
-                for run_model_result in run_model_results:
-                    node_results.append(run_model_result)
-
-                    index = get_idx(run_model_result.node)
-
-                    print_result_line(run_model_result,
-                                      schema_name,
-                                      index,
-                                      num_nodes)
-
-                    invocation_id = dbt.tracking.active_user.invocation_id
-                    dbt.tracking.track_model_run({
-                        "invocation_id": invocation_id,
-                        "index": index,
-                        "total": num_nodes,
-                        "execution_time": run_model_result.execution_time,
-                        "run_status": run_model_result.status,
-                        "run_skipped": run_model_result.skip,
-                        "run_error": run_model_result.error,
-                        "model_materialization": get_materialization(run_model_result.node),  # noqa
-                        "model_id": get_hash(run_model_result.node),
-                        "hashed_contents": get_hashed_contents(run_model_result.node),  # noqa
-                    })
-
-                    if run_model_result.errored:
-                        on_failure(run_model_result.node)
-                        logger.info(run_model_result.error)
-
-            while node_index < num_nodes_this_batch:
-                local_nodes = []
-                for i in range(
-                        node_index,
-                        min(node_index + threads, num_nodes_this_batch)):
-                    node = nodes_to_execute[i]
-                    local_nodes.append(node)
+
+        with self.cancel_on_signals():
+            for node_list in node_dependency_list:
+                if self.stop_reason is not None:
+                    break
+
+                for i, node in enumerate([node for node in node_list
+                                          if node.get('skip')]):
+                    print_skip_line(node, schema_name, node.get('name'),
+                                    get_idx(node), num_nodes)
+
+                    node_result = RunModelResult(node, skip=True)
+                    node_results.append(node_result)
+
+                nodes_to_execute = [node for node in node_list
+                                    if not node.get('skip')]
+
+                # a node starts as soon as a thread is free, instead of
+                # waiting for the slowest node in a batch of `threads`
+                slots = threading.Semaphore(self.threads)
+                pending = []
+
+                def execute(data):
+                    try:
+                        return self.safe_execute_node(data)
+                    except Exception:
+                        # on_complete is only called for nodes which return
+                        slots.release()
+                        raise
+
+                def on_complete(run_model_result):
+                    try:
+                        node_results.append(run_model_result)
+
+                        self.report_result(run_model_result,
+                                           schema_name,
+                                           get_idx(run_model_result.node),
+                                           num_nodes)
+
+                        if run_model_result.errored:
+                            on_failure(run_model_result.node)
+                            self.fail_fast_on(run_model_result)
+                    finally:
+                        slots.release()
+
+                for node in nodes_to_execute:
+                    slots.acquire()
+
+                    if self.stop_reason is not None:
+                        slots.release()
+                        break
 
                     print_start_line(node,
                                      schema_name,
                                      get_idx(node),
                                      num_nodes)
 
-                map_result = pool.map_async(
-                    self.safe_execute_node,
-                    [(local_node, existing,) for local_node in local_nodes],
-                    callback=on_complete
-                )
-                map_result.wait()
+                    pending.append(pool.apply_async(
+                        execute,
+                        [(node, existing,)],
+                        callback=on_complete))
 
-                node_index += threads
+                for result in pending:
+                    result.wait()
 
-        pool.close()
-        pool.join()
+            self.join_pool(pool)
 
-        if should_run_hooks:
+        if should_run_hooks and self.interrupted_by is None:
             run_hooks(self.project.get_target(),
                       self.project.cfg.get('on-run-end', []),
                       self.context,
@@ -664,6 +1586,15 @@ class RunManager(object):
 
         return node_results
 
+    def join_pool(self, pool):
+        """wait for the pool's threads to finish, and close the connections
+        they were leased"""
+        pool.close()
+        pool.join()
+
+        profile = self.project.run_environment()
+        get_adapter(profile).release_thread_connections(profile)
+
     def get_nodes_to_run(self, graph, include_spec, exclude_spec,
                          resource_types, tags):
 
@@ -704,6 +1635,7 @@ class RunManager(object):
             schema_name = adapter.get_default_schema(profile)
 
             adapter.create_schema(profile, schema_name)
+            adapter.commit(profile)
         except (dbt.exceptions.FailedToConnectException,
                 psycopg2.OperationalError) as e:
             logger.info("ERROR: Could not connect to the target database. Try "
@@ -713,7 +1645,7 @@ class RunManager(object):
 
     def run_types_from_graph(self, include_spec, exclude_spec,
                              resource_types, tags, should_run_hooks=False,
-                             flatten_graph=False):
+                             flatten_graph=False, cache_tests=False):
         linker = self.deserialize_graph()
 
         selected_nodes = self.get_nodes_to_run(
@@ -723,6 +1655,21 @@ class RunManager(object):
             resource_types,
             tags)
 
+        nodes = {node: linker.get_node(node) for node in linker.nodes()}
+        self.fingerprints = get_fingerprints(nodes)
+
+        if getattr(self.args, 'resume', False):
+            selected_nodes = self.get_nodes_to_resume(linker.graph,
+                                                      selected_nodes)
+
+        if getattr(self.args, 'skip_unchanged', False):
+            selected_nodes = self.get_nodes_to_rebuild(linker.graph,
+                                                       nodes,
+                                                       selected_nodes)
+
+        if cache_tests:
+            selected_nodes = self.drop_cached_tests(linker, selected_nodes)
+
         dependency_list = []
 
         if flatten_graph is False:
@@ -741,8 +1688,380 @@ class RunManager(object):
 
         return results
 
+    def warm_up(self, should_run_hooks):
+        """open the connection, create the target schema and find existing
+        relations. in pipelined mode this runs while compilation is still
+        in progress."""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        self.try_create_schema()
+
+        existing = adapter.query_for_existing(profile, schema_name)
+
+        if should_run_hooks:
+            run_hooks(self.project.get_target(),
+                      self.project.cfg.get('on-run-start', []),
+                      self.context,
+                      'on-run-start hooks')
+
+        return existing
+
+    def run_pipelined(self, compiler, include_spec, exclude_spec,
+                      resource_types, tags, should_run_hooks=False,
+                      block_on_test_failure=False):
+        """compile and execute at the same time. nodes are executed as soon
+        as they and their ancestors have been compiled, and the connection
+        is warmed up while compilation is running. the graph file is still
+        written, but is never read back.
+
+        if `block_on_test_failure` is True, a model's children wait for its
+        schema tests, and are skipped if any of them fail."""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        flat_graph = compiler.parse()
+
+        # nodes are selected before compilation, using the refs seen while
+        # parsing. this is what finds the tests on the selected models
+        parsed = compiler.get_parsed_graph(flat_graph)
+
+        selected_nodes = self.get_nodes_to_run(parsed.graph,
+                                               include_spec,
+                                               exclude_spec,
+                                               resource_types,
+                                               tags)
+
+        if block_on_test_failure:
+            blocking_tests = get_blocking_tests(parsed.graph, selected_nodes)
+        else:
+            blocking_tests = {}
+
+        num_nodes = len(selected_nodes)
+
+        if num_nodes == 0:
+            logger.info("WARNING: Nothing to do. Try checking your model "
+                        "configs and running `dbt compile`")
+            return []
+
+        logger.info("Concurrency: {} threads (target='{}')".format(
+            self.threads, self.project.get_target().get('name'))
+        )
+
+        print_counts([flat_graph['nodes'][n] for n in selected_nodes])
+
+        # nodes outside of the compilation scope are never compiled, so
+        # nothing should wait for them. ancestors are compiled (but not run)
+        # so that fingerprints don't depend on the selection
+        scope = compiler.get_scope(flat_graph, resource_types, include_spec,
+                                   exclude_spec, with_ancestors=True)
+
+        graph_queue = dbt.graph.queue.GraphQueue(
+            selected_nodes,
+            external=set(flat_graph['nodes']) - scope)
+
+        compiled = {}
+        node_results = []
+        errors = []
+        indexes = {}
+        done = threading.Condition()
+
+        pool = ThreadPool(self.threads + 1)
+        start_time = time.time()
+
+        warm_up = pool.apply_async(self.warm_up, (should_run_hooks,))
+
+        def execute(node):
+            try:
+                existing = warm_up.get()
+                return self.safe_execute_node((node, existing))
+            except Exception as e:
+                errors.append(e)
+                return RunModelResult(node, error=str(e), status='ERROR')
+
+        def on_complete(run_model_result):
+            with done:
+                node_results.append(run_model_result)
+
+                self.report_result(run_model_result,
+                                   schema_name,
+                                   indexes[run_model_result.node['unique_id']],
+                                   num_nodes)
+
+                self.fail_fast_on(run_model_result)
+
+                schedule(*graph_queue.mark_done(
+                    run_model_result.node.get('unique_id'),
+                    not (run_model_result.errored or
+                         run_model_result.failed)))
+
+                done.notify_all()
+
+        def schedule(ready, skipped):
+            for unique_id in skipped:
+                node = compiled[unique_id]
+                indexes[unique_id] = len(indexes) + 1
+                print_skip_line(node, schema_name, node.get('name'),
+                                indexes[unique_id], num_nodes)
+                node_results.append(RunModelResult(node, skip=True))
+
+            for unique_id in ready:
+                node = compiled[unique_id]
+                indexes[unique_id] = len(indexes) + 1
+
+                if self.stop_reason is not None:
+                    # failing fast: skip everything that hasn't started
+                    print_skip_line(node, schema_name, node.get('name'),
+                                    indexes[unique_id], num_nodes)
+                    node_results.append(RunModelResult(node, skip=True))
+                    schedule(*graph_queue.mark_done(unique_id, False))
+                    continue
+
+                print_start_line(node, schema_name, indexes[unique_id],
+                                 num_nodes)
+                pool.apply_async(execute, (node,), callback=on_complete)
+
+        def on_node_compiled(node):
+            with done:
+                compiled[node.get('unique_id')] = node
+
+                parents = node.get('depends_on', {}).get('nodes', [])
+
+                if not is_type(node, NodeType.Test):
+                    parents = parents + [
+                        test for parent in parents
+                        for test in blocking_tests.get(parent, [])]
+
+                schedule(*graph_queue.add(node.get('unique_id'), parents))
+
+        try:
+            with self.cancel_on_signals():
+                dbt.compilation.print_compile_stats(
+                    compiler.compile(flat_graph,
+                                     on_node_compiled,
+                                     resource_types,
+                                     include_spec,
+                                     exclude_spec,
+                                     with_ancestors=True))
+
+                with done:
+                    while not graph_queue.is_complete() and \
+                            len(errors) == 0:
+                        done.wait(1)
+
+                if len(errors) > 0:
+                    raise errors[0]
+
+                # surface connection errors even if nothing was executed
+                warm_up.get()
+
+        finally:
+            self.join_pool(pool)
+
+        self.fingerprints = get_fingerprints(compiled)
+
+        if should_run_hooks and self.interrupted_by is None:
+            run_hooks(self.project.get_target(),
+                      self.project.cfg.get('on-run-end', []),
+                      self.context,
+                      'on-run-end hooks')
+
+        execution_time = time.time() - start_time
+
+        print_results_line(node_results, execution_time)
+
+        return node_results
+
     # ------------------------------------
 
+    def run_models_pipelined(self, compiler, include_spec, exclude_spec):
+        return self.run_pipelined(compiler,
+                                  include_spec,
+                                  exclude_spec,
+                                  resource_types=[NodeType.Model],
+                                  tags=set(),
+                                  should_run_hooks=True)
+
+    def run_build_pipelined(self, compiler, include_spec, exclude_spec,
+                            block_on_test_failure=False):
+        return self.run_pipelined(compiler,
+                                  include_spec,
+                                  exclude_spec,
+                                  resource_types=[NodeType.Model,
+                                                  NodeType.Test],
+                                  tags=set(),
+                                  should_run_hooks=True,
+                                  block_on_test_failure=block_on_test_failure)
+
+    def run_tests_async(self, include_spec, exclude_spec, tags,
+                        concurrency, fused=False):
+        """run tests on an asyncio event loop instead of the thread pool,
+        with up to `concurrency` queries in flight at once. only supported
+        for postgres and redshift, on python 3.5+."""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        if profile.get('type') not in ('postgres', 'redshift'):
+            raise dbt.exceptions.RuntimeException(
+                "Async test execution is not supported for '{}' targets"
+                .format(profile.get('type')))
+
+        if dbt.compat.WHICH_PYTHON == 2:
+            raise dbt.exceptions.RuntimeException(
+                "Async test execution requires python 3.5 or newer")
+
+        import dbt.clients.postgres_async
+
+        linker = self.deserialize_graph()
+
+        selected_nodes = self.get_nodes_to_run(linker.graph,
+                                               include_spec,
+                                               exclude_spec,
+                                               [NodeType.Test],
+                                               tags)
+
+        selected_nodes = self.drop_cached_tests(linker, selected_nodes)
+
+        nodes = [linker.get_node(node) for node in selected_nodes]
+        num_nodes = len(nodes)
+
+        if num_nodes == 0:
+            if len(self.cached_results) == 0:
+                logger.info("WARNING: Nothing to do. Try checking your model "
+                            "configs and running `dbt compile`")
+            return []
+
+        logger.info("Concurrency: {} async queries (target='{}')".format(
+            concurrency, self.project.get_target().get('name')))
+
+        print_counts(nodes)
+
+        nodes_to_run = nodes
+
+        if fused:
+            nodes_to_run = self.get_fused_test_nodes(linker, nodes,
+                                                     schema_name)
+
+        node_results = []
+        start_time = time.time()
+
+        def queries():
+            for node in nodes_to_run:
+                node = self.inject_runtime_config(node)
+                yield (node, node['execution_steps'][-1]['sql'])
+
+        def on_complete(node, rows, error, execution_time):
+            status = None
+
+            if error is None:
+                try:
+                    if node.get('fused_tests') is not None:
+                        status = get_fused_test_statuses(node, rows)
+                    else:
+                        status = get_test_status(node, rows)
+                except RuntimeError as e:
+                    error = e
+
+            if error is not None:
+                status = "ERROR"
+                error = "Error executing {filepath}\n{error}".format(
+                    filepath=node.get('build_path'), error=str(error).strip())
+                logger.debug(error)
+
+            result = RunModelResult(node,
+                                    error=error,
+                                    status=status,
+                                    execution_time=execution_time)
+
+            for test_result in split_fused_result(result):
+                node_results.append(test_result)
+                self.report_result(test_result, schema_name,
+                                   len(node_results), num_nodes)
+
+        dsn = adapter.get_connection_spec({'credentials': profile})
+        executor = dbt.clients.postgres_async.AsyncQueryExecutor(
+            dsn, concurrency)
+
+        executor.run(queries(), on_complete)
+
+        execution_time = time.time() - start_time
+
+        print_results_line(node_results, execution_time)
+
+        return node_results
+
+    def get_fused_test_nodes(self, linker, tests, schema_name):
+        graph_nodes = {node: linker.get_node(node)
+                       for node in linker.nodes()}
+
+        to_run = get_fused_test_nodes(tests, graph_nodes, schema_name)
+
+        logger.info("Fused {} tests into {} queries".format(
+            len(tests), len(to_run)))
+
+        return to_run
+
+    def run_tests_fused(self, include_spec, exclude_spec, tags):
+        """run the schema tests on each model together, in one query over
+        the model, and every other test on its own"""
+        profile = self.project.run_environment()
+        adapter = get_adapter(profile)
+        schema_name = adapter.get_default_schema(profile)
+
+        linker = self.deserialize_graph()
+
+        selected_nodes = self.get_nodes_to_run(linker.graph,
+                                               include_spec,
+                                               exclude_spec,
+                                               [NodeType.Test],
+                                               tags)
+
+        selected_nodes = self.drop_cached_tests(linker, selected_nodes)
+
+        nodes = [linker.get_node(node) for node in selected_nodes]
+        num_nodes = len(nodes)
+
+        if num_nodes == 0:
+            if len(self.cached_results) == 0:
+                logger.info("WARNING: Nothing to do. Try checking your model "
+                            "configs and running `dbt compile`")
+            return []
+
+        logger.info("Concurrency: {} threads (target='{}')".format(
+            self.threads, self.project.get_target().get('name')))
+
+        print_counts(nodes)
+
+        nodes_to_run = self.get_fused_test_nodes(linker, nodes, schema_name)
+
+        node_results = []
+        start_time = time.time()
+
+        pool = ThreadPool(self.threads)
+
+        with self.cancel_on_signals():
+            results = pool.imap_unordered(
+                self.safe_execute_node,
+                [(node, None) for node in nodes_to_run])
+
+            for result in results:
+                for test_result in split_fused_result(result):
+                    node_results.append(test_result)
+                    self.report_result(test_result, schema_name,
+                                       len(node_results), num_nodes)
+                    self.fail_fast_on(test_result)
+
+            self.join_pool(pool)
+
+        execution_time = time.time() - start_time
+
+        print_results_line(node_results, execution_time)
+
+        return node_results
+
     def run_models(self, include_spec, exclude_spec):
         return self.run_types_from_graph(include_spec,
                                          exclude_spec,
@@ -755,7 +2074,8 @@ class RunManager(object):
                                          exclude_spec,
                                          resource_types=[NodeType.Test],
                                          tags=tags,
-                                         flatten_graph=True)
+                                         flatten_graph=True,
+                                         cache_tests=True)
 
     def run_archives(self, include_spec, exclude_spec):
         return self.run_types_from_graph(include_spec,
@@ -2,6 +2,7 @@ import dbt.compilation
 
 from dbt.runner import RunManager
 from dbt.logger import GLOBAL_LOGGER as logger
+from dbt.utils import NodeType
 
 
 class ArchiveTask:
@@ -11,7 +12,7 @@ class ArchiveTask:
 
     def run(self):
         dbt.compilation.compile_and_print_status(
-            self.project, self.args)
+            self.project, self.args, resource_types=[NodeType.Archive])
 
         runner = RunManager(
             self.project,
@@ -0,0 +1,69 @@
+import dbt.compilation
+import dbt.exceptions
+import dbt.runner
+
+from dbt.logger import GLOBAL_LOGGER as logger
+from dbt.runner import RunManager
+
+
+class BuildTask:
+    """
+    Run models and their tests in a single invocation. The project is
+    compiled once, and each model's tests are run as soon as the model has
+    been built, alongside the models that are still running.
+    """
+    def __init__(self, args, project):
+        self.args = args
+        self.project = project
+
+    def run(self):
+        compiler = dbt.compilation.Compiler(self.project, self.args)
+        compiler.initialize()
+
+        runner = RunManager(
+            self.project, self.project['target-path'], self.args
+        )
+
+        results = runner.run_build_pipelined(
+            compiler,
+            self.args.models,
+            self.args.exclude,
+            block_on_test_failure=getattr(self.args, 'block_on_test_failure',
+                                          False))
+
+        total = len(results)
+        failed = len([r for r in results if r.failed])
+        passed = len([r for r in results
+                      if not r.errored and not r.skipped and not r.failed])
+        errored = len([r for r in results if r.errored and not r.timed_out])
+        timed_out = len([r for r in results if r.timed_out])
+        skipped = len([r for r in results if r.skipped])
+
+        logger.info(
+            "Done. PASS={passed} FAIL={failed} ERROR={errored} "
+            "TIMEOUT={timed_out} SKIP={skipped} TOTAL={total}"
+            .format(
+                total=total,
+                passed=passed,
+                failed=failed,
+                errored=errored,
+                timed_out=timed_out,
+                skipped=skipped
+            )
+        )
+
+        runner.write_results(results)
+        runner.write_build_state(results)
+        runner.write_test_cache(results)
+
+        if runner.interrupted_by is not None:
+            raise dbt.exceptions.RuntimeException(
+                "Interrupted by {}. Results were written to {}".format(
+                    runner.interrupted_by, dbt.runner.RESULTS_FILE_NAME))
+
+        if runner.failed_node is not None:
+            raise dbt.exceptions.FailFastException(
+                "Stopped early because {} failed (--fail-fast)".format(
+                    runner.failed_node.get('unique_id')))
+
+        return results
@@ -1,9 +1,13 @@
 from __future__ import print_function
 
 import dbt.compilation
+import dbt.exceptions
+import dbt.graph.selector
+import dbt.runner
 
 from dbt.logger import GLOBAL_LOGGER as logger
 from dbt.runner import RunManager
+from dbt.utils import NodeType
 
 THREAD_LIMIT = 9
 
@@ -13,27 +17,85 @@ class RunTask:
         self.args = args
         self.project = project
 
+    def pipeline_enabled(self):
+        if not getattr(self.args, 'pipeline', False):
+            return False
+
+        if getattr(self.args, 'resume', False):
+            logger.info("Resumed runs can't be pipelined. Compiling the "
+                        "whole project first.")
+            return False
+
+        if getattr(self.args, 'skip_unchanged', False):
+            logger.info("Runs which skip unchanged models can't be "
+                        "pipelined. Compiling the whole project first.")
+            return False
+
+        specs = (self.args.models or []) + (self.args.exclude or [])
+
+        if dbt.graph.selector.uses_graph_operators(specs):
+            logger.info("Model selectors with parents or children can't be "
+                        "pipelined. Compiling the whole project first.")
+            return False
+
+        return True
+
     def run(self):
-        dbt.compilation.compile_and_print_status(
-            self.project, self.args)
+        if self.pipeline_enabled():
+            compiler = dbt.compilation.Compiler(self.project, self.args)
+            compiler.initialize()
 
-        runner = RunManager(
-            self.project, self.project['target-path'], self.args
-        )
+            runner = RunManager(
+                self.project, self.project['target-path'], self.args
+            )
 
-        results = runner.run_models(self.args.models, self.args.exclude)
+            results = runner.run_models_pipelined(
+                compiler, self.args.models, self.args.exclude)
+
+        else:
+            # fingerprints depend on every ancestor of the selected models.
+            # they're written to run_results.json on every run, and have to
+            # match when the run is resumed, so ancestors are always compiled
+            dbt.compilation.compile_and_print_status(
+                self.project, self.args, resource_types=[NodeType.Model],
+                include_spec=self.args.models,
+                exclude_spec=self.args.exclude,
+                with_ancestors=True)
+
+            runner = RunManager(
+                self.project, self.project['target-path'], self.args
+            )
+
+            results = runner.run_models(self.args.models, self.args.exclude)
 
         total = len(results)
         passed = len([r for r in results if not r.errored and not r.skipped])
-        errored = len([r for r in results if r.errored])
+        errored = len([r for r in results if r.errored and not r.timed_out])
+        timed_out = len([r for r in results if r.timed_out])
         skipped = len([r for r in results if r.skipped])
 
         logger.info(
-            "Done. PASS={passed} ERROR={errored} SKIP={skipped} TOTAL={total}"
+            "Done. PASS={passed} ERROR={errored} TIMEOUT={timed_out} "
+            "SKIP={skipped} TOTAL={total}"
             .format(
                 total=total,
                 passed=passed,
                 errored=errored,
+                timed_out=timed_out,
                 skipped=skipped
             )
         )
+
+        runner.write_results(results)
+        runner.write_build_state(results)
+        runner.write_test_cache(results)
+
+        if runner.interrupted_by is not None:
+            raise dbt.exceptions.RuntimeException(
+                "Interrupted by {}. Results were written to {}".format(
+                    runner.interrupted_by, dbt.runner.RESULTS_FILE_NAME))
+
+        if runner.failed_node is not None:
+            raise dbt.exceptions.FailFastException(
+                "Stopped early because {} failed (--fail-fast)".format(
+                    runner.failed_node.get('unique_id')))
@@ -2,6 +2,7 @@ import dbt.compilation
 
 from dbt.runner import RunManager
 from dbt.logger import GLOBAL_LOGGER as logger
+from dbt.utils import NodeType
 
 
 class TestTask:
@@ -20,23 +21,42 @@ class TestTask:
         self.project = project
 
     def run(self):
+        include = self.args.models
+        exclude = self.args.exclude
+
+        # test results are cached (even with --no-cache) against the
+        # versions of the models they read, which are worked out from the
+        # compiled models upstream of each test
         dbt.compilation.compile_and_print_status(
-            self.project, self.args)
+            self.project, self.args, resource_types=[NodeType.Test],
+            include_spec=include, exclude_spec=exclude,
+            with_ancestors=True)
 
         runner = RunManager(
             self.project, self.project['target-path'], self.args)
 
-        include = self.args.models
-        exclude = self.args.exclude
-
         if (self.args.data and self.args.schema) or \
            (not self.args.data and not self.args.schema):
-            res = runner.run_tests(include, exclude, set())
+            tags = set()
         elif self.args.data:
-            res = runner.run_tests(include, exclude, {'data'})
+            tags = {'data'}
         elif self.args.schema:
-            res = runner.run_tests(include, exclude, {'schema'})
+            tags = {'schema'}
         else:
             raise RuntimeError("unexpected")
 
+        concurrency = getattr(self.args, 'async_concurrency', None)
+        fused = getattr(self.args, 'fused', False)
+
+        if concurrency is not None:
+            res = runner.run_tests_async(include, exclude, tags, concurrency,
+                                         fused=fused)
+        elif fused:
+            res = runner.run_tests_fused(include, exclude, tags)
+        else:
+            res = runner.run_tests(include, exclude, tags)
+
+        res = runner.cached_results + res
+        runner.write_test_cache(res)
+
         return res
@@ -1,115 +1,190 @@
+import hashlib
+
+import sqlparse
+
+import dbt.clients.jinja
+
+
+def sql_step(sql, only_if=None):
+    step = {'type': 'sql', 'sql': sql}
+
+    # mark steps which need to be rendered with the runtime context, so
+    # that every other step can be executed untouched
+    render = dbt.clients.jinja.get_render_mode(sql)
+
+    if render is not None:
+        step['render'] = render
+
+    if only_if is not None:
+        step['only_if'] = only_if
+
+    return step
+
+
+def operation_step(function, args, only_if=None):
+    step = {'type': 'operation', 'function': function, 'args': args}
+
+    if only_if is not None:
+        step['only_if'] = only_if
+
+    return step
+
+
+def relation_exists(schema, identifier, exists=True):
+    """condition for a step that should only run if the relation
+    "schema"."identifier" does (or doesn't) exist when the node starts"""
+    return {'schema': schema, 'identifier': identifier, 'exists': exists}
+
+
+def split_statements(sql):
+    """split user-supplied sql (eg. hooks) into individual statements, dropping
+    empty and comment-only statements"""
+    statements = []
+
+    for statement in sqlparse.split(sql):
+        statement = sqlparse.format(statement, strip_comments=True)
+        statement = statement.strip().rstrip(';').strip()
+
+        if statement != '':
+            statements.append(statement)
+
+    return statements
+
+
+def steps_to_sql(steps, prologue=''):
+    """render execution steps as a sql file for the build directory. this is
+    informational only -- the steps themselves are what get executed."""
+    parts = [prologue]
+
+    for step in steps:
+        only_if = step.get('only_if')
+
+        if only_if is not None:
+            parts.append('-- only if "{}"."{}" {}'.format(
+                only_if['schema'], only_if['identifier'],
+                'exists' if only_if['exists'] else 'does not exist'))
+
+        if step['type'] == 'operation':
+            parts.append('-- DBT_OPERATION {}({})'.format(
+                step['function'],
+                ', '.join('{}="{}"'.format(k, v) for k, v
+                          in sorted(step['args'].items()))))
+        else:
+            parts.append('{};'.format(step['sql'].strip()))
+
+    return '\n\n'.join(parts)
+
+
+# tests select the rows which violate them. a test passes if it selects
+# nothing, and fails with the number of rows it selects
+TestCountTemplate = u"""select count(*) from (
+{test_sql}
+) sbq"""
+
+# stop at the first violating row. this returns 1 if the test fails, and 0
+# if it passes
+TestFastFailTemplate = u"""select count(*) from (
+  select 1 from (
+{test_sql}
+  ) dbt_test_sbq
+  limit 1
+) sbq"""
+
 
 class BaseCreateTemplate(object):
     template = u"""
 create {materialization} "{schema}"."{identifier}" {dist_qualifier} {sort_qualifier} as (
     {query}
-);"""
-
-    incremental_template = u"""
-{{% if not already_exists("{schema}", "{identifier}") %}}
+)"""
 
+    incremental_create_template = u"""
 create table "{schema}"."{identifier}" {dist_qualifier} {sort_qualifier} as (
     {query}
-);
-
-
-{{% else %}}
+)"""
 
+    incremental_tmp_template = u"""
 create temporary table "{identifier}__dbt_incremental_tmp" as (
     with dbt_incr_sbq as (
         {query}
     )
     select * from dbt_incr_sbq
     where ({sql_where}) or ({sql_where}) is null
-);
+)"""
 
--- DBT_OPERATION {{ function: expand_column_types_if_needed, args: {{ temp_table: "{identifier}__dbt_incremental_tmp", to_schema: "{schema}", to_table: "{identifier}"}} }}
+    incremental_delete_template = u"""
+delete from "{schema}"."{identifier}" where  ({unique_key}) in (
+    select ({unique_key}) from "{identifier}__dbt_incremental_tmp"
+)"""
 
+    incremental_insert_template = u"""
 {{% set dest_columns = get_columns_in_table("{schema}", "{identifier}") %}}
 {{% set dest_cols_csv = dest_columns | map(attribute='quoted') | join(', ') %}}
 
-{incremental_delete_statement}
-
 insert into "{schema}"."{identifier}" ({{{{ dest_cols_csv }}}})
 (
     select {{{{ dest_cols_csv }}}}
     from "{identifier}__dbt_incremental_tmp"
-);
-
-{{% endif %}}
-
-"""
-
-    incremental_delete_template = u"""
-delete from "{schema}"."{identifier}" where  ({unique_key}) in (
-    select ({unique_key}) from "{identifier}__dbt_incremental_tmp"
-);
-"""
+)"""
 
-    extras_template = u"""
-{prologue}
+    def hook_steps(self, hooks):
+        steps = []
 
--- Pre-model hooks
-{pre_hooks}
+        for hook in hooks:
+            steps.extend(sql_step(stmt) for stmt in split_statements(hook))
 
--- Model SQL
-{sql}
+        return steps
 
--- Post-model hooks
-{post_hooks}
-"""
-
-    def add_extras(self, opts, sql):
-        pre_hooks = ';\n\n'.join(opts['pre-hooks'])
-        post_hooks = ';\n\n'.join(opts['post-hooks'])
+    def incremental_steps(self, opts, delete_rows):
+        new = relation_exists(opts['schema'], opts['identifier'], False)
+        existing = relation_exists(opts['schema'], opts['identifier'], True)
 
-        if len(pre_hooks) > 0:
-            pre_hooks = pre_hooks + ';'
+        steps = [
+            sql_step(self.incremental_create_template.format(**opts), new),
+            sql_step(self.incremental_tmp_template.format(**opts), existing),
+            operation_step('expand_column_types_if_needed', {
+                'temp_table': '{}__dbt_incremental_tmp'.format(
+                    opts['identifier']),
+                'to_schema': opts['schema'],
+                'to_table': opts['identifier'],
+            }, existing),
+        ]
 
-        if len(post_hooks) > 0:
-            post_hooks = post_hooks + ';'
+        if delete_rows:
+            steps.append(sql_step(
+                self.incremental_delete_template.format(**opts), existing))
 
-        extras = {
-            'prologue': opts['prologue'],
-            'pre_hooks': pre_hooks,
-            'sql': sql,
-            'post_hooks': post_hooks,
-        }
+        steps.append(sql_step(
+            self.incremental_insert_template.format(**opts), existing))
 
-        return self.extras_template.format(**extras)
+        return steps
 
     def wrap(self, opts):
-        sql = ""
+        """returns a list of execution steps which materialize the model. Each
+        step is either a single sql statement or an adapter operation."""
 
         if opts['materialization'] == 'view':
-            sql = self.template.format(**opts)
+            steps = [sql_step(self.template.format(**opts))]
 
         elif (opts['materialization'] == 'table' and
               not opts['non_destructive']):
-            sql = self.template.format(**opts)
+            steps = [sql_step(self.template.format(**opts))]
 
         elif opts['materialization'] == 'table' and opts['non_destructive']:
-            opts['incremental_delete_statement'] = "-- non-destructive insert... skippping delete"
             opts['sql_where'] = 'TRUE'
-
-            sql = self.incremental_template.format(**opts)
+            steps = self.incremental_steps(opts, delete_rows=False)
 
         elif opts['materialization'] == 'incremental':
-            if opts.get('unique_key') is not None:
-                delete_sql = self.incremental_delete_template.format(**opts)
-            else:
-                delete_sql = "-- no unique key provided... skipping delete"
-
-            opts['incremental_delete_statement'] = delete_sql
-            sql = self.incremental_template.format(**opts)
-
+            steps = self.incremental_steps(
+                opts, delete_rows=opts.get('unique_key') is not None)
 
         elif opts['materialization'] == 'ephemeral':
-            sql = opts['query']
+            steps = [sql_step(opts['query'])]
         else:
             raise RuntimeError("Invalid materialization parameter ({})".format(opts['materialization']))
 
-        return self.add_extras(opts, sql)
+        return (self.hook_steps(opts['pre-hooks']) +
+                steps +
+                self.hook_steps(opts['post-hooks']))
 
 
 SCDArchiveTemplate = u"""
@@ -125,6 +200,13 @@ SCDArchiveTemplate = u"""
             {{ updated_at }} as "valid_from",
             null::timestamp as "tmp_valid_to"
         from "{{ source_schema }}"."{{ source_table }}"
+        {% if strategy == 'incremental' %}
+        {# an empty archive has no max, so every source row is read #}
+        where {{ updated_at }} >= coalesce(
+            (select max("dbt_updated_at")
+             from "{{ target_schema }}"."{{ target_table }}"),
+            {{ updated_at }})
+        {% endif %}
 
     ),
 
@@ -139,6 +221,9 @@ SCDArchiveTemplate = u"""
             "valid_from",
             "valid_to" as "tmp_valid_to"
         from "{{ target_schema }}"."{{ target_table }}"
+        {% if strategy == 'incremental' %}
+        where "valid_to" is null
+        {% endif %}
 
     ),
 
@@ -186,52 +271,75 @@ SCDArchiveTemplate = u"""
 
 class ArchiveInsertTemplate(object):
 
-    # missing_columns : columns in source_table that are missing from target_table (used for the ALTER)
-    # dest_columns    : columns in the dest table (post-alter!)
-    definitions = u"""
-{% set missing_columns = get_missing_columns(source_schema, source_table, target_schema, target_table) %}
-{% set dest_columns = get_columns_in_table(target_schema, target_table) + missing_columns %}
-"""
-
     alter_template = u"""
-{% for col in missing_columns %}
-    alter table "{{ target_schema }}"."{{ target_table }}" add column "{{ col.name }}" {{ col.data_type }};
-{% endfor %}
-"""
+alter table "{schema}"."{identifier}" add column "{name}" {data_type}"""
 
-    dest_cols = u"""
-{% for col in dest_columns %}
-    "{{ col.name }}" {% if not loop.last %},{% endif %}
-{% endfor %}
+    drop_tmp_template = u"""
+drop table if exists "{tmp_identifier}"
 """
 
-    archival_template = u"""
-
-{definitions}
-
-{alter_template}
-
-create temporary table "{identifier}__dbt_archival_tmp" as (
+    create_tmp_template = u"""
+create temporary table "{tmp_identifier}" as (
     with dbt_archive_sbq as (
         {query}
     )
     select * from dbt_archive_sbq
-);
-
--- DBT_OPERATION {{ function: expand_column_types_if_needed, args: {{ temp_table: "{identifier}__dbt_archival_tmp", to_schema: "{schema}", to_table: "{identifier}"}} }}
+)"""
 
+    update_template = u"""
 update "{schema}"."{identifier}" set "valid_to" = "tmp"."valid_to"
-from "{identifier}__dbt_archival_tmp" as "tmp"
+from "{tmp_identifier}" as "tmp"
 where "tmp"."scd_id" = "{schema}"."{identifier}"."scd_id"
-  and "change_type" = 'update';
+  and "change_type" = 'update'"""
 
+    insert_template = u"""
 insert into "{schema}"."{identifier}" (
     {dest_cols}
 )
-select {dest_cols} from "{identifier}__dbt_archival_tmp"
-where "change_type" = 'insert';
-"""
+select {dest_cols} from "{tmp_identifier}"
+where "change_type" = 'insert'"""
+
+    @staticmethod
+    def tmp_identifier(schema, table):
+        """archives run concurrently, and temp tables in other sessions show
+        up in information_schema, so the temp table is named after both the
+        schema and the table. the table name is truncated to keep the whole
+        name within postgres' 63 character limit."""
+        suffix = hashlib.md5(
+            '{}.{}'.format(schema, table).encode('utf-8')).hexdigest()[:8]
+
+        return '{}__dbt_archival_tmp_{}'.format(table[:32], suffix)
+
+    def wrap(self, schema, table, query, missing_columns, dest_columns):
+        """
+        missing_columns : columns in source_table that are missing from
+                          target_table (used for the ALTER)
+        dest_columns    : columns in the dest table (post-alter!)
+        """
+        opts = {
+            'schema': schema,
+            'identifier': table,
+            'tmp_identifier': self.tmp_identifier(schema, table),
+            'query': query,
+            'dest_cols': ', '.join(col.quoted for col in dest_columns),
+        }
 
-    def wrap(self, schema, table, query, unique_key):
-        sql = self.archival_template.format(schema=schema, identifier=table, query=query, unique_key=unique_key, alter_template=self.alter_template, dest_cols=self.dest_cols, definitions=self.definitions)
-        return sql
+        steps = [sql_step(self.alter_template.format(
+            name=col.name, data_type=col.data_type, **opts))
+            for col in missing_columns]
+
+        steps.extend([
+            sql_step(self.drop_tmp_template.format(**opts)),
+            sql_step(self.create_tmp_template.format(**opts)),
+            operation_step('expand_column_types_if_needed', {
+                'temp_table': opts['tmp_identifier'],
+                'to_schema': schema,
+                'to_table': table,
+            }),
+            sql_step(self.update_template.format(**opts)),
+            sql_step(self.insert_template.format(**opts)),
+            # connections are reused by the next archive on this thread
+            sql_step(self.drop_tmp_template.format(**opts)),
+        ])
+
+        return steps
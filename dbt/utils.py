@@ -14,6 +14,8 @@ DBTConfigKeys = [
     'sql_where',
     'unique_key',
     'sort_type',
+    'timeout',
+    'source_tables',
     'pre-hook',
     'post-hook',
     'vars'
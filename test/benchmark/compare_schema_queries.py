@@ -0,0 +1,195 @@
+"""
+Compare the query shapes used for schema tests on a synthetic dataset in a
+local postgres (eg. the `database` service in docker-compose.yml):
+
+    python test/benchmark/compare_schema_queries.py --rows 1000000
+
+Each shape is run with the same wrapping as `dbt test` (counting, and with
+--fast-fail-tests), and every shape of a test must agree on whether it
+passes. The connection can be set with the usual PGHOST, PGUSER, PGPASSWORD
+and PGDATABASE environment variables.
+"""
+import argparse
+import os
+import time
+
+import psycopg2
+
+import dbt.parser
+import dbt.templates
+
+from dbt.adapters.redshift import RedshiftAdapter
+
+
+SCHEMA = 'dbt_schema_test_benchmark'
+
+# the shapes used before the schema test templates were made adapter
+# specific, for comparison
+LEGACY_SHAPES = {
+    'not_null': """
+with validation as (
+  select {field} as f
+  from {ref}
+)
+select f from validation where f is null
+""",
+    'unique': """
+with validation as (
+  select {field} as f
+  from {ref}
+  where {field} is not null
+),
+validation_errors as (
+    select f from validation group by f having count(*) > 1
+)
+select f from validation_errors
+""",
+    'accepted_values': """
+with all_values as (
+  select distinct {field} as f
+  from {ref}
+),
+validation_errors as (
+    select f from all_values where f not in ({values_csv})
+)
+select f from validation_errors
+""",
+    'relationships': """
+with parent as (
+  select {parent_field} as id
+  from {parent_ref}
+), child as (
+  select {child_field} as id
+  from {child_ref}
+)
+select id from child
+where id not in (select id from parent) and id is not null
+""",
+}
+
+SHAPES = {
+    'not_null': [
+        ('legacy cte', LEGACY_SHAPES['not_null']),
+        ('default', dbt.parser.QUERY_VALIDATE_NOT_NULL),
+    ],
+    'unique': [
+        ('legacy cte', LEGACY_SHAPES['unique']),
+        ('default', dbt.parser.QUERY_VALIDATE_UNIQUE),
+    ],
+    'accepted_values': [
+        ('legacy cte', LEGACY_SHAPES['accepted_values']),
+        ('default', dbt.parser.QUERY_VALIDATE_ACCEPTED_VALUES),
+    ],
+    'relationships': [
+        ('legacy not in', LEGACY_SHAPES['relationships']),
+        ('not exists', dbt.parser.QUERY_VALIDATE_REFERENTIAL_INTEGRITY),
+        ('left join', RedshiftAdapter.schema_test_templates['relationships']),
+    ],
+}
+
+TEST_ARGS = {
+    'not_null': {'ref': '{schema}.child', 'field': 'parent_id'},
+    'unique': {'ref': '{schema}.child', 'field': 'id'},
+    'accepted_values': {'ref': '{schema}.child', 'field': 'status',
+                        'values_csv': "'new','paid','shipped'"},
+    'relationships': {'child_ref': '{schema}.child',
+                      'child_field': 'parent_id',
+                      'parent_ref': '{schema}.parent',
+                      'parent_field': 'id'},
+}
+
+WRAPPERS = [
+    ('count', dbt.templates.TestCountTemplate),
+    ('fast fail', dbt.templates.TestFastFailTemplate),
+]
+
+
+def create_dataset(cursor, rows):
+    """a parent table, and a child table with `rows` rows which passes
+    every test, so that no shape can stop early"""
+    cursor.execute('drop schema if exists {schema} cascade; '
+                   'create schema {schema};'.format(schema=SCHEMA))
+
+    cursor.execute("""
+    create table {schema}.parent as
+    select id from generate_series(1, {parents}) id;
+
+    create table {schema}.child as
+    select
+      id,
+      1 + (id % {parents}) as parent_id,
+      (array['new','paid','shipped'])[1 + id % 3] as status
+    from generate_series(1, {rows}) id;
+
+    analyze {schema}.parent;
+    analyze {schema}.child;
+    """.format(schema=SCHEMA, rows=rows, parents=max(rows // 10, 1)))
+
+
+def time_query(cursor, sql, repeat):
+    """the fastest of `repeat` runs, and the query's result"""
+    best = None
+
+    for _ in range(repeat):
+        start = time.time()
+        cursor.execute(sql)
+        result = cursor.fetchone()[0]
+        elapsed = time.time() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, result
+
+
+def run_benchmark(cursor, repeat):
+    for test_type in ['not_null', 'unique', 'accepted_values',
+                      'relationships']:
+        args = dict((key, value.format(schema=SCHEMA))
+                    for key, value in TEST_ARGS[test_type].items())
+
+        for wrapper_name, wrapper in WRAPPERS:
+            passed = set()
+
+            for shape_name, shape in SHAPES[test_type]:
+                sql = wrapper.format(test_sql=shape.format(**args))
+                elapsed, result = time_query(cursor, sql, repeat)
+                passed.add(result == 0)
+
+                print("{:<16} {:<10} {:<15} {:>8.3f}s".format(
+                    test_type, wrapper_name, shape_name, elapsed))
+
+            if len(passed) != 1:
+                raise RuntimeError(
+                    "Shapes of the {} test disagree".format(test_type))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', action='store_true',
+                        help="Don't drop the dataset afterwards")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(
+        host=os.environ.get('PGHOST', 'database'),
+        user=os.environ.get('PGUSER', 'root'),
+        password=os.environ.get('PGPASSWORD', 'password'),
+        dbname=os.environ.get('PGDATABASE', 'dbt'))
+    connection.autocommit = True
+
+    cursor = connection.cursor()
+
+    try:
+        create_dataset(cursor, args.rows)
+        run_benchmark(cursor, args.repeat)
+    finally:
+        if not args.keep:
+            cursor.execute('drop schema if exists {} cascade'.format(SCHEMA))
+
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -387,3 +387,116 @@ class CompilerTest(unittest.TestCase):
                          .get('model.root.ephemeral_level_two')
                          .get('extra_ctes_injected')),
             True)
+
+    def test__get_scope(self):
+        ephemeral_config = self.model_config.copy()
+        ephemeral_config['materialized'] = 'ephemeral'
+
+        def node(unique_id, refs, config=None):
+            resource_type, package_name, name = unique_id.split('.')
+
+            return {
+                'unique_id': unique_id,
+                'name': name,
+                'package_name': package_name,
+                'resource_type': resource_type,
+                'config': config or self.model_config,
+                'refs': refs,
+            }
+
+        flat_graph = {
+            'nodes': {
+                'model.root.base': node('model.root.base', [],
+                                        ephemeral_config),
+                'model.root.mid': node('model.root.mid', [['base']]),
+                'model.root.top': node('model.root.top', [['root', 'mid']]),
+                'model.root.other': node('model.root.other', []),
+                'test.root.not_null_top_id': node(
+                    'test.root.not_null_top_id', [['top']]),
+                'test.root.unique_other_id': node(
+                    'test.root.unique_other_id', [['other']]),
+                'archive.root.users_archived': node(
+                    'archive.root.users_archived', []),
+            },
+            'macros': {}
+        }
+
+        compiler = dbt.compilation.Compiler(None, None)
+
+        def get_scope(resource_types, include_spec, **kwargs):
+            return compiler.get_scope(flat_graph, resource_types,
+                                      include_spec, **kwargs)
+
+        # ephemeral models are compiled along with the models that need them
+        self.assertEqual(get_scope(['model'], ['mid']),
+                         set(['model.root.mid', 'model.root.base']))
+
+        # but other parents aren't, unless they're asked for
+        self.assertEqual(get_scope(['model'], ['top']),
+                         set(['model.root.top']))
+
+        self.assertEqual(get_scope(['model'], ['top'], with_ancestors=True),
+                         set(['model.root.top', 'model.root.mid',
+                              'model.root.base']))
+
+        # tests are only compiled for the selected models
+        self.assertEqual(get_scope(['test'], ['other']),
+                         set(['model.root.other',
+                              'test.root.unique_other_id']))
+
+        # without selectors, no models are needed to find the tests
+        self.assertEqual(get_scope(['test'], None),
+                         set(['test.root.not_null_top_id',
+                              'test.root.unique_other_id']))
+
+        # archives don't need any models
+        self.assertEqual(get_scope(['archive'], None),
+                         set(['archive.root.users_archived']))
+
+    def test__wrap_test(self):
+        compiler = dbt.compilation.Compiler(self.root_project_config, None)
+        test_sql = 'select * from events where id is null'
+
+        def wrap():
+            node = compiler.wrap_node(None, {
+                'resource_type': 'test',
+                'tags': set(['schema']),
+                'injected_sql': test_sql,
+            }, {}, {})
+
+            return node['execution_steps'][-1]['sql']
+
+        self.assertEqualIgnoreWhitespace(
+            wrap(),
+            'select count(*) from ({}) sbq'.format(test_sql))
+
+        dbt.flags.FAST_FAIL_TESTS = True
+
+        try:
+            self.assertEqualIgnoreWhitespace(
+                wrap(),
+                'select count(*) from (select 1 from ({}) dbt_test_sbq '
+                'limit 1) sbq'.format(test_sql))
+        finally:
+            dbt.flags.FAST_FAIL_TESTS = False
+
+    def test__wrap_sampled_test(self):
+        compiler = dbt.compilation.Compiler(self.root_project_config, None)
+        sample_sql = 'select * from "analytics"."events" limit 1000'
+
+        node = compiler.wrap_node(None, {
+            'resource_type': 'test',
+            'tags': set(['schema']),
+            'injected_sql': 'select * from __dbt__SAMPLE__events '
+                            'where id is null',
+            'sampled': True,
+            'sampled_relations': OrderedDict([
+                ('model.root.events', sample_sql),
+            ]),
+        }, {'model.root.events': {'name': 'events'}}, {})
+
+        self.assertEqualIgnoreWhitespace(
+            node['execution_steps'][-1]['sql'],
+            'select count(*) from (with __dbt__SAMPLE__events as ({}) '
+            'select * from __dbt__SAMPLE__events where id is null) sbq'
+            .format(sample_sql))
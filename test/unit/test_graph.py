@@ -1,6 +1,8 @@
 from mock import MagicMock
 import os
+import shutil
 import six
+import tempfile
 import unittest
 
 import dbt.compilation
@@ -23,12 +25,16 @@ class GraphTest(unittest.TestCase):
     def tearDown(self):
         nx.write_gpickle = self.real_write_gpickle
         dbt.utils.dependency_projects = self.real_dependency_projects
-        dbt.clients.system.find_matching = self.real_find_matching
+        dbt.clients.system.FileScanner.find_matching = \
+            self.real_find_matching
         dbt.clients.system.load_file_contents = self.real_load_file_contents
+        shutil.rmtree(self.target_path)
 
     def setUp(self):
         dbt.flags.STRICT_MODE = True
 
+        self.target_path = tempfile.mkdtemp()
+
         def mock_write_gpickle(graph, outfile):
             self.graph_result = graph
 
@@ -73,8 +79,8 @@ class GraphTest(unittest.TestCase):
 
             return to_return
 
-        self.real_find_matching = dbt.clients.system.find_matching
-        dbt.clients.system.find_matching = MagicMock(
+        self.real_find_matching = dbt.clients.system.FileScanner.find_matching
+        dbt.clients.system.FileScanner.find_matching = MagicMock(
             side_effect=mock_find_matching)
 
         def mock_load_file_contents(path):
@@ -93,6 +99,7 @@ class GraphTest(unittest.TestCase):
             'version': '0.1',
             'profile': 'test',
             'project-root': os.path.abspath('.'),
+            'target-path': self.target_path,
         }
         cfg.update(extra_cfg)
 
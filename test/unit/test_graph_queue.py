@@ -0,0 +1,38 @@
+import unittest
+
+from dbt.graph.queue import GraphQueue
+
+
+class GraphQueueTest(unittest.TestCase):
+
+    def test__ready_once_ancestors_compiled(self):
+        queue = GraphQueue(['a', 'c'])
+
+        # c is compiled first, but b hasn't been compiled yet
+        self.assertEquals(queue.add('c', ['b']), ([], []))
+        self.assertEquals(queue.add('a', []), (['a'], []))
+
+        # b isn't selected, so it's passed through once a finishes
+        self.assertEquals(queue.add('b', ['a']), ([], []))
+        self.assertEquals(queue.mark_done('a'), (['c'], []))
+
+        self.assertFalse(queue.is_complete())
+        self.assertEquals(queue.mark_done('c'), ([], []))
+        self.assertTrue(queue.is_complete())
+
+    def test__failure_skips_descendants(self):
+        queue = GraphQueue(['a', 'c', 'd'])
+
+        queue.add('a', [])
+        queue.add('b', ['a'])
+        queue.add('c', ['b'])
+        queue.add('d', [])
+
+        ready, skipped = queue.mark_done('a', succeeded=False)
+
+        self.assertEquals(ready, [])
+        self.assertEquals(skipped, ['c'])
+
+        self.assertFalse(queue.is_complete())
+        queue.mark_done('d')
+        self.assertTrue(queue.is_complete())
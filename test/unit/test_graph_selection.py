@@ -96,6 +96,66 @@ class GraphSelectionTest(unittest.TestCase):
             ['b'],
             set(['m.X.a','m.X.c', 'm.Y.d','m.X.e','m.Y.f','m.X.g']))
 
+    def test__fqn_trie_matches_is_selected_node(self):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(['model.X.a', 'model.X.b', 'model.Y.a',
+                              'test.X.a.b', 'model.X.X', 'model.a.X'])
+
+        trie = graph_selector.FqnTrie.from_graph(graph)
+
+        parts = ['X', 'Y', 'a', 'b', '*', 'missing']
+        selectors = [(p,) for p in parts] + \
+            [(p, q) for p in parts for q in parts] + \
+            [(p, q, r) for p in parts for q in parts for r in parts]
+
+        for selector in selectors:
+            expected = set(
+                node for node in graph.nodes()
+                if graph_selector.is_selected_node(node.split('.')[1:],
+                                                   selector))
+
+            self.assertEquals(trie.select(selector), expected, selector)
+
+    def test__multi_source_traversal(self):
+        graph = nx.gn_graph(200, seed=1)
+        sources = [5, 17, 42, 120]
+
+        ancestors = set()
+        descendants = set()
+
+        for node in sources:
+            ancestors.update(nx.ancestors(graph, node))
+            descendants.update(nx.descendants(graph, node))
+
+        self.assertEquals(graph_selector.get_ancestors(graph, sources),
+                          ancestors)
+        self.assertEquals(graph_selector.get_descendants(graph, sources),
+                          descendants)
+
+    def test__select_children_with_tests(self):
+        graph = self.package_graph.copy()
+        graph.add_node('t.X.not_null_f', resource_type='test')
+        graph.add_edge('m.X.c', 't.X.not_null_f')
+        graph.add_node('t.X.not_null_b', resource_type='test')
+        graph.add_edge('m.Y.b', 't.X.not_null_b')
+
+        self.run_specs_and_assert(
+            graph,
+            ['X.c+'],
+            [],
+            set(['m.X.c', 'm.Y.f', 'm.X.g', 't.X.not_null_f']))
+
+    def test__select_unfinished(self):
+        # X.a and Y.b finished, X.c didn't: rerun X.c and its children,
+        # but only those which were selected
+        selected = set(['m.X.a', 'm.Y.b', 'm.X.c', 'm.Y.f', 'm.Y.d'])
+
+        self.assertEquals(
+            graph_selector.select_unfinished(self.package_graph,
+                                             selected,
+                                             ['m.X.a', 'm.Y.b', 'm.Y.f']),
+            set(['m.X.c', 'm.Y.f', 'm.Y.d']))
+
     def parse_spec_and_assert(self, spec, parents, children, qualified_node_name):
         parsed = graph_selector.parse_spec(spec)
         self.assertEquals(
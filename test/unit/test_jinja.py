@@ -0,0 +1,86 @@
+import unittest
+
+from datetime import datetime
+
+import dbt.clients.jinja
+
+from dbt.clients.jinja import RenderMode
+
+
+class JinjaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.context = {
+            'run_started_at': datetime(2017, 1, 1, 12, 30),
+            'invocation_id': 'abc-123',
+            'get_columns_in_table': lambda schema, table: ['"a"', '"b"'],
+        }
+
+    def test__render_mode__plain_sql(self):
+        self.assertEquals(
+            dbt.clients.jinja.get_render_mode('select 1 as id'),
+            None)
+
+    def test__render_mode__placeholders(self):
+        sql = ("select '{{ run_started_at }}' as ts, "
+               "'{{invocation_id}}' as id")
+
+        self.assertEquals(
+            dbt.clients.jinja.get_render_mode(sql),
+            RenderMode.Placeholders)
+
+    def test__render_mode__jinja(self):
+        sql = ("{% set cols = get_columns_in_table('a', 'b') %}"
+               "select '{{ run_started_at }}' as ts")
+
+        self.assertEquals(
+            dbt.clients.jinja.get_render_mode(sql),
+            RenderMode.Jinja)
+
+    def test__placeholders_match_full_render(self):
+        sql = ("select '{{ run_started_at }}' as ts, "
+               "'{{invocation_id}}' as id")
+
+        self.assertEquals(
+            dbt.clients.jinja.get_rendered_for_runtime(
+                sql, RenderMode.Placeholders, self.context),
+            dbt.clients.jinja.get_rendered(sql, self.context))
+
+    def test__cached_template(self):
+        sql = "select {{ get_columns_in_table('a', 'b') | join(', ') }}"
+
+        first = dbt.clients.jinja.get_cached_template(sql)
+        second = dbt.clients.jinja.get_cached_template(sql)
+
+        self.assertIs(first, second)
+        self.assertEquals(
+            dbt.clients.jinja.get_rendered_for_runtime(
+                sql, RenderMode.Jinja, self.context),
+            'select "a", "b"')
+
+    def test__extract_static_calls(self):
+        sql = ("{{ config(materialized='table', sort=['a', 'b']) }}"
+               "select {{ utils.cast(var('x'), 'int') }} "
+               "from {{ ref('events') }} join {{ ref('pkg', 'users') }} "
+               "where {{ helper() }}")
+
+        self.assertEquals(
+            dbt.clients.jinja.extract_static_calls(sql, 'root'),
+            {
+                'refs': [['events'], ['pkg', 'users']],
+                'configs': [{'materialized': 'table', 'sort': ['a', 'b']}],
+                'macros': ['macro.utils.cast', 'macro.root.helper'],
+            })
+
+    def test__extract_static_calls__dynamic(self):
+        for sql in ["{% if target.name == 'prod' %}{{ ref('a') }}{% endif %}",
+                    "{% for t in ['a', 'b'] %}{{ ref(t) }}{% endfor %}",
+                    "{% set name = 'a' %}{{ ref(name) }}",
+                    "{{ ref('a' ~ 'b') }}",
+                    "{{ config(materialized=var('m')) }}",
+                    "{{ ref('a') | upper }}",
+                    "{{ ref('a'"]:
+            self.assertEquals(
+                dbt.clients.jinja.extract_static_calls(sql, 'root'),
+                None,
+                sql)
@@ -1,8 +1,16 @@
 import unittest
+from mock import MagicMock, patch
 
 import jinja2.runtime
+import json
 import os
+import shutil
+import tempfile
 
+import dbt.clients.jinja
+import dbt.clients.system
+import dbt.compat
+import dbt.exceptions
 import dbt.flags
 import dbt.parser
 
@@ -75,6 +83,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'model_one.sql',
                     'raw_sql': self.find_input_by_name(
                         models, 'model_one').get('raw_sql')
@@ -82,6 +91,193 @@ class ParserTest(unittest.TestCase):
             }
         )
 
+    def test__identifiers_are_interned(self):
+        models = [{
+            'name': 'model_{}'.format(i),
+            'resource_type': 'model',
+            'package_name': ''.join(['ro', 'ot']),
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'model_{}.sql'.format(i),
+            'raw_sql': ("select * from events"),
+        } for i in range(2)]
+
+        parsed = dbt.parser.parse_sql_nodes(
+            models,
+            self.root_project_config,
+            {'root': self.root_project_config,
+             'snowplow': self.snowplow_project_config})
+
+        one = parsed['model.root.model_0']
+        two = parsed['model.root.model_1']
+
+        self.assertIs(one['package_name'], two['package_name'])
+        self.assertIs(one['fqn'][0], two['fqn'][0])
+        self.assertIs(one['unique_id'],
+                      dbt.compat.intern('model.root.model_0'))
+
+    def test__partial_parse_cache(self):
+        models = [{
+            'name': 'model_one',
+            'resource_type': 'model',
+            'package_name': 'root',
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'model_one.sql',
+            'raw_sql': ("{{ config(materialized='table') }}"
+                        "select *, {{package.simple(1, 2)}} "
+                        "from {{ref('events')}}"),
+        }]
+
+        all_projects = {'root': self.root_project_config,
+                        'snowplow': self.snowplow_project_config}
+
+        parse_cache = dbt.parser.PartialParseCache()
+        parsed = dbt.parser.parse_sql_nodes(
+            models, self.root_project_config, all_projects,
+            parse_cache=parse_cache)
+
+        # nodes are parsed from the cache without rendering them
+        next_cache = dbt.parser.PartialParseCache()
+        next_cache.previous = parse_cache.entries
+
+        real_render = dbt.parser.render_for_parse
+        dbt.parser.render_for_parse = MagicMock()
+
+        try:
+            self.assertEquals(
+                dbt.parser.parse_sql_nodes(
+                    models, self.root_project_config, all_projects,
+                    parse_cache=next_cache),
+                parsed)
+
+            self.assertFalse(dbt.parser.render_for_parse.called)
+
+            # changes to the project config still apply
+            root_project_config = self.root_project_config.copy()
+            root_project_config['models'] = {'root': {'enabled': False}}
+
+            reparsed = dbt.parser.parse_sql_nodes(
+                models, root_project_config,
+                {'root': root_project_config,
+                 'snowplow': self.snowplow_project_config},
+                parse_cache=next_cache)
+
+            self.assertFalse(dbt.parser.render_for_parse.called)
+            self.assertFalse(
+                reparsed['model.root.model_one']['config']['enabled'])
+            self.assertEquals(
+                reparsed['model.root.model_one']['config']['materialized'],
+                'table')
+
+            # changed sql is rendered again
+            changed = [dict(models[0], raw_sql='select 1')]
+            dbt.parser.render_for_parse.return_value = []
+
+            dbt.parser.parse_sql_nodes(
+                changed, self.root_project_config, all_projects,
+                parse_cache=next_cache)
+
+            self.assertTrue(dbt.parser.render_for_parse.called)
+        finally:
+            dbt.parser.render_for_parse = real_render
+
+    def test__unchanged_files_not_read(self):
+        root = tempfile.mkdtemp()
+        all_projects = {'root': self.root_project_config,
+                        'snowplow': self.snowplow_project_config}
+
+        def write(name, contents):
+            with open(os.path.join(root, 'models', name), 'w') as fh:
+                fh.write(contents)
+
+        cache_path = os.path.join(root, 'target', 'partial_parse.json')
+
+        def parse():
+            parse_cache = dbt.parser.PartialParseCache(cache_path)
+
+            parsed = dbt.parser.load_and_parse_sql(
+                'root', self.root_project_config, all_projects, root,
+                ['models'], 'model',
+                file_scanner=dbt.clients.system.FileScanner(),
+                parse_cache=parse_cache)
+
+            parse_cache.write()
+
+            return parsed
+
+        try:
+            os.makedirs(os.path.join(root, 'models'))
+            write('model_one.sql', 'select 1 as id')
+            write('model_two.sql', "select * from {{ ref('model_one') }}")
+
+            first = parse()
+
+            write('model_two.sql', "select id from {{ ref('model_one') }}")
+            load_file_contents = dbt.clients.system.load_file_contents
+
+            with patch('dbt.clients.system.load_file_contents',
+                       side_effect=load_file_contents) as mock_load:
+                second = parse()
+
+            mock_load.assert_called_once_with(
+                os.path.join(root, 'models', 'model_two.sql'))
+
+            self.assertEquals(second['model.root.model_one'],
+                              first['model.root.model_one'])
+            self.assertEquals(second['model.root.model_two']['raw_sql'],
+                              "select id from {{ ref('model_one') }}")
+
+            # contents stored with a different stat aren't trusted
+            with open(cache_path) as fh:
+                stored = json.load(fh)
+
+            model_one_path = os.path.join(root, 'models', 'model_one.sql')
+            stored['files'][model_one_path] = {'stat': [0, 0, 0],
+                                               'contents': 'select 2'}
+
+            with open(cache_path, 'w') as fh:
+                json.dump(stored, fh)
+
+            third = parse()
+
+            self.assertEquals(third['model.root.model_one']['raw_sql'],
+                              'select 1 as id')
+        finally:
+            shutil.rmtree(root)
+
+    def test__static_and_rendered_parse_match(self):
+        all_projects = {'root': self.root_project_config,
+                        'snowplow': self.snowplow_project_config}
+
+        for raw_sql in [
+                "{{ config(materialized='table') }} select 1",
+                "select * from {{ ref('a') }}, {{ ref('snowplow', 'b') }}",
+                "select {{ snowplow.cast(var('x'), 'int') }}, {{ helper() }}",
+                "{% if var('x') %}{{ config(enabled=False) }}{% endif %}"
+                "select * from {{ ref('a') }}"]:
+            models = [{
+                'name': 'model_one',
+                'resource_type': 'model',
+                'package_name': 'root',
+                'root_path': get_os_path('/usr/src/app'),
+                'path': 'model_one.sql',
+                'raw_sql': raw_sql,
+            }]
+
+            parsed = dbt.parser.parse_sql_nodes(
+                models, self.root_project_config, all_projects)
+
+            real_extract = dbt.clients.jinja.extract_static_calls
+            dbt.clients.jinja.extract_static_calls = MagicMock(
+                return_value=None)
+
+            try:
+                rendered = dbt.parser.parse_sql_nodes(
+                    models, self.root_project_config, all_projects)
+            finally:
+                dbt.clients.jinja.extract_static_calls = real_extract
+
+            self.assertEquals(parsed, rendered, raw_sql)
+
     def test__single_model__nested_configuration(self):
         models = [{
             'name': 'model_one',
@@ -135,6 +331,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': ephemeral_config,
                     'tags': set(),
+                    'refs': [],
                     'path': get_os_path('nested/path/model_one.sql'),
                     'raw_sql': self.find_input_by_name(
                         models, 'model_one').get('raw_sql')
@@ -171,6 +368,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'model_one.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -216,6 +414,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'base.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -234,6 +433,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['base']],
                     'path': 'events_tx.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -304,6 +504,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'events.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -322,6 +523,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'sessions.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -340,6 +542,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['events']],
                     'path': 'events_tx.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -358,6 +561,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['sessions']],
                     'path': 'sessions_tx.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -376,6 +580,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['sessions_tx'], ['events_tx']],
                     'path': 'multi.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -448,6 +653,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'events.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -466,6 +672,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'sessions.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -484,6 +691,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['events']],
                     'path': 'events_tx.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -502,6 +710,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['sessions']],
                     'path': 'sessions_tx.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -520,6 +729,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [['snowplow', 'sessions_tx'], ['snowplow', 'events_tx']],
                     'path': 'multi.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
@@ -563,6 +773,7 @@ class ParserTest(unittest.TestCase):
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'root_path': get_os_path('/usr/src/app'),
                     'path': 'model_one.sql',
                     'raw_sql': self.find_input_by_name(
@@ -646,6 +857,7 @@ class ParserTest(unittest.TestCase):
                     'path': 'table.sql',
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
                         models, 'table').get('raw_sql')
@@ -664,6 +876,7 @@ class ParserTest(unittest.TestCase):
                     'path': 'ephemeral.sql',
                     'config': ephemeral_config,
                     'tags': set(),
+                    'refs': [],
                     'root_path': get_os_path('/usr/src/app'),
                     'raw_sql': self.find_input_by_name(
                         models, 'ephemeral').get('raw_sql')
@@ -683,6 +896,7 @@ class ParserTest(unittest.TestCase):
                     'root_path': get_os_path('/usr/src/app'),
                     'config': view_config,
                     'tags': set(),
+                    'refs': [],
                     'raw_sql': self.find_input_by_name(
                         models, 'ephemeral').get('raw_sql')
                 }
@@ -814,6 +1028,7 @@ class ParserTest(unittest.TestCase):
                     'root_path': get_os_path('/usr/src/app'),
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'raw_sql': self.find_input_by_name(
                         models, 'table').get('raw_sql')
                 },
@@ -832,6 +1047,7 @@ class ParserTest(unittest.TestCase):
                     'root_path': get_os_path('/usr/src/app'),
                     'config': ephemeral_config,
                     'tags': set(),
+                    'refs': [],
                     'raw_sql': self.find_input_by_name(
                         models, 'ephemeral').get('raw_sql')
                 },
@@ -850,6 +1066,7 @@ class ParserTest(unittest.TestCase):
                     'root_path': get_os_path('/usr/src/app'),
                     'config': view_config,
                     'tags': set(),
+                    'refs': [],
                     'raw_sql': self.find_input_by_name(
                         models, 'view').get('raw_sql')
                 },
@@ -868,6 +1085,7 @@ class ParserTest(unittest.TestCase):
                     'root_path': get_os_path('/usr/src/app'),
                     'config': disabled_config,
                     'tags': set(),
+                    'refs': [],
                     'raw_sql': self.find_input_by_name(
                         models, 'disabled').get('raw_sql')
                 },
@@ -886,6 +1104,7 @@ class ParserTest(unittest.TestCase):
                     'root_path': get_os_path('/usr/src/app'),
                     'config': sort_config,
                     'tags': set(),
+                    'refs': [],
                     'raw_sql': self.find_input_by_name(
                         models, 'package').get('raw_sql')
                 }
@@ -953,6 +1172,8 @@ class ParserTest(unittest.TestCase):
                     'path': get_os_path(
                         'schema_test/not_null_model_one_id.sql'),
                     'tags': set(['schema']),
+                    'refs': [['model_one']],
+                    'test_metadata': {'type': 'not_null', 'field': 'id'},
                     'raw_sql': not_null_sql,
                 },
                 'test.root.unique_model_one_id': {
@@ -970,6 +1191,8 @@ class ParserTest(unittest.TestCase):
                     'config': self.model_config,
                     'path': get_os_path('schema_test/unique_model_one_id.sql'),
                     'tags': set(['schema']),
+                    'refs': [['model_one']],
+                    'test_metadata': {'type': 'unique', 'field': 'id'},
                     'raw_sql': unique_sql,
                 },
                 'test.root.accepted_values_model_one_id': {
@@ -989,6 +1212,10 @@ class ParserTest(unittest.TestCase):
                     'path': get_os_path(
                         'schema_test/accepted_values_model_one_id.sql'),
                     'tags': set(['schema']),
+                    'refs': [['model_one']],
+                    'test_metadata': {'type': 'accepted_values',
+                                      'field': 'id',
+                                      'values_csv': "'a','b'"},
                     'raw_sql': accepted_values_sql,
                 },
                 'test.root.relationships_model_one_id_to_model_two_id': {
@@ -1007,6 +1234,11 @@ class ParserTest(unittest.TestCase):
                     'config': self.model_config,
                     'path': get_os_path('schema_test/relationships_model_one_id_to_model_two_id.sql'), # noqa
                     'tags': set(['schema']),
+                    'refs': [['model_two'], ['model_one']],
+                    'test_metadata': {'type': 'relationships',
+                                      'from': 'id',
+                                      'to': 'model_two',
+                                      'field': 'id'},
                     'raw_sql': relationships_sql,
                 }
 
@@ -1014,6 +1246,110 @@ class ParserTest(unittest.TestCase):
             }
         )
 
+    def test__schema_tests_are_not_rendered(self):
+        tests = [{
+            'name': 'test_one',
+            'resource_type': 'test',
+            'package_name': 'root',
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'test_one.yml',
+            'raw_sql': None,
+            'raw_yml': ('{model_one: {constraints: {not_null: [id],'
+                        'relationships: [{from: id, to: model_two, field: id}]'
+                        '}}}')
+        }]
+
+        real_render = dbt.parser.render_for_parse
+        dbt.parser.render_for_parse = MagicMock()
+
+        try:
+            parsed = dbt.parser.parse_schema_tests(
+                tests,
+                self.root_project_config,
+                {'root': self.root_project_config,
+                 'snowplow': self.snowplow_project_config})
+
+            self.assertFalse(dbt.parser.render_for_parse.called)
+        finally:
+            dbt.parser.render_for_parse = real_render
+
+        self.assertEquals(
+            parsed['test.root.not_null_model_one_id']['refs'],
+            [['model_one']])
+        self.assertEquals(
+            parsed['test.root.relationships_model_one_id_to_model_two_id']
+            ['refs'],
+            [['model_two'], ['model_one']])
+
+    def test__schema_test_templates(self):
+        tests = [{
+            'name': 'test_one',
+            'resource_type': 'test',
+            'package_name': 'root',
+            'root_path': get_os_path('/usr/src/app'),
+            'path': 'test_one.yml',
+            'raw_sql': None,
+            'raw_yml': ('{model_one: {constraints: {not_null: [id],'
+                        'relationships: [{from: id, to: model_two, field: id}]'
+                        '}}}')
+        }]
+
+        parsed = dbt.parser.parse_schema_tests(
+            tests,
+            self.root_project_config,
+            {'root': self.root_project_config,
+             'snowplow': self.snowplow_project_config},
+            templates={'relationships': 'select {child_field} from '
+                                        '{child_ref} except select '
+                                        '{parent_field} from {parent_ref}'})
+
+        self.assertEquals(
+            parsed['test.root.not_null_model_one_id']['raw_sql'],
+            dbt.parser.QUERY_VALIDATE_NOT_NULL.format(
+                ref="{{ref('model_one')}}", field='id'))
+        self.assertEquals(
+            parsed['test.root.relationships_model_one_id_to_model_two_id']
+            ['raw_sql'],
+            "select id from {{ref('model_one')}} except select id from "
+            "{{ref('model_two')}}")
+
+    def test__archive_strategy(self):
+        project = {
+            'name': 'root',
+            'project-root': get_os_path('/usr/src/app'),
+            'archive': [{
+                'source_schema': 'production',
+                'target_schema': 'archive',
+                'strategy': 'incremental',
+                'tables': [
+                    {'source_table': 'users', 'target_table': 'users_a',
+                     'updated_at': 'updated_at', 'unique_key': 'id'},
+                    {'source_table': 'orders', 'target_table': 'orders_a',
+                     'updated_at': 'updated_at', 'unique_key': 'id',
+                     'strategy': 'full'}]
+            }, {
+                'source_schema': 'production',
+                'target_schema': 'archive',
+                'tables': [
+                    {'source_table': 'events', 'target_table': 'events_a',
+                     'updated_at': 'updated_at', 'unique_key': 'id'}]
+            }]
+        }
+
+        archives = dbt.parser.parse_archives_from_project(project)
+
+        self.assertEquals(
+            [(archive['name'], archive['config']['strategy'])
+             for archive in archives],
+            [('users_a', 'incremental'),
+             ('orders_a', 'full'),
+             ('events_a', 'full')])
+
+        project['archive'][1]['tables'][0]['strategy'] = 'merge'
+
+        with self.assertRaises(dbt.exceptions.ValidationException):
+            dbt.parser.parse_archives_from_project(project)
+
     def test__schema_test_with_comments(self):
         tests = [{
             'name': 'commented_test',
@@ -1094,6 +1430,7 @@ another_model:
                     'path': 'no_events.sql',
                     'root_path': get_os_path('/usr/src/app'),
                     'tags': set(),
+                    'refs': [['base']],
                     'raw_sql': self.find_input_by_name(
                         tests, 'no_events').get('raw_sql')
                 }
@@ -1208,6 +1545,7 @@ another_model:
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'model_one.sql',
                     'raw_sql': self.find_input_by_name(
                         models, 'model_one').get('raw_sql')
@@ -1248,6 +1586,7 @@ another_model:
                     },
                     'config': self.model_config,
                     'tags': set(),
+                    'refs': [],
                     'path': 'model_one.sql',
                     'raw_sql': self.find_input_by_name(
                         models, 'model_one').get('raw_sql')
@@ -1,6 +1,11 @@
 import unittest
 
+from mock import MagicMock, patch
+from multiprocessing.dummy import Pool as ThreadPool
+
+import dbt.adapters.cache
 import dbt.flags as flags
+import dbt.templates
 
 from dbt.adapters.postgres import PostgresAdapter
 from dbt.exceptions import ValidationException
@@ -45,3 +50,65 @@ class TestPostgresAdapter(unittest.TestCase):
         self.assertNotEquals(connection.get('handle'), None)
 
         self.assertEquals(connection, duplicate)
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.acquire_connection')
+    def test__release_thread_connections(self, mock_acquire):
+        dbt.adapters.cache.reset()
+        mock_acquire.side_effect = lambda profile: {'handle': MagicMock()}
+
+        own = PostgresAdapter.get_connection(self.profile)
+
+        pool = ThreadPool(2)
+        leased = pool.map(lambda i: PostgresAdapter.get_connection(
+            self.profile), range(4))
+        pool.close()
+        pool.join()
+
+        PostgresAdapter.release_thread_connections(self.profile)
+
+        for connection in leased:
+            connection['handle'].close.assert_called_once_with()
+
+        self.assertFalse(own['handle'].close.called)
+        self.assertEquals(
+            list(dbt.adapters.postgres.connection_cache.values()), [own])
+
+        dbt.adapters.cache.reset()
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.table_exists',
+           return_value=True)
+    def test__steps_to_execute(self, mock_table_exists):
+        condition = dbt.templates.relation_exists('public', 'model')
+        negated = dbt.templates.relation_exists('public', 'model',
+                                                exists=False)
+
+        steps = [
+            dbt.templates.sql_step('create table x', only_if=negated),
+            dbt.templates.sql_step('insert into x', only_if=condition),
+            dbt.templates.operation_step('expand_column_types_if_needed',
+                                         {}, only_if=condition),
+            dbt.templates.sql_step('select 1'),
+        ]
+
+        to_execute = PostgresAdapter.steps_to_execute(self.profile, steps)
+
+        self.assertEquals(to_execute, steps[1:])
+        mock_table_exists.assert_called_once_with(
+            self.profile, 'public', 'model')
+
+    def test__sample_relation(self):
+        self.assertEqual(
+            PostgresAdapter.sample_relation(
+                'analytics', 'events', 'view', {'rows': 1000}),
+            'select * from "analytics"."events" limit 1000')
+
+        self.assertEqual(
+            PostgresAdapter.sample_relation(
+                'analytics', 'events', 'table', {'percent': 10.0}),
+            'select * from "analytics"."events" '
+            'tablesample system (10.0) repeatable (1)')
+
+        # views can't be sampled by percentage
+        self.assertIsNone(
+            PostgresAdapter.sample_relation(
+                'analytics', 'events', 'view', {'percent': 10.0}))
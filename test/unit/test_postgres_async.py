@@ -0,0 +1,63 @@
+from mock import MagicMock, patch
+import unittest
+
+import dbt.compat
+
+
+@unittest.skipIf(dbt.compat.WHICH_PYTHON == 2, 'asyncio requires python 3')
+class AsyncQueryExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        import asyncio
+        import dbt.clients.postgres_async
+
+        self.state = {'in_flight': 0, 'max_in_flight': 0}
+
+        def fake_connect(dsn, loop):
+            connection = MagicMock(closed=False)
+            return asyncio.ensure_future(
+                asyncio.sleep(0, result=connection, loop=loop), loop=loop)
+
+        def fake_fetchall(connection, sql, loop):
+            self.state['in_flight'] += 1
+            self.state['max_in_flight'] = max(self.state['max_in_flight'],
+                                              self.state['in_flight'])
+
+            def finished(future):
+                self.state['in_flight'] -= 1
+
+            future = asyncio.ensure_future(
+                asyncio.sleep(0.01, result=[(0,)], loop=loop), loop=loop)
+            future.add_done_callback(finished)
+
+            return future
+
+        self.executor = dbt.clients.postgres_async.AsyncQueryExecutor(
+            'dbname=test', concurrency=3)
+
+        self.patches = [
+            patch('dbt.clients.postgres_async.connect', fake_connect),
+            patch('dbt.clients.postgres_async.fetchall', fake_fetchall),
+        ]
+
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test__concurrency_limit(self):
+        results = []
+
+        def on_complete(key, rows, error, execution_time):
+            results.append((key, rows, error))
+
+        queries = (('test_{}'.format(i), 'select 0') for i in range(20))
+
+        self.executor.run(queries, on_complete)
+
+        self.assertEquals(len(results), 20)
+        self.assertEquals(self.state['max_in_flight'], 3)
+        self.assertTrue(all(rows == [(0,)] and error is None
+                            for _, rows, error in results))
@@ -1,11 +1,25 @@
 from mock import MagicMock, patch
 import unittest
 
+import json
 import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
 
+import dbt.exceptions
 import dbt.flags
+import dbt.linker
+import dbt.main
 import dbt.parser
 import dbt.runner
+import dbt.schema
+import dbt.templates
+import dbt.tracking
+
+import networkx as nx
 
 from collections import OrderedDict
 
@@ -275,3 +289,766 @@ class TestRunner(unittest.TestCase):
         mock_adapter_truncate.assert_not_called()
         mock_adapter_rename.assert_called_once()
         mock_adapter_execute_model.assert_called_once()
+
+
+class TestWatchdog(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = {'type': 'postgres'}
+        self.connection = {'handle': MagicMock()}
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.cancel_connection')
+    def test__watchdog_cancels_after_timeout(self, mock_cancel):
+        watchdog = dbt.runner.Watchdog(self.profile, self.connection, 0.01)
+
+        with watchdog:
+            time.sleep(0.2)
+
+        self.assertTrue(watchdog.fired)
+        mock_cancel.assert_called_once_with(self.profile, self.connection)
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.cancel_connection')
+    def test__watchdog_not_fired(self, mock_cancel):
+        watchdog = dbt.runner.Watchdog(self.profile, self.connection, 10)
+
+        with watchdog:
+            pass
+
+        self.assertFalse(watchdog.fired)
+        mock_cancel.assert_not_called()
+
+    def test__timed_out_result(self):
+        result = dbt.runner.RunModelResult(
+            {}, error='canceled', status=dbt.runner.TIMEOUT_STATUS)
+
+        self.assertTrue(result.timed_out)
+        self.assertTrue(result.errored)
+
+
+class TestFailFast(unittest.TestCase):
+
+    def setUp(self):
+        dbt.tracking.do_not_track()
+
+        self.profile = {'type': 'postgres', 'threads': 1}
+
+        project = MagicMock()
+        project.run_environment.return_value = self.profile
+
+        args = MagicMock(threads=1, fail_fast=True, deadline=None)
+
+        self.target_path = tempfile.mkdtemp()
+        self.runner = dbt.runner.RunManager(project, self.target_path, args)
+
+    def tearDown(self):
+        shutil.rmtree(self.target_path)
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.cancel_connection')
+    def test__cancels_in_flight_on_first_error(self, mock_cancel):
+        connection = {'handle': MagicMock()}
+        running = {'unique_id': 'model.root.running'}
+        self.runner.in_flight['model.root.running'] = (running, connection)
+
+        failed = dbt.runner.RunModelResult(
+            {'unique_id': 'model.root.broken'}, error='boom', status='ERROR')
+
+        self.runner.fail_fast_on(failed)
+
+        self.assertEquals(self.runner.failed_node, failed.node)
+        self.assertEquals(self.runner.cancelled,
+                          {'model.root.running': running})
+        mock_cancel.assert_called_once_with(self.profile, connection)
+
+        # later failures don't cancel again
+        self.runner.fail_fast_on(dbt.runner.RunModelResult(
+            {'unique_id': 'model.root.other'}, error='boom', status='ERROR'))
+
+        mock_cancel.assert_called_once_with(self.profile, connection)
+
+    def test__skips_nodes_after_failure(self):
+        self.runner.stop_reason = 'model.root.broken failed'
+
+        result = self.runner.safe_execute_node(
+            ({'unique_id': 'model.root.next', 'config': {}}, {}))
+
+        self.assertTrue(result.skipped)
+
+
+class TestInterrupt(unittest.TestCase):
+
+    def setUp(self):
+        dbt.tracking.do_not_track()
+
+        self.profile = {'type': 'postgres', 'threads': 1}
+
+        project = MagicMock()
+        project.run_environment.return_value = self.profile
+
+        self.target_path = tempfile.mkdtemp()
+        self.runner = dbt.runner.RunManager(project, self.target_path,
+                                            MagicMock(threads=1))
+
+    def tearDown(self):
+        shutil.rmtree(self.target_path)
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.cancel_connection')
+    def test__interrupt_cancels_and_stops(self, mock_cancel):
+        connection = {'handle': MagicMock()}
+        running = {'unique_id': 'model.root.running'}
+        self.runner.in_flight['model.root.running'] = (running, connection)
+
+        self.runner.interrupt(signal.SIGTERM)
+
+        self.assertEquals(self.runner.interrupted_by, 'SIGTERM')
+        self.assertEquals(self.runner.stop_reason, 'dbt received SIGTERM')
+        mock_cancel.assert_called_once_with(self.profile, connection)
+
+        # a second signal exits immediately
+        with self.assertRaises(KeyboardInterrupt):
+            self.runner.interrupt(signal.SIGINT)
+
+    def test__write_results(self):
+        self.runner.interrupted_by = 'SIGINT'
+
+        self.runner.write_results([
+            dbt.runner.RunModelResult({'unique_id': 'model.root.a'},
+                                      status='CREATE VIEW',
+                                      execution_time=1.5),
+            dbt.runner.RunModelResult({'unique_id': 'model.root.b'},
+                                      skip=True),
+        ])
+
+        with open(os.path.join(self.target_path,
+                               dbt.runner.RESULTS_FILE_NAME)) as fh:
+            written = json.load(fh)
+
+        self.assertTrue(written['interrupted'])
+        self.assertEquals(
+            [(r['unique_id'], r['status'], r['skipped'])
+             for r in written['results']],
+            [('model.root.a', 'CREATE VIEW', False),
+             ('model.root.b', None, True)])
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        dbt.tracking.do_not_track()
+
+        project = MagicMock()
+        project.run_environment.return_value = {'type': 'postgres',
+                                                'threads': 1}
+
+        self.target_path = tempfile.mkdtemp()
+        self.runner = dbt.runner.RunManager(project, self.target_path,
+                                            MagicMock(threads=1))
+
+        self.nodes = {
+            'model.root.a': self.node('model.root.a', []),
+            'model.root.b': self.node('model.root.b', ['model.root.a']),
+            'model.root.c': self.node('model.root.c', ['model.root.b']),
+        }
+
+        self.graph = nx.DiGraph()
+        self.graph.add_edges_from([('model.root.a', 'model.root.b'),
+                                   ('model.root.b', 'model.root.c')])
+
+    def tearDown(self):
+        shutil.rmtree(self.target_path)
+
+    def node(self, unique_id, parents):
+        return {
+            'unique_id': unique_id,
+            'resource_type': 'model',
+            'injected_sql': 'select 1',
+            'config': {'materialized': 'table'},
+            'depends_on': {'nodes': parents},
+        }
+
+    def write_previous(self, results):
+        self.runner.fingerprints = dbt.runner.get_fingerprints(self.nodes)
+        self.runner.write_results([
+            dbt.runner.RunModelResult(self.nodes[unique_id], **result)
+            for unique_id, result in results])
+
+    def test__fingerprints_change_downstream(self):
+        before = dbt.runner.get_fingerprints(self.nodes)
+
+        self.nodes['model.root.b']['injected_sql'] = 'select 2'
+        after = dbt.runner.get_fingerprints(self.nodes)
+
+        self.assertEquals(before['model.root.a'], after['model.root.a'])
+        self.assertNotEquals(before['model.root.b'], after['model.root.b'])
+        self.assertNotEquals(before['model.root.c'], after['model.root.c'])
+
+    def test__resume_after_failure(self):
+        self.write_previous([
+            ('model.root.a', {'status': 'SELECT 1'}),
+            ('model.root.b', {'status': 'ERROR', 'error': 'oops'}),
+            ('model.root.c', {'skip': True}),
+        ])
+
+        to_run = self.runner.get_nodes_to_resume(self.graph,
+                                                 set(self.nodes))
+
+        self.assertEquals(to_run, set(['model.root.b', 'model.root.c']))
+        self.assertEquals(
+            [r['unique_id'] for r in self.runner.resumed_results],
+            ['model.root.a'])
+
+    def test__resume_reruns_changed_nodes(self):
+        self.write_previous([
+            ('model.root.a', {'status': 'SELECT 1'}),
+            ('model.root.b', {'status': 'SELECT 1'}),
+        ])
+
+        # c never ran, and a has changed since
+        self.nodes['model.root.a']['config']['materialized'] = 'view'
+        self.runner.fingerprints = dbt.runner.get_fingerprints(self.nodes)
+
+        to_run = self.runner.get_nodes_to_resume(self.graph,
+                                                 set(self.nodes))
+
+        self.assertEquals(to_run, set(self.nodes))
+
+    def test__resume_without_results(self):
+        with self.assertRaises(dbt.exceptions.RuntimeException):
+            self.runner.get_nodes_to_resume(self.graph, set(self.nodes))
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_default_schema',
+           return_value='analytics')
+    @patch('dbt.adapters.postgres.PostgresAdapter.query_for_existing')
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_source_freshness')
+    def test__skip_unchanged(self, mock_freshness, mock_existing,
+                             mock_schema):
+        for node in self.nodes.values():
+            node['name'] = node['unique_id'].split('.')[-1]
+
+        self.nodes['model.root.a']['config']['source_tables'] = [
+            'raw.orders', 'customers']
+        self.nodes['model.root.b']['config']['source_tables'] = []
+        self.nodes['model.root.c']['config']['source_tables'] = []
+
+        mock_existing.return_value = {'a': 'table', 'b': 'table',
+                                      'c': 'table'}
+        mock_freshness.return_value = {('raw', 'orders'): '10:0:0:1',
+                                       ('analytics', 'customers'): '5:0:0:2'}
+
+        def rebuild():
+            return self.runner.get_nodes_to_rebuild(self.graph, self.nodes,
+                                                    set(self.nodes))
+
+        # nothing has been built yet
+        self.assertEquals(rebuild(), set(self.nodes))
+
+        self.runner.write_build_state([
+            dbt.runner.RunModelResult(node, status='SELECT 1')
+            for node in self.nodes.values()])
+
+        self.assertEquals(rebuild(), set())
+
+        # a source table was written to: a and everything downstream of it
+        mock_freshness.return_value[('raw', 'orders')] = '11:0:0:1'
+        self.assertEquals(rebuild(), set(self.nodes))
+
+        self.runner.write_build_state([
+            dbt.runner.RunModelResult(self.nodes['model.root.a'],
+                                      status='SELECT 1'),
+            dbt.runner.RunModelResult(self.nodes['model.root.b'],
+                                      status='ERROR', error='oops'),
+            dbt.runner.RunModelResult(self.nodes['model.root.c'],
+                                      skip=True)])
+
+        self.assertEquals(rebuild(), set(['model.root.b', 'model.root.c']))
+
+        # c was dropped
+        del mock_existing.return_value['c']
+        self.runner.write_build_state([
+            dbt.runner.RunModelResult(node, status='SELECT 1')
+            for node in self.nodes.values()])
+
+        self.assertEquals(rebuild(), set(['model.root.c']))
+
+        # a source table can't be found
+        del mock_freshness.return_value[('analytics', 'customers')]
+        self.assertEquals(rebuild(), set(self.nodes))
+
+        mock_freshness.return_value[('analytics', 'customers')] = '5:0:0:2'
+        mock_existing.return_value['c'] = 'table'
+        rebuild()
+        self.runner.write_build_state([
+            dbt.runner.RunModelResult(node, status='SELECT 1')
+            for node in self.nodes.values()])
+        self.assertEquals(rebuild(), set())
+
+        # b doesn't declare its source tables, so it might read raw tables
+        # which have changed: it's always rebuilt, along with c
+        del self.nodes['model.root.b']['config']['source_tables']
+        rebuild()
+        self.runner.write_build_state([
+            dbt.runner.RunModelResult(node, status='SELECT 1')
+            for node in self.nodes.values()])
+        self.assertEquals(rebuild(), set(['model.root.b', 'model.root.c']))
+
+
+class TestTestCache(unittest.TestCase):
+
+    def setUp(self):
+        dbt.tracking.do_not_track()
+
+        project = MagicMock()
+        project.run_environment.return_value = {'type': 'postgres',
+                                                'threads': 1}
+
+        self.target_path = tempfile.mkdtemp()
+        self.args = MagicMock(threads=1, no_cache=False)
+        self.runner = self.make_runner()
+
+        self.linker = dbt.linker.Linker()
+
+        for unique_id, node in [
+                ('model.root.a', self.model('a', 'table', [])),
+                ('model.root.v', self.model('v', 'view', ['model.root.a'],
+                                            source_tables=[])),
+                ('model.root.raw_v', self.model('raw_v', 'view', [])),
+                ('test.root.not_null_a_id',
+                 self.check_node(['model.root.a'], {'type': 'not_null'})),
+                ('test.root.unique_v_id',
+                 self.check_node(['model.root.v'], {'type': 'unique'})),
+                ('test.root.data_test_a',
+                 self.check_node(['model.root.a']))]:
+            node['unique_id'] = unique_id
+            self.linker.update_node_data(unique_id, node)
+
+        self.tests = set(['test.root.not_null_a_id',
+                          'test.root.unique_v_id',
+                          'test.root.data_test_a'])
+
+    def tearDown(self):
+        shutil.rmtree(self.target_path)
+
+    def make_runner(self):
+        project = MagicMock()
+        project.run_environment.return_value = {'type': 'postgres',
+                                                'threads': 1}
+
+        return dbt.runner.RunManager(project, self.target_path, self.args)
+
+    def model(self, name, materialized, parents, **config):
+        config['materialized'] = materialized
+
+        return {'name': name, 'resource_type': 'model',
+                'config': config,
+                'depends_on': {'nodes': parents}}
+
+    def check_node(self, parents, test_metadata=None):
+        node = {'name': 'test', 'resource_type': 'test', 'config': {},
+                'execution_steps': [{'sql': 'select 0'}],
+                'depends_on': {'nodes': parents}}
+
+        if test_metadata is not None:
+            node['test_metadata'] = test_metadata
+
+        return node
+
+    def run_invocation(self, models=(), tests=frozenset()):
+        """returns the tests that weren't cached"""
+        self.runner = self.make_runner()
+        to_run = self.runner.drop_cached_tests(self.linker, tests)
+
+        self.runner.write_test_cache([
+            dbt.runner.RunModelResult(self.linker.get_node(unique_id),
+                                      status=0)
+            for unique_id in list(models) + list(to_run)])
+
+        return to_run
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_default_schema',
+           return_value='analytics')
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_source_freshness')
+    def test__cached_passes(self, mock_freshness, mock_schema):
+        mock_freshness.return_value = {('analytics', 'a'): '10:0:0:1'}
+
+        # the models haven't been built by dbt yet
+        self.assertEquals(self.run_invocation(tests=self.tests), self.tests)
+
+        self.run_invocation(models=['model.root.a', 'model.root.v'])
+        self.assertEquals(self.run_invocation(tests=self.tests), self.tests)
+
+        # data tests are never cached
+        self.assertEquals(self.run_invocation(tests=self.tests),
+                          set(['test.root.data_test_a']))
+        self.assertEquals(len(self.runner.cached_results), 2)
+
+        # a was written to outside of dbt, which also changes the view on it
+        mock_freshness.return_value[('analytics', 'a')] = '11:0:0:1'
+        self.assertEquals(self.run_invocation(tests=self.tests), self.tests)
+
+        # a is rebuilt, but the view isn't
+        self.run_invocation(models=['model.root.a'])
+        self.assertEquals(self.run_invocation(tests=self.tests), self.tests)
+
+        self.args.no_cache = True
+        self.assertEquals(self.run_invocation(tests=self.tests), self.tests)
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_default_schema',
+           return_value='analytics')
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_source_freshness',
+           return_value={})
+    def test__undeclared_raw_reads(self, mock_freshness, mock_schema):
+        # raw_v doesn't set source_tables, so it might select from a raw
+        # table which has changed since the test last passed
+        test = 'test.root.not_null_raw_v_id'
+        node = self.check_node(['model.root.raw_v'], {'type': 'not_null'})
+        node['unique_id'] = test
+        self.linker.update_node_data(test, node)
+
+        self.run_invocation(models=['model.root.raw_v'])
+        self.run_invocation(tests=set([test]))
+
+        self.assertEquals(self.run_invocation(tests=set([test])),
+                          set([test]))
+        self.assertEquals(self.runner.cached_results, [])
+
+
+class TestFusedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.graph_nodes = {
+            'model.root.a': {'name': 'a', 'package_name': 'root',
+                             'config': {'materialized': 'table'}},
+            'model.root.b': {'name': 'b', 'package_name': 'root',
+                             'config': {'materialized': 'view'}},
+            'model.root.e': {'name': 'e', 'package_name': 'root',
+                             'config': {'materialized': 'ephemeral'}},
+        }
+
+    def make_node(self, name, parents, test_metadata=None):
+        test = {'unique_id': 'test.root.{}'.format(name),
+                'name': name,
+                'resource_type': 'test',
+                'depends_on': {'nodes': parents}}
+
+        if test_metadata is not None:
+            test['test_metadata'] = test_metadata
+
+        return test
+
+    def test__get_fused_test_nodes(self):
+        tests = [
+            self.make_node('a_id_not_null', ['model.root.a'],
+                           {'type': 'not_null', 'field': 'id'}),
+            self.make_node('a_id_unique', ['model.root.a'],
+                           {'type': 'unique', 'field': 'id'}),
+            self.make_node('a_status_values', ['model.root.a'],
+                           {'type': 'accepted_values', 'field': 'status',
+                            'values_csv': "'x','y'"}),
+            self.make_node('a_to_b', ['model.root.b', 'model.root.a'],
+                           {'type': 'relationships', 'from': 'b_id',
+                            'to': 'b', 'field': 'id'}),
+            self.make_node('b_id_unique', ['model.root.b'],
+                           {'type': 'unique', 'field': 'id'}),
+            self.make_node('e_id_unique', ['model.root.e'],
+                           {'type': 'unique', 'field': 'id'}),
+            self.make_node('e_id_not_null', ['model.root.e'],
+                           {'type': 'not_null', 'field': 'id'}),
+            self.make_node('data_test', ['model.root.a']),
+        ]
+
+        to_run = dbt.runner.get_fused_test_nodes(
+            tests, self.graph_nodes, 'analytics')
+
+        fused = [node for node in to_run if 'fused_tests' in node]
+        unfused = [node.get('name') for node in to_run
+                   if 'fused_tests' not in node]
+
+        self.assertEquals(len(fused), 1)
+        self.assertEquals(fused[0]['fused_tests'], tests[:3])
+        self.assertEquals(
+            fused[0]['execution_steps'][-1]['sql'],
+            'select\n'
+            '  coalesce(sum(case when id is null then 1 else 0 end), 0) '
+            'as test_0,\n'
+            '  coalesce(count(id) - count(distinct id), 0) as test_1,\n'
+            '  coalesce(count(distinct case when status not in '
+            '(\'x\',\'y\') then status end), 0) as test_2\n'
+            'from "analytics"."a"')
+
+        self.assertEquals(
+            sorted(unfused),
+            ['a_to_b', 'b_id_unique', 'data_test', 'e_id_not_null',
+             'e_id_unique'])
+
+    def test__split_fused_result(self):
+        tests = [self.make_node(name, ['model.root.a'],
+                                {'type': 'not_null', 'field': name})
+                 for name in ('x', 'y')]
+        node = {'name': 'fused_tests_on_a', 'fused_tests': tests}
+
+        results = dbt.runner.split_fused_result(
+            dbt.runner.RunModelResult(node, status=[0, 3],
+                                      execution_time=1.0))
+
+        self.assertEquals([r.node for r in results], tests)
+        self.assertEquals([r.status for r in results], [0, 3])
+        self.assertEquals([r.execution_time for r in results], [1.0, 1.0])
+
+        results = dbt.runner.split_fused_result(
+            dbt.runner.RunModelResult(node, status='ERROR', error='oops'))
+
+        self.assertEquals([r.status for r in results], ['ERROR', 'ERROR'])
+        self.assertTrue(all(r.errored for r in results))
+
+        self.assertRaises(RuntimeError,
+                          dbt.runner.get_fused_test_statuses,
+                          node, [(0, 0, 0)])
+
+
+class TestBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nx.DiGraph()
+
+        for unique_id, node in [
+                ('model.root.a', {'resource_type': 'model'}),
+                ('model.root.b', {'resource_type': 'model'}),
+                ('test.root.not_null_a_id',
+                 {'resource_type': 'test',
+                  'test_metadata': {'type': 'not_null', 'field': 'id'}}),
+                ('test.root.relationships_b_a_id_to_a_id',
+                 {'resource_type': 'test',
+                  'test_metadata': {'type': 'relationships', 'from': 'a_id',
+                                    'to': 'a', 'field': 'id'}}),
+                ('test.root.data_test_a', {'resource_type': 'test'})]:
+            self.graph.add_node(unique_id, node)
+
+        for parent, child in [
+                ('model.root.a', 'model.root.b'),
+                ('model.root.a', 'test.root.not_null_a_id'),
+                ('model.root.a', 'test.root.relationships_b_a_id_to_a_id'),
+                ('model.root.b', 'test.root.relationships_b_a_id_to_a_id'),
+                ('model.root.a', 'test.root.data_test_a')]:
+            self.graph.add_edge(parent, child)
+
+    def test__get_blocking_tests(self):
+        # only schema tests on a single model block its children
+        self.assertEquals(
+            dbt.runner.get_blocking_tests(self.graph, self.graph.nodes()),
+            {'model.root.a': ['test.root.not_null_a_id']})
+
+        self.assertEquals(
+            dbt.runner.get_blocking_tests(self.graph, ['model.root.a',
+                                                       'model.root.b']),
+            {})
+
+    def test__failed(self):
+        test = {'resource_type': 'test'}
+        model = {'resource_type': 'model'}
+
+        self.assertTrue(dbt.runner.RunModelResult(test, status=2).failed)
+        self.assertFalse(dbt.runner.RunModelResult(test, status=0).failed)
+        self.assertFalse(dbt.runner.RunModelResult(test, skip=True).failed)
+        self.assertFalse(
+            dbt.runner.RunModelResult(test, error='oops',
+                                      status='ERROR').failed)
+        self.assertFalse(
+            dbt.runner.RunModelResult(model, status='CREATE VIEW').failed)
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        columns = [dbt.schema.Column('id', 'integer', None),
+                   dbt.schema.Column('updated_at', 'timestamp', None)]
+
+        self.adapter = MagicMock()
+        self.adapter.get_columns_in_table.return_value = columns
+        self.adapter.get_missing_columns.return_value = []
+
+        self.context = {'get_columns_in_table': lambda s, t: columns}
+
+    def archive_sql(self, strategy):
+        node = {
+            'unique_id': 'archive.root.users_archived',
+            'resource_type': 'archive',
+            'config': {
+                'source_schema': 'production',
+                'source_table': 'users',
+                'target_schema': 'archive',
+                'target_table': 'users_archived',
+                'updated_at': 'updated_at',
+                'unique_key': 'id',
+                'strategy': strategy,
+            }
+        }
+
+        with patch('dbt.runner.get_adapter', return_value=self.adapter):
+            dbt.runner.execute_archive({}, node, self.context)
+
+        return ' '.join(node['wrapped_sql'].split())
+
+    def test__full_archive(self):
+        sql = self.archive_sql('full')
+
+        self.assertFalse('>=' in sql)
+        self.assertFalse('where "valid_to" is null' in sql)
+
+    def test__incremental_archive(self):
+        sql = self.archive_sql('incremental')
+
+        # the high-water mark is read by the archive query itself
+        self.assertTrue(
+            'from "production"."users" where updated_at >= coalesce( '
+            '(select max("dbt_updated_at") '
+            'from "archive"."users_archived"), updated_at)' in sql)
+        self.assertFalse('{#' in sql)
+        self.assertTrue(
+            'from "archive"."users_archived" where "valid_to" is null' in sql)
+
+    def test__tmp_identifier(self):
+        tmp_identifier = dbt.templates.ArchiveInsertTemplate.tmp_identifier
+
+        self.assertNotEquals(tmp_identifier('archive', 'users'),
+                             tmp_identifier('archive_2', 'users'))
+        self.assertTrue(len(tmp_identifier('archive', 'x' * 63)) <= 63)
+
+        sql = self.archive_sql('full')
+        tmp = tmp_identifier('archive', 'users_archived')
+
+        self.assertTrue(sql.startswith(
+            'drop table if exists "{}";'.format(tmp)))
+        self.assertTrue(sql.endswith(
+            'drop table if exists "{}";'.format(tmp)))
+        self.assertFalse('users_archived__dbt_archival_tmp"' in sql)
+
+    def test__rollback_on_error(self):
+        self.adapter.get_columns_in_table.return_value = []
+
+        with self.assertRaises(RuntimeError):
+            self.archive_sql('full')
+
+        self.adapter.rollback.assert_called_with({})
+        self.assertFalse(self.adapter.execute_model.called)
+
+
+class TestExecuteNodes(unittest.TestCase):
+
+    def setUp(self):
+        dbt.tracking.do_not_track()
+
+        project = MagicMock()
+        project.run_environment.return_value = {'type': 'postgres',
+                                                'threads': 2}
+
+        self.target_path = tempfile.mkdtemp()
+        self.runner = dbt.runner.RunManager(
+            project, self.target_path, MagicMock(threads=2, fail_fast=False,
+                                                 deadline=None))
+
+    def tearDown(self):
+        shutil.rmtree(self.target_path)
+
+    @patch('dbt.adapters.postgres.PostgresAdapter.query_for_existing',
+           return_value={})
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_default_schema',
+           return_value='analytics')
+    def test__no_batch_barrier(self, *mocks):
+        nodes = [{'unique_id': 'archive.root.{}'.format(name),
+                  'name': name,
+                  'resource_type': 'archive',
+                  'raw_sql': '-- noop',
+                  'config': {'source_schema': 'production',
+                             'source_table': name,
+                             'target_schema': 'archive',
+                             'target_table': name}}
+                 for name in ['slow', 'fast', 'last']]
+
+        last_started = threading.Event()
+        overlapped = []
+
+        def execute(data):
+            node, existing = data
+
+            if node['name'] == 'slow':
+                # with batches of `threads`, 'last' couldn't start until
+                # 'slow' finished
+                overlapped.append(last_started.wait(5))
+            elif node['name'] == 'last':
+                last_started.set()
+
+            return dbt.runner.RunModelResult(node, status='INSERT 0 1')
+
+        self.runner.safe_execute_node = execute
+
+        results = self.runner.execute_nodes([nodes], lambda node: None)
+
+        self.assertEquals(overlapped, [True])
+        self.assertEquals(
+            sorted(result.node['name'] for result in results),
+            ['fast', 'last', 'slow'])
+
+
+class TestResumeSelected(unittest.TestCase):
+
+    def setUp(self):
+        dbt.tracking.do_not_track()
+
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+
+        for path, contents in [
+                ('dbt_project.yml',
+                 "name: 'root'\nversion: '1.0'\nsource-paths: ['models']\n"
+                 "target-path: 'target'\nprofile: 'test'\n"),
+                ('profiles/profiles.yml',
+                 "test:\n  outputs:\n    dev:\n      type: postgres\n"
+                 "      threads: 1\n      host: localhost\n      port: 5432\n"
+                 "      user: root\n      pass: password\n"
+                 "      dbname: dbt\n      schema: analytics\n"
+                 "  target: dev\n"),
+                ('models/a.sql', 'select 1 as id'),
+                ('models/x.sql', "select * from {{ ref('a') }}")]:
+            path = os.path.join(self.root, path)
+
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+            with open(path, 'w') as fh:
+                fh.write(contents)
+
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    @patch('dbt.runner.run_hooks')
+    @patch('dbt.adapters.postgres.PostgresAdapter.query_for_existing',
+           return_value={})
+    @patch('dbt.adapters.postgres.PostgresAdapter.get_default_schema',
+           return_value='analytics')
+    def test__resume_selected_models(self, *mocks):
+        executed = []
+
+        def execute(runner, data):
+            node, existing = data
+            executed.append(node.get('unique_id'))
+
+            return dbt.runner.RunModelResult(node, status='SELECT 1')
+
+        def run(*args):
+            parsed = dbt.main.parse_args(
+                ['run', '--profiles-dir', 'profiles'] + list(args))
+            task, project = dbt.main.invoke_dbt(parsed)
+
+            with patch.object(dbt.runner.RunManager, 'safe_execute_node',
+                              execute), \
+                    patch.object(dbt.runner.RunManager, 'try_create_schema'):
+                task.run()
+
+        run('--models', 'x')
+        self.assertEquals(executed, ['model.root.x'])
+
+        # the resumed run compiles the same nodes, so x isn't run again
+        run('--models', 'x', '--resume')
+        self.assertEquals(executed, ['model.root.x'])
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import dbt.clients.system
+from dbt.clients.system import FileScanner
+
+
+class FileScannerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        self.write('models/a.sql', 'select 1')
+        self.write('models/sub/b.sql', 'select 2')
+        self.write('models/sub/.#b.sql', 'lock file')
+        self.write('models/schema.yml', 'a: {}')
+        self.write('macros/m.sql', '{% macro m() %}{% endmacro %}')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relative_path, contents):
+        path = os.path.join(self.root, relative_path)
+
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with open(path, 'w') as fh:
+            fh.write(contents)
+
+    def sorted_matches(self, matches):
+        return sorted(matches, key=lambda m: m['absolute_path'])
+
+    def test__matches_find_matching(self):
+        scanner = FileScanner()
+
+        for paths, pattern in [(['models'], '[!.#~]*.sql'),
+                               (['models'], '[!.#~]*.yml'),
+                               (['models', 'macros'], '[!.#~]*.sql'),
+                               (['missing'], '[!.#~]*.sql')]:
+            self.assertEquals(
+                self.sorted_matches(
+                    scanner.find_matching(self.root, paths, pattern)),
+                self.sorted_matches(
+                    dbt.clients.system.find_matching(
+                        self.root, paths, pattern)))
+
+    def test__each_directory_scanned_once(self):
+        scanner = FileScanner()
+        scanner.find_matching(self.root, ['models'], '[!.#~]*.sql')
+        scanner.find_matching(self.root, ['models'], '[!.#~]*.yml')
+
+        self.assertEquals(list(scanner.scanned.keys()),
+                          [(self.root, 'models')])
+
+    def test__stats(self):
+        a_path = os.path.join(self.root, 'models', 'a.sql')
+        b_path = os.path.join(self.root, 'models', 'sub', 'b.sql')
+
+        scanner = FileScanner()
+        self.assertEquals(scanner.get_stat(a_path), None)
+
+        scanner.find_matching(self.root, ['models'], '[!.#~]*.sql')
+        a_stat = scanner.get_stat(a_path)
+        b_stat = scanner.get_stat(b_path)
+
+        st = os.stat(a_path)
+        self.assertEquals(a_stat, [st.st_mtime, st.st_size, st.st_ino])
+
+        self.write('models/sub/b.sql', 'select 2, 3')
+
+        scanner = FileScanner()
+        scanner.find_matching(self.root, ['models'], '[!.#~]*.sql')
+        self.assertEquals(scanner.get_stat(a_path), a_stat)
+        self.assertNotEquals(scanner.get_stat(b_path), b_stat)